@@ -9,3 +9,4 @@ from .cfb import CFBlanket
 from .cfg_arch_options import CFGArchOptions
 from .cfg_utils import CFGUtils
 from .cfg_node import CFGNode
+from .cfg_graph import CFGGraph, CFGEdgeData
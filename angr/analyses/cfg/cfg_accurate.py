@@ -10,6 +10,7 @@ from archinfo import ArchARM
 
 from .cfg_base import CFGBase
 from .cfg_job_base import BlockID, CFGJobBase
+from .cfg_graph import CFGGraph
 from .cfg_node import CFGNode
 from .cfg_utils import CFGUtils
 from ..forward_analysis import ForwardAnalysis
@@ -298,7 +299,7 @@ class CFGAccurate(ForwardAnalysis, CFGBase):    # pylint: disable=abstract-metho
         new_cfg.project = self.project
 
         # Intelligently (or stupidly... you tell me) fill it up
-        new_cfg._graph = networkx.DiGraph(self._graph)
+        new_cfg._graph = CFGGraph(self._graph)
         new_cfg._nodes = self._nodes.copy()
         new_cfg._nodes_by_addr = self._nodes_by_addr.copy() if self._nodes_by_addr is not None else None
         new_cfg._edge_map = self._edge_map.copy()
@@ -444,7 +445,7 @@ class CFGAccurate(ForwardAnalysis, CFGBase):    # pylint: disable=abstract-metho
         if start_node is None:
             raise AngrCFGError('Cannot find start node when trying to unroll loops. The CFG might be empty.')
 
-        graph_copy = networkx.DiGraph(self.graph)
+        graph_copy = CFGGraph(self.graph)
 
         while True:
             cycles_iter = networkx.simple_cycles(graph_copy)
@@ -598,7 +599,7 @@ class CFGAccurate(ForwardAnalysis, CFGBase):    # pylint: disable=abstract-metho
         :rtype: CFGAccurate
         """
 
-        graph = networkx.DiGraph()
+        graph = CFGGraph()
 
         if starting_node not in self.graph:
             raise AngrCFGError('get_subgraph(): the specified "starting_node" %s does not exist in the current CFG.'
@@ -2723,9 +2724,8 @@ class CFGAccurate(ForwardAnalysis, CFGBase):    # pylint: disable=abstract-metho
                 new_state.options.add(o.DO_RET_EMULATION)
                 # Remove bad constraints
                 # FIXME: This is so hackish...
-                new_state.se._solver.constraints = [c for c in new_state.se.constraints if
-                                                    c.op != 'I' or c.args[0] is not False]
-                new_state.se._solver._result = None
+                new_state.se.replace_constraints([c for c in new_state.se.constraints if
+                                                  c.op != 'I' or c.args[0] is not False])
                 # Swap them
                 saved_state, job.state = job.state, new_state
                 sim_successors, exception_info, _ = self._get_simsuccessors(addr, job)
@@ -2969,7 +2969,7 @@ class CFGAccurate(ForwardAnalysis, CFGBase):    # pylint: disable=abstract-metho
         loop_finder = self.project.analyses.LoopFinder(kb=self.kb, normalize=False, fail_fast=self._fail_fast)
 
         if loop_callback is not None:
-            graph_copy = networkx.DiGraph(self._graph)
+            graph_copy = CFGGraph(self._graph)
 
             for loop in loop_finder.loops:  # type: angr.analyses.loopfinder.Loop
                 loop_callback(graph_copy, loop)
@@ -17,6 +17,7 @@ from ...errors import AngrCFGError, SimTranslationError, SimMemoryError, SimIRSB
 from ...codenode import HookNode, BlockNode
 from ...knowledge_plugins import FunctionManager, Function
 from .. import Analysis
+from .cfg_graph import CFGGraph
 from .cfg_node import CFGNode
 
 l = logging.getLogger("angr.analyses.cfg.cfg_base")
@@ -113,10 +114,6 @@ class CFGBase(Analysis):
         # addresses of functions that have been completely recovered (i.e. all of its blocks are identified) so far
         self._completed_functions = set()
 
-        # TODO: A segment tree to speed up CFG node lookups
-        self._node_lookup_index = None
-        self._node_lookup_index_warned = False
-
         self._ffi = cffi.FFI()
 
     def __contains__(self, cfg_node):
@@ -144,7 +141,7 @@ class CFGBase(Analysis):
         """
         Re-create the DiGraph
         """
-        self._graph = networkx.DiGraph()
+        self._graph = CFGGraph()
 
         self.kb.functions = FunctionManager(self.kb)
 
@@ -182,12 +179,13 @@ class CFGBase(Analysis):
 
     def generate_index(self):
         """
-        Generate an index of all nodes in the graph in order to speed up get_any_node() with anyaddr=True.
+        Generate an index of all nodes in the graph in order to speed up get_any_node() with anyaddr=True. The index is
+        generated on demand by the first such query anyway, and is kept up to date when nodes are added or removed.
 
         :return: None
         """
 
-        raise NotImplementedError("I'm too lazy to implement it right now")
+        self._graph.generate_index()
 
     @deprecated(replacement='nodes()')
     def get_bbl_dict(self):
@@ -308,10 +306,7 @@ class CFGBase(Analysis):
                                 None means get either, True means get a syscall node, False means get something that isn't
                                 a syscall node.
         :param bool anyaddr:    If anyaddr is True, then addr doesn't have to be the beginning address of a basic
-                                block. By default the entire graph.nodes() will be iterated, and the first node
-                                containing the specific address is returned, which is slow. If you need to do many such
-                                queries, you may first call `generate_index()` to create some indices that may speed up the
-                                query.
+                                block. Nodes are looked up in the address index of the graph.
         :return: A CFGNode if there is any that satisfies given conditions, or None otherwise
         """
 
@@ -320,26 +315,9 @@ class CFGBase(Analysis):
                 addr in self._nodes_by_addr and self._nodes_by_addr[addr]:
             return self._nodes_by_addr[addr][0]
 
-        # slower path
-        #if self._node_lookup_index is not None:
-        #    pass
-
-        # the slowest path
-        # try to show a warning first
-        # TODO: re-enable it once the segment tree is implemented
-        #if self._node_lookup_index_warned == False:
-        #    l.warning('Calling get_any_node() with anyaddr=True is slow on large programs. '
-        #              'For better performance, you may first call generate_index() to generate some indices that may '
-        #              'speed the node lookup.')
-        #    self._node_lookup_index_warned = True
-
-        for n in self.graph.nodes():
-            cond = n.looping_times == 0
-            if anyaddr and n.size is not None:
-                cond = cond and (addr >= n.addr and addr < n.addr + n.size)
-            else:
-                cond = cond and (addr == n.addr)
-            if cond:
+        candidates = self.graph.nodes_containing(addr) if anyaddr else self.graph.nodes_at(addr)
+        for n in candidates:
+            if n.looping_times == 0:
                 if is_syscall is None:
                     return n
                 if n.is_syscall == is_syscall:
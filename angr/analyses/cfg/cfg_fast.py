@@ -1,10 +1,14 @@
+import bisect
+import cPickle
 import itertools
 import logging
 import math
+import multiprocessing
 import re
 import string
 import struct
 from collections import defaultdict
+from cStringIO import StringIO
 
 from bintrees import AVLTree
 
@@ -16,6 +20,7 @@ from cle.address_translator import AT
 from .memory_data import MemoryData
 from .cfg_arch_options import CFGArchOptions
 from .cfg_base import CFGBase, IndirectJump
+from .cfg_fast_cache import CFGFastCache
 from .cfg_node import CFGNode
 from .indirect_jump_resolvers.default_resolvers import default_indirect_jump_resolvers
 from ..forward_analysis import ForwardAnalysis
@@ -610,6 +615,63 @@ class CFGJob(object):
                     )
 
 
+# the CFGFast instance that forked pre-lifting workers lift blocks with. It is set right before the pool is created, so
+# every worker inherits it (and its project) through fork() instead of receiving a pickled copy.
+_prelift_cfg = None
+
+
+def _prelift_worker(job):
+    """
+    Lift all blocks that are reachable through direct jumps and calls from the given seed addresses, without leaving
+    the given address range.
+
+    :param tuple job:   A tuple of (start address, end address, seed addresses).
+    :return:            A list of (address, IRSB, bytes) tuples serialized with cPickle, or None if they could not be
+                        serialized.
+    """
+
+    lo, hi, seeds = job
+    cfg = _prelift_cfg
+    is_arm_arch = cfg.project.arch.name in ('ARMHF', 'ARMEL')
+
+    blocks = [ ]
+    seen = set()
+    todo = list(seeds)
+    while todo:
+        addr = todo.pop()
+        if addr in seen or not lo <= addr < hi or not cfg._inside_regions(addr):
+            continue
+        seen.add(addr)
+
+        real_addr = addr & (~1) if is_arm_arch else addr
+        try:
+            is_code, distance = cfg._section_distance(addr, real_addr)
+            if not is_code:
+                continue
+            lifted_block = cfg._lift(addr, size=distance)
+            irsb = lifted_block.vex
+        except (SimMemoryError, SimEngineError):
+            continue
+        if irsb.size == 0 or irsb.jumpkind == 'Ijk_NoDecode':
+            continue
+
+        blocks.append((addr, irsb, lifted_block.bytes[:irsb.size]))
+        todo.extend(irsb.constant_jump_targets)
+        if irsb.jumpkind == 'Ijk_Call':
+            todo.append(addr + irsb.size)
+
+    try:
+        f = StringIO()
+        pickler = cPickle.Pickler(f, cPickle.HIGHEST_PROTOCOL)
+        # the architecture is shared with the parent process
+        pickler.persistent_id = lambda obj: 'arch' if obj is cfg.project.arch else None
+        pickler.dump(blocks)
+        return f.getvalue()
+    except Exception:  # pylint:disable=broad-except
+        l.warning("Failed to serialize lifted blocks in a worker.", exc_info=True)
+        return None
+
+
 class CFGFast(ForwardAnalysis, CFGBase):    # pylint: disable=abstract-method
     """
     We find functions inside the given binary, and build a control-flow graph in very fast manners: instead of
@@ -666,6 +728,8 @@ class CFGFast(ForwardAnalysis, CFGBase):    # pylint: disable=abstract-method
                  exclude_sparse_regions=True,
                  skip_specific_regions=True,
                  heuristic_plt_resolving=None,
+                 cache=None,
+                 processes=None,
                  start=None,  # deprecated
                  end=None,  # deprecated
                  **extra_arch_options
@@ -701,6 +765,15 @@ class CFGFast(ForwardAnalysis, CFGBase):    # pylint: disable=abstract-method
                                              default indirect jump resolvers specific to this architecture and binary
                                              types will be loaded.
         :param base_state:              A state to use as a backer for all memory loads
+        :param cache:                   Cache the results of CFG recovery on disk, and reuse them when the same binary
+                                        is analyzed again with the same parameters. Either a CFGFastCache instance, or
+                                        the path to a cache directory.
+        :param int processes:           Lift basic blocks in this many forked worker processes before the recovery
+                                        starts. Regions are partitioned between workers, and each of them lifts the
+                                        blocks that are reachable through direct jumps and calls from the function
+                                        starts inside its partition. The recovery itself stays serial, and only uses
+                                        lifted blocks that are identical to the ones it would have lifted, so results
+                                        are the same as without workers. Not supported on Windows.
         :param int start:               (Deprecated) The beginning address of CFG recovery.
         :param int end:                 (Deprecated) The end address of CFG recovery.
         :param CFGArchOptions arch_options: Architecture-specific options.
@@ -827,6 +900,10 @@ class CFGFast(ForwardAnalysis, CFGBase):    # pylint: disable=abstract-method
         self._function_prologue_addrs = None
         self._remaining_function_prologue_addrs = None
 
+        self._processes = processes
+        # a mapping between block addresses and (IRSB, bytes) tuples of blocks lifted by workers
+        self._prelifted = { }
+
         #
         # Indirect jump resolvers
         #
@@ -861,8 +938,44 @@ class CFGFast(ForwardAnalysis, CFGBase):    # pylint: disable=abstract-method
 
         self._graph = None
 
+        #
+        # Result cache
+        #
+        self._cache = CFGFastCache(cache) if isinstance(cache, basestring) else cache
+        self._cache_key = None
+        # cached results that this analysis resumes from
+        self._cache_resume = None
+        if self._cache is not None:
+            if base_state is not None:
+                l.warning("CFGFast results are not cached when a base_state is specified.")
+                self._cache = None
+            else:
+                self._cache_key = self._cache.key(self.project, {
+                    'binary': self._binary.mapped_base,
+                    'symbols': symbols,
+                    'function_prologues': function_prologues,
+                    'resolve_indirect_jumps': resolve_indirect_jumps,
+                    'force_segment': force_segment,
+                    'force_complete_scan': force_complete_scan,
+                    'indirect_jump_target_limit': indirect_jump_target_limit,
+                    'collect_data_references': collect_data_references,
+                    'extra_cross_references': extra_cross_references,
+                    'normalize': normalize,
+                    'start_at_entry': start_at_entry,
+                    'extra_memory_regions': extra_memory_regions,
+                    'data_type_guessing_handlers': [ type(h).__name__ for h in self._data_type_guessing_handlers ],
+                    'indirect_jump_resolvers': [ type(r).__name__ for r in
+                                                 self.timeless_indirect_jump_resolvers + self.indirect_jump_resolvers ],
+                    'heuristic_plt_resolving': self._heuristic_plt_resolving,
+                    'arch_options': sorted(self._arch_options._options.iteritems()),
+                    'hooks': sorted((addr, hooker.display_name)
+                                    for addr, hooker in self.project._sim_procedures.iteritems()),
+                })
+
         # Start working!
-        self._analyze()
+        if not self._load_cache():
+            self._analyze()
+            self._store_cache()
 
     #
     # Utils
@@ -1155,8 +1268,9 @@ class CFGFast(ForwardAnalysis, CFGBase):    # pylint: disable=abstract-method
 
     def _pre_analysis(self):
 
-        # Call _initialize_cfg() before self.functions is used.
-        self._initialize_cfg()
+        if self._cache_resume is None:
+            # Call _initialize_cfg() before self.functions is used.
+            self._initialize_cfg()
 
         # Initialize variables used during analysis
         self._pending_jobs = PendingJobs(self.functions, self._deregister_analysis_job)
@@ -1179,8 +1293,9 @@ class CFGFast(ForwardAnalysis, CFGBase):    # pylint: disable=abstract-method
 
         starting_points = set()
 
-        # clear all existing functions
-        self.kb.functions.clear()
+        if self._cache_resume is None:
+            # clear all existing functions
+            self.kb.functions.clear()
 
         if self._use_symbols:
             starting_points |= self._function_addresses_from_symbols
@@ -1196,6 +1311,17 @@ class CFGFast(ForwardAnalysis, CFGBase):    # pylint: disable=abstract-method
             # make sure self.project.entry is inserted
             starting_points += [ self.project.entry ]
 
+        self._changed_functions = set()
+
+        self._nodes = {}
+        self._nodes_by_addr = defaultdict(list)
+
+        if self._cache_resume is not None:
+            self._restore_from_cache(self._cache_resume)
+            # only scan from starting points that are not functions in the cached results yet
+            starting_points = [ sp for sp in starting_points if sp not in self.kb.functions ]
+            l.info("Resuming CFG recovery from cached results with %d new starting points.", len(starting_points))
+
         # Create jobs for all starting points
         for sp in starting_points:
             job = CFGJob(sp, sp, 'Ijk_Boring')
@@ -1203,11 +1329,6 @@ class CFGFast(ForwardAnalysis, CFGBase):    # pylint: disable=abstract-method
             # register the job to function `sp`
             self._register_analysis_job(sp, job)
 
-        self._changed_functions = set()
-
-        self._nodes = {}
-        self._nodes_by_addr = defaultdict(list)
-
         if self._use_function_prologues:
             self._function_prologue_addrs = sorted(self._func_addrs_from_prologues())
             # make a copy of those prologue addresses, so that we can pop from the list
@@ -1216,6 +1337,12 @@ class CFGFast(ForwardAnalysis, CFGBase):    # pylint: disable=abstract-method
             # make function_prologue_addrs a set for faster lookups
             self._function_prologue_addrs = set(self._function_prologue_addrs)
 
+        if self._processes is not None and self._processes > 1:
+            seeds = set(starting_points)
+            if self._use_function_prologues:
+                seeds |= self._function_prologue_addrs
+            self._prelift(seeds)
+
     def _pre_job_handling(self, job):  # pylint:disable=arguments-differ
         """
         Some pre job-processing tasks, like update progress bar.
@@ -1368,6 +1495,9 @@ class CFGFast(ForwardAnalysis, CFGBase):    # pylint: disable=abstract-method
 
     def _post_analysis(self):
 
+        # blocks lifted by workers that the recovery did not reach
+        self._prelifted = { }
+
         self._analyze_all_function_features()
 
         # Scan all functions, and make sure all fake ret edges are either confirmed or removed
@@ -1444,6 +1574,180 @@ class CFGFast(ForwardAnalysis, CFGBase):    # pylint: disable=abstract-method
 
         self._finish_progress()
 
+    # Parallel lifting
+
+    def _partition_regions(self, n):
+        """
+        Partition the address space covered by all regions into at most n consecutive address ranges, each of which
+        covers about the same number of bytes of regions.
+
+        :param int n: The number of partitions.
+        :return: A list of (start address, end address) tuples.
+        :rtype: list
+        """
+
+        partition_size = self._regions_size // n + 1
+        partitions = [ ]
+        partition_start, covered = None, 0
+        for start, end in self._regions.iter_items():
+            while start < end:
+                if partition_start is None:
+                    partition_start, covered = start, 0
+                size = min(end - start, partition_size - covered)
+                start += size
+                covered += size
+                if covered >= partition_size:
+                    partitions.append((partition_start, start))
+                    partition_start = None
+        if partition_start is not None:
+            partitions.append((partition_start, start))
+        return partitions
+
+    def _prelift(self, seeds):
+        """
+        Lift blocks reachable from the given seed addresses in worker processes, and store them in self._prelifted.
+
+        :param set seeds: Addresses of function starts.
+        :return: None
+        """
+
+        global _prelift_cfg  # pylint:disable=global-statement
+
+        partitions = self._partition_regions(self._processes)
+        partition_starts = [ start for start, _ in partitions ]
+        jobs = [ (start, end, [ ]) for start, end in partitions ]
+        for addr in sorted(seeds):
+            idx = bisect.bisect_right(partition_starts, addr) - 1
+            if idx >= 0 and addr < jobs[idx][1]:
+                jobs[idx][2].append(addr)
+        jobs = [ job for job in jobs if job[2] ]
+        if not jobs:
+            return
+
+        _prelift_cfg = self
+        pool = multiprocessing.Pool(processes=self._processes)
+        try:
+            results = pool.map(_prelift_worker, jobs, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+            _prelift_cfg = None
+
+        shared = { 'arch': self.project.arch }
+        for r in results:
+            if r is None:
+                continue
+            unpickler = cPickle.Unpickler(StringIO(r))
+            unpickler.persistent_load = shared.__getitem__
+            for addr, irsb, irsb_string in unpickler.load():
+                self._prelifted[addr] = (irsb, irsb_string)
+
+        l.debug("Lifted %d blocks in %d worker processes.", len(self._prelifted), len(jobs))
+
+    # Result cache
+
+    def _cache_data(self):
+        """
+        Collect everything that is needed to restore the results of this analysis, or to resume it.
+
+        :return: A dict of analysis data.
+        """
+
+        function_starts = set(self._extra_function_starts or ())
+        if self._cache_resume is not None:
+            function_starts |= self._cache_resume['function_starts']
+
+        return {
+            'function_starts': function_starts,
+            'regions': list(self._regions.iter_items()),
+            'graph': self._graph,
+            'nodes': self._nodes,
+            'nodes_by_addr': self._nodes_by_addr,
+            'functions': dict(self.kb.functions._function_map),
+            'callgraph': self.kb.functions.callgraph,
+            'block_map': self.kb.functions.block_map,
+            'memory_data': self._memory_data,
+            'insn_addr_to_memory_data': self.insn_addr_to_memory_data,
+            'indirect_jumps': self.indirect_jumps,
+            'indirect_jumps_to_resolve': self._indirect_jumps_to_resolve,
+            'unresolved_indirect_jumps': set(self.kb.unresolved_indirect_jumps),
+            'jump_tables': self._jump_tables,
+            'seg_list': self._seg_list,
+            'traced_addresses': self._traced_addresses,
+            'function_returns': self._function_returns,
+            'function_exits': self._function_exits,
+            'normalized': self._normalized,
+        }
+
+    def _restore_from_cache(self, data):
+        """
+        Restore analysis data loaded from the cache. The function manager must be the one that cached functions were
+        loaded into.
+
+        :param dict data: Analysis data, as returned by _cache_data().
+        :return: None
+        """
+
+        self._graph = data['graph']
+        self._nodes = data['nodes']
+        self._nodes_by_addr = data['nodes_by_addr']
+
+        for addr, func in data['functions'].iteritems():
+            self.kb.functions._function_map[addr] = func
+        self.kb.functions.callgraph = data['callgraph']
+        self.kb.functions.block_map.update(data['block_map'])
+
+        self._memory_data = data['memory_data']
+        self.insn_addr_to_memory_data = data['insn_addr_to_memory_data']
+        self.indirect_jumps = data['indirect_jumps']
+        self._indirect_jumps_to_resolve = data['indirect_jumps_to_resolve']
+        self.kb.unresolved_indirect_jumps.update(data['unresolved_indirect_jumps'])
+        self._jump_tables = data['jump_tables']
+        self._seg_list = data['seg_list']
+        self._traced_addresses = data['traced_addresses']
+        self._function_returns = data['function_returns']
+        self._function_exits = data['function_exits']
+        self._normalized = data['normalized']
+
+    def _load_cache(self):
+        """
+        Look up the results of this analysis in the cache. If the cached results cover all function starts and regions
+        of this analysis, they are restored. If this analysis covers more, the cached results are kept in
+        self._cache_resume, so that the analysis resumes from them.
+
+        :return: True if the results were restored from the cache, False if the analysis must run.
+        :rtype: bool
+        """
+
+        if self._cache is None or self._cache_key is None:
+            return False
+
+        # cached functions are loaded into this function manager
+        self._initialize_cfg()
+        data = self._cache.load(self, self._cache_key)
+        if data is None:
+            return False
+
+        regions = set(self._regions.iter_items())
+        cached_regions = set(data['regions'])
+        if not cached_regions <= regions:
+            # the cached results cover regions that we are not supposed to cover
+            self._initialize_cfg()
+            return False
+
+        if regions == cached_regions and set(self._extra_function_starts or ()) <= data['function_starts']:
+            l.info("Restored CFG recovery results from the cache.")
+            self._restore_from_cache(data)
+            return True
+
+        self._cache_resume = data
+        return False
+
+    def _store_cache(self):
+        if self._cache is None or self._cache_key is None:
+            return
+        self._cache.store(self, self._cache_key, self._cache_data())
+
     # Methods to get start points for scanning
 
     def _func_addrs_from_symbols(self):
@@ -2713,6 +3017,9 @@ class CFGFast(ForwardAnalysis, CFGBase):    # pylint: disable=abstract-method
         if node.addr in self.kb.functions.callgraph:
             self.kb.functions.callgraph.remove_node(node.addr)
 
+        # the block is gone from the functions that contain it as well
+        self.kb.functions._remove_node(node.addr)
+
     def _shrink_node(self, node, new_size, remove_function=True):
         """
         Shrink the size of a node in CFG.
@@ -2774,6 +3081,9 @@ class CFGFast(ForwardAnalysis, CFGBase):    # pylint: disable=abstract-method
         # remove the old node form the graph
         self.graph.remove_node(node)
 
+        # split the block in the block index of the functions that contain it
+        self.kb.functions._shrink_node(node.addr, new_size)
+
         # add the new node to indices
         self._nodes[new_node.addr] = new_node
         self._nodes_by_addr[new_node.addr].append(new_node)
@@ -3330,22 +3640,9 @@ class CFGFast(ForwardAnalysis, CFGBase):    # pylint: disable=abstract-method
                 real_addr = addr
 
             # if possible, check the distance between `addr` and the end of this section
-            distance = None
-            obj = self.project.loader.find_object_containing(addr)
-            if obj:
-                # is there a section?
-                has_executable_section = len([ sec for sec in obj.sections if sec.is_executable ]) > 0  # pylint:disable=len-as-condition
-                section = self.project.loader.find_section_containing(addr)
-                if has_executable_section and section is None:
-                    # the basic block should not exist here...
-                    return None, None, None, None
-                if section is not None:
-                    if not section.is_executable:
-                        # the section is not executable...
-                        return None, None, None, None
-                    distance = section.vaddr + section.memsize - real_addr
-                    distance = min(distance, VEX_IRSB_MAX_SIZE)
-                # TODO: handle segment information as well
+            is_code, distance = self._section_distance(addr, real_addr)
+            if not is_code:
+                return None, None, None, None
 
             # also check the distance between `addr` and the closest function.
             # we don't want to have a basic block that spans across function boundaries
@@ -3362,12 +3659,17 @@ class CFGFast(ForwardAnalysis, CFGBase):    # pylint: disable=abstract-method
             nodecode = False
             irsb = None
             irsb_string = None
-            try:
-                lifted_block = self._lift(addr, size=distance)
-                irsb = lifted_block.vex
-                irsb_string = lifted_block.bytes[:irsb.size]
-            except SimTranslationError:
-                nodecode = True
+            prelifted = self._prelifted.pop(addr, None)
+            if prelifted is not None and (distance is None or prelifted[0].size <= distance):
+                # the block was lifted by a worker, and ends before the size limit we would have lifted it with
+                irsb, irsb_string = prelifted
+            else:
+                try:
+                    lifted_block = self._lift(addr, size=distance)
+                    irsb = lifted_block.vex
+                    irsb_string = lifted_block.bytes[:irsb.size]
+                except SimTranslationError:
+                    nodecode = True
 
             if (nodecode or irsb.size == 0 or irsb.jumpkind == 'Ijk_NoDecode') and \
                     is_arm_arch and \
@@ -3429,6 +3731,35 @@ class CFGFast(ForwardAnalysis, CFGBase):    # pylint: disable=abstract-method
         except (SimMemoryError, SimEngineError):
             return None, None, None, None
 
+    def _section_distance(self, addr, real_addr):
+        """
+        Check if a basic block may start at `addr` according to the sections of the object containing it, and get the
+        distance between `addr` and the end of its section.
+
+        :param int addr:        Address of the basic block.
+        :param int real_addr:   Address of the basic block, without the THUMB bit.
+        :return: A tuple of (whether the block may exist, distance to the end of the section or None).
+        :rtype: tuple
+        """
+
+        distance = None
+        obj = self.project.loader.find_object_containing(addr)
+        if obj:
+            # is there a section?
+            has_executable_section = len([ sec for sec in obj.sections if sec.is_executable ]) > 0  # pylint:disable=len-as-condition
+            section = self.project.loader.find_section_containing(addr)
+            if has_executable_section and section is None:
+                # the basic block should not exist here...
+                return False, None
+            if section is not None:
+                if not section.is_executable:
+                    # the section is not executable...
+                    return False, None
+                distance = section.vaddr + section.memsize - real_addr
+                distance = min(distance, VEX_IRSB_MAX_SIZE)
+            # TODO: handle segment information as well
+        return True, distance
+
     def _process_block_arch_specific(self, addr, irsb, func_addr):  # pylint: disable=unused-argument
         """
         According to arch types ['ARMEL', 'ARMHF', 'MIPS32'] does different
@@ -0,0 +1,138 @@
+import os
+import hashlib
+import logging
+import tempfile
+import cPickle
+
+l = logging.getLogger("angr.analyses.cfg.cfg_fast_cache")
+
+
+class CFGFastCache(object):
+    """
+    An on-disk cache of CFGFast results.
+
+    Each result is stored in its own file, named after the MD5 hash of the content of every loaded binary and of the
+    analysis parameters. Function starts and regions are not part of the key: a cached result is reused by a later
+    analysis of the same binary that covers at least the same regions, which then only scans the function starts and
+    regions that were not covered before.
+
+    The project, its loader and the knowledge base are never written to the cache. They are referred to by name and
+    resolved to the ones of the analysis that loads a cached result.
+    """
+
+    VERSION = 1
+
+    def __init__(self, directory=None):
+        """
+        :param str directory:   The directory to store cached results in. Cached results are unpickled, so nobody but
+                                the user should be able to write to it. By default, a directory in the user's cache
+                                directory ($XDG_CACHE_HOME, or ~/.cache) is used.
+        """
+        if directory is None:
+            directory = os.path.join(os.environ.get('XDG_CACHE_HOME', None) or os.path.expanduser('~/.cache'),
+                                     'angr', 'cfgfast')
+        self.directory = directory
+
+    @staticmethod
+    def _file_hash(path):
+        md5 = hashlib.md5()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), ''):
+                md5.update(chunk)
+        return md5.hexdigest()
+
+    def key(self, project, params):
+        """
+        Compute the cache key of an analysis.
+
+        :param project:     The project the analysis runs on.
+        :param dict params: The analysis parameters that affect its result.
+        :return:            The key as a string, or None if the analysis can not be cached (because the main binary or
+                            some library is not backed by a file).
+        """
+        if project.loader.main_object.binary is None:
+            return None
+
+        md5 = hashlib.md5()
+        md5.update(str(self.VERSION))
+        for obj in project.loader.all_objects:
+            if obj.binary is None:
+                # objects synthesized by the loader
+                continue
+            if not os.path.isfile(obj.binary):
+                l.debug("%s is not backed by a file. CFGFast results will not be cached.", obj)
+                return None
+            md5.update("%s@%#x" % (self._file_hash(obj.binary), obj.mapped_base))
+        md5.update(repr(sorted(params.iteritems())))
+        return md5.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.cfg')
+
+    @staticmethod
+    def _shared_objects(cfg):
+        return {
+            'project': cfg.project,
+            'loader': cfg.project.loader,
+            'loader_memory': cfg.project.loader.memory,
+            'kb': cfg.kb,
+            'functions': cfg.kb.functions,
+            'cfg': cfg,
+        }
+
+    def load(self, cfg, key):
+        """
+        Load a cached result.
+
+        :param CFGFast cfg: The analysis the result is loaded into. Its knowledge base must already have the function
+                            manager that cached functions will belong to.
+        :param str key:     The cache key.
+        :return:            A dict of cached analysis data, or None if there is no usable cached result.
+        """
+        path = self._path(key)
+        if not os.path.isfile(path):
+            return None
+
+        shared = self._shared_objects(cfg)
+        try:
+            with open(path, 'rb') as f:
+                unpickler = cPickle.Unpickler(f)
+                unpickler.persistent_load = shared.__getitem__
+                data = unpickler.load()
+        except Exception:  # pylint:disable=broad-except
+            l.warning("Failed to load cached CFGFast results from %s.", path, exc_info=True)
+            return None
+
+        if data.get('version', None) != self.VERSION:
+            return None
+        l.debug("Loaded cached CFGFast results from %s.", path)
+        return data
+
+    def store(self, cfg, key, data):
+        """
+        Store a result in the cache, replacing any previous result with the same key.
+
+        :param CFGFast cfg: The analysis the result comes from.
+        :param str key:     The cache key.
+        :param dict data:   The analysis data to cache.
+        """
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory, 0700)
+
+        data = dict(data, version=self.VERSION)
+        shared = {id(v): k for k, v in self._shared_objects(cfg).iteritems()}
+
+        # write to a temporary file first, so that concurrent analyses never load a partially written result
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickler = cPickle.Pickler(f, cPickle.HIGHEST_PROTOCOL)
+                pickler.persistent_id = lambda o: shared.get(id(o), None)
+                pickler.dump(data)
+            os.rename(tmp_path, self._path(key))
+        except Exception:  # pylint:disable=broad-except
+            l.warning("Failed to store CFGFast results in the cache.", exc_info=True)
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            return
+        l.debug("Stored CFGFast results in %s.", self._path(key))
@@ -0,0 +1,795 @@
+import collections
+from array import array
+from copy import deepcopy
+
+import networkx
+from bintrees import AVLTree
+
+
+class CFGEdgeData(object):
+    """
+    The attributes of an edge in a CFG.
+
+    This is a mapping, like the attribute dicts of networkx edges. The attributes every CFG edge has are kept in slots
+    instead of in a dict of their own, and jumpkinds are interned, so that all edges share the few jumpkind strings
+    there are. Other attributes are kept in a dict, which is only created for the edges that have some.
+    """
+
+    __slots__ = ('jumpkind', 'ins_addr', 'stmt_idx', '_extra', )
+
+    _SLOTS = frozenset(('jumpkind', 'ins_addr', 'stmt_idx', ))
+
+    def __init__(self, *args, **kwargs):
+        self._extra = None
+        self.update(*args, **kwargs)
+
+    def __getstate__(self):
+        return dict(self.iteritems())
+
+    def __setstate__(self, s):
+        self._extra = None
+        self.update(s)
+
+    def __repr__(self):
+        return repr(dict(self.iteritems()))
+
+    #
+    # Mapping interface
+    #
+
+    def __getitem__(self, key):
+        if key in self._SLOTS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key)
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __setitem__(self, key, value):
+        if key in self._SLOTS:
+            if key == 'jumpkind' and type(value) is str:
+                value = intern(value)
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = { }
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in self._SLOTS:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key)
+        else:
+            if self._extra is None:
+                raise KeyError(key)
+            del self._extra[key]
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        return self.iterkeys()
+
+    def __len__(self):
+        return sum(1 for _ in self.iterkeys())
+
+    def __eq__(self, other):
+        try:
+            return dict(self.iteritems()) == dict(other.items())
+        except AttributeError:
+            return False
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def iterkeys(self):
+        for key in ('jumpkind', 'ins_addr', 'stmt_idx'):
+            if hasattr(self, key):
+                yield key
+        if self._extra is not None:
+            for key in self._extra:
+                yield key
+
+    def itervalues(self):
+        for key in self.iterkeys():
+            yield self[key]
+
+    def iteritems(self):
+        for key in self.iterkeys():
+            yield key, self[key]
+
+    def keys(self):
+        return list(self.iterkeys())
+
+    def values(self):
+        return list(self.itervalues())
+
+    def items(self):
+        return list(self.iteritems())
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def setdefault(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            self[key] = default
+            return default
+
+    def pop(self, key, *args):
+        try:
+            value = self[key]
+        except KeyError:
+            if args:
+                return args[0]
+            raise
+        del self[key]
+        return value
+
+    def update(self, *args, **kwargs):
+        if args:
+            other = args[0]
+            if hasattr(other, 'keys'):
+                for key in other.keys():
+                    self[key] = other[key]
+            else:
+                for key, value in other:
+                    self[key] = value
+        for key, value in kwargs.iteritems():
+            self[key] = value
+
+    def clear(self):
+        for key in self.keys():
+            del self[key]
+
+    def copy(self):
+        return CFGEdgeData(self)
+
+
+class _NodeAttrView(collections.Mapping):
+    """
+    A read-only mapping from the nodes of a CFGGraph to their attribute dicts, like the node dict of networkx graphs.
+    Attribute dicts are only created for the nodes they are requested for.
+    """
+
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __getitem__(self, n):
+        return self._graph._node_attr_dict(self._graph._ids[n])
+
+    def __iter__(self):
+        return iter(self._graph._ids)
+
+    def __len__(self):
+        return len(self._graph._ids)
+
+    def __contains__(self, n):
+        return n in self._graph
+
+    def __copy__(self):
+        return dict(self.iteritems())
+
+    def __deepcopy__(self, memo):
+        return deepcopy(dict(self.iteritems()), memo)
+
+
+class _AdjacencyView(collections.Mapping):
+    """
+    A read-only mapping from the nodes of a CFGGraph to the mappings of their successors or predecessors to edge
+    attributes, like the succ and pred dicts of networkx digraphs.
+    """
+
+    def __init__(self, graph, pred=False):
+        self._graph = graph
+        self._pred = pred
+
+    def __getitem__(self, n):
+        return _NeighborView(self._graph, self._graph._ids[n], self._pred)
+
+    def __iter__(self):
+        return iter(self._graph._ids)
+
+    def __len__(self):
+        return len(self._graph._ids)
+
+    def __contains__(self, n):
+        return n in self._graph
+
+    def __copy__(self):
+        return dict(self.iteritems())
+
+    def __deepcopy__(self, memo):
+        return deepcopy(dict((n, dict(nbrs.iteritems())) for n, nbrs in self.iteritems()), memo)
+
+
+class _NeighborView(collections.Mapping):
+    """
+    A read-only mapping from the successors or predecessors of a node of a CFGGraph to the attributes of the edges
+    between them.
+    """
+
+    def __init__(self, graph, node_id, pred):
+        self._graph = graph
+        self._id = node_id
+        self._pred = pred
+
+    def _neighbor_ids(self):
+        return (self._graph._pred if self._pred else self._graph._succ)[self._id] or ()
+
+    def __getitem__(self, n):
+        try:
+            other = self._graph._ids.get(n, None)
+        except TypeError:
+            other = None
+        if other is not None:
+            data = self._graph._edge_data(other, self._id) if self._pred else self._graph._edge_data(self._id, other)
+            if data is not None:
+                return data
+        raise KeyError(n)
+
+    def __iter__(self):
+        nodes = self._graph._nodes
+        return (nodes[i] for i in self._neighbor_ids())
+
+    def __len__(self):
+        return len(self._neighbor_ids())
+
+    def __contains__(self, n):
+        try:
+            other = self._graph._ids.get(n, None)
+        except TypeError:
+            return False
+        return other is not None and other in self._neighbor_ids()
+
+    def iteritems(self):
+        nodes = self._graph._nodes
+        if self._pred:
+            for i in self._neighbor_ids():
+                yield nodes[i], self._graph._edge_data(i, self._id)
+        else:
+            succ = self._graph._succ[self._id]
+            if succ is not None:
+                for i, data in zip(succ, self._graph._succ_data[self._id]):
+                    yield nodes[i], data
+
+    def itervalues(self):
+        for _, data in self.iteritems():
+            yield data
+
+    def items(self):
+        return list(self.iteritems())
+
+    def values(self):
+        return list(self.itervalues())
+
+    def __copy__(self):
+        return dict(self.iteritems())
+
+    def __deepcopy__(self, memo):
+        return deepcopy(dict(self.iteritems()), memo)
+
+
+class CFGGraph(networkx.DiGraph):
+    """
+    The graph of a CFG. It is a networkx DiGraph that keeps its edges in arrays instead of dicts of dicts.
+
+    Every node gets an integer id. The successors and the predecessors of a node are arrays of node ids, and the
+    attributes of its outgoing edges are CFGEdgeData objects kept in a list parallel to its successors, which take a
+    fraction of the memory of the dicts networkx uses by default. Node attribute dicts are only created for the nodes
+    that have attributes. The node, adj, succ, pred and edge attributes of networkx graphs are read-only views of these
+    arrays, so existing consumers and the networkx algorithms work unchanged, while all updates go through the methods
+    of the graph.
+
+    It also keeps an index of its nodes sorted by address, so that the nodes covering an arbitrary address can be found
+    in logarithmic time. The index is built on the first lookup. Afterwards, adding or removing single nodes and edges
+    keeps it up to date, while bulk updates simply drop it until it is needed again.
+    """
+
+    edge_attr_dict_factory = CFGEdgeData
+
+    def __init__(self, data=None, **attr):
+        self.graph = { }
+        self._ids = { }
+        self._nodes = [ ]
+        self._free_ids = [ ]
+        self._node_attrs = [ ]
+        self._succ = [ ]
+        self._succ_data = [ ]
+        self._pred = [ ]
+        self._addr_index = None
+        self._max_node_size = 0
+
+        if isinstance(data, networkx.Graph):
+            self.graph.update(data.graph)
+            self.add_nodes_from(data.nodes_iter(data=True))
+            self.add_edges_from(data.edges_iter(data=True))
+        elif data is not None:
+            networkx.convert.to_networkx_graph(data, create_using=self)
+        self.graph.update(attr)
+
+    def __getstate__(self):
+        s = dict(self.__dict__)
+        s['_addr_index'] = None
+        s['_max_node_size'] = 0
+        return s
+
+    def __setstate__(self, s):
+        if 'succ' in s:
+            # a graph pickled with dicts of dicts
+            self.__init__()
+            self.graph.update(s.get('graph', { }))
+            self.add_nodes_from(s['node'].iteritems())
+            self.add_edges_from((u, v, data) for u, nbrs in s['succ'].iteritems() for v, data in nbrs.iteritems())
+            return
+        self.__dict__.update(s)
+        self.__dict__.setdefault('_addr_index', None)
+        self.__dict__.setdefault('_max_node_size', 0)
+
+    #
+    # networkx views
+    #
+
+    @property
+    def node(self):
+        return _NodeAttrView(self)
+
+    @property
+    def succ(self):
+        return _AdjacencyView(self)
+
+    @property
+    def pred(self):
+        return _AdjacencyView(self, pred=True)
+
+    adj = succ
+    edge = succ
+
+    #
+    # Node and edge storage
+    #
+
+    def _node_id(self, n, index=True):
+        """
+        Get the id of a node, adding the node to the graph if it is not in it yet.
+
+        :param n:           The node.
+        :param bool index:  Whether a new node should be added to the address index.
+        :return:            The id of the node.
+        :rtype:             int
+        """
+
+        nid = self._ids.get(n, None)
+        if nid is not None:
+            return nid
+
+        if self._free_ids:
+            nid = self._free_ids.pop()
+            self._nodes[nid] = n
+        else:
+            nid = len(self._nodes)
+            self._nodes.append(n)
+            self._node_attrs.append(None)
+            self._succ.append(None)
+            self._succ_data.append(None)
+            self._pred.append(None)
+        self._ids[n] = nid
+
+        if index:
+            self._index_node(n)
+        return nid
+
+    def _node_attr_dict(self, nid):
+        attrs = self._node_attrs[nid]
+        if attrs is None:
+            attrs = self._node_attrs[nid] = { }
+        return attrs
+
+    def _edge_data(self, uid, vid):
+        """
+        Get the attributes of the edge between two nodes, or None if there is no such edge.
+        """
+
+        succ = self._succ[uid]
+        if succ is None:
+            return None
+        try:
+            return self._succ_data[uid][succ.index(vid)]
+        except ValueError:
+            return None
+
+    def _store_edge(self, uid, vid, attr_dict):
+        data = self._edge_data(uid, vid)
+        if data is not None:
+            data.update(attr_dict)
+            return
+
+        data = self.edge_attr_dict_factory()
+        data.update(attr_dict)
+        self._append_edge(uid, vid, data)
+
+    def _append_edge(self, uid, vid, data):
+        if self._succ[uid] is None:
+            self._succ[uid] = array('i')
+            self._succ_data[uid] = [ ]
+        self._succ[uid].append(vid)
+        self._succ_data[uid].append(data)
+        if self._pred[vid] is None:
+            self._pred[vid] = array('i')
+        self._pred[vid].append(uid)
+
+    def _remove_edge(self, uid, vid):
+        """
+        Remove the edge between two nodes.
+
+        :return: True if there was such an edge, False otherwise.
+        :rtype:  bool
+        """
+
+        succ = self._succ[uid]
+        if succ is None or vid not in succ:
+            return False
+
+        pos = succ.index(vid)
+        del succ[pos]
+        del self._succ_data[uid][pos]
+        if not succ:
+            self._succ[uid] = None
+            self._succ_data[uid] = None
+        pred = self._pred[vid]
+        pred.remove(uid)
+        if not pred:
+            self._pred[vid] = None
+        return True
+
+    def _remove_node(self, n):
+        nid = self._ids.pop(n)
+        for vid in list(self._succ[nid] or ()):
+            self._remove_edge(nid, vid)
+        for uid in list(self._pred[nid] or ()):
+            self._remove_edge(uid, nid)
+        self._nodes[nid] = None
+        self._node_attrs[nid] = None
+        self._free_ids.append(nid)
+
+    @staticmethod
+    def _merge_attr_dict(attr_dict, attr):
+        if attr_dict is None:
+            return attr
+        try:
+            attr_dict.update(attr)
+        except AttributeError:
+            raise networkx.NetworkXError("The attr_dict argument must be a dictionary.")
+        return attr_dict
+
+    #
+    # Graph updates
+    #
+
+    def add_node(self, n, attr_dict=None, **attr):
+        attr_dict = self._merge_attr_dict(attr_dict, attr)
+        nid = self._node_id(n)
+        if attr_dict:
+            self._node_attr_dict(nid).update(attr_dict)
+
+    def add_nodes_from(self, nodes, **attr):
+        for n in nodes:
+            try:
+                nid = self._node_id(n, index=False)
+                ndict = attr
+            except TypeError:
+                n, ndict = n
+                nid = self._node_id(n, index=False)
+                if attr:
+                    ndict = dict(attr, **ndict)
+            if ndict:
+                self._node_attr_dict(nid).update(ndict)
+        self._addr_index = None
+
+    def add_edge(self, u, v, attr_dict=None, **attr):
+        attr_dict = self._merge_attr_dict(attr_dict, attr)
+        self._store_edge(self._node_id(u), self._node_id(v), attr_dict)
+
+    def add_edges_from(self, ebunch, attr_dict=None, **attr):
+        attr_dict = self._merge_attr_dict(attr_dict, attr)
+        for e in ebunch:
+            ne = len(e)
+            if ne == 3:
+                u, v, dd = e
+                data = dict(attr_dict)
+                data.update(dd)
+            elif ne == 2:
+                u, v = e
+                data = attr_dict
+            else:
+                raise networkx.NetworkXError("Edge tuple %s must be a 2-tuple or 3-tuple." % (e,))
+            self._store_edge(self._node_id(u, index=False), self._node_id(v, index=False), data)
+        self._addr_index = None
+
+    def remove_node(self, n):
+        try:
+            self._remove_node(n)
+        except KeyError:
+            raise networkx.NetworkXError("The node %s is not in the digraph." % (n,))
+        self._unindex_node(n)
+
+    def remove_nodes_from(self, nbunch):
+        for n in nbunch:
+            if n in self._ids:
+                self._remove_node(n)
+        self._addr_index = None
+
+    def remove_edge(self, u, v):
+        uid, vid = self._ids.get(u, None), self._ids.get(v, None)
+        if uid is None or vid is None or not self._remove_edge(uid, vid):
+            raise networkx.NetworkXError("The edge %s-%s not in graph." % (u, v))
+
+    def remove_edges_from(self, ebunch):
+        for e in ebunch:
+            uid, vid = self._ids.get(e[0], None), self._ids.get(e[1], None)
+            if uid is not None and vid is not None:
+                self._remove_edge(uid, vid)
+
+    def clear(self):
+        self.graph.clear()
+        self._ids.clear()
+        del self._nodes[:]
+        del self._free_ids[:]
+        del self._node_attrs[:]
+        del self._succ[:]
+        del self._succ_data[:]
+        del self._pred[:]
+        self._addr_index = None
+        self._max_node_size = 0
+
+    #
+    # Graph queries
+    #
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def __contains__(self, n):
+        try:
+            return n in self._ids
+        except TypeError:
+            return False
+
+    def __len__(self):
+        return len(self._ids)
+
+    has_node = __contains__
+
+    def nodes_iter(self, data=False):
+        if data:
+            return ((n, self._node_attr_dict(nid)) for n, nid in self._ids.iteritems())
+        return iter(self._ids)
+
+    def nodes(self, data=False):
+        return list(self.nodes_iter(data=data))
+
+    def number_of_nodes(self):
+        return len(self._ids)
+
+    def has_edge(self, u, v):
+        try:
+            uid, vid = self._ids.get(u, None), self._ids.get(v, None)
+        except TypeError:
+            return False
+        return uid is not None and vid is not None and self._edge_data(uid, vid) is not None
+
+    has_successor = has_edge
+
+    def has_predecessor(self, u, v):
+        return self.has_edge(v, u)
+
+    def successors_iter(self, n):
+        try:
+            nid = self._ids[n]
+        except KeyError:
+            raise networkx.NetworkXError("The node %s is not in the digraph." % (n,))
+        nodes = self._nodes
+        return (nodes[i] for i in self._succ[nid] or ())
+
+    def predecessors_iter(self, n):
+        try:
+            nid = self._ids[n]
+        except KeyError:
+            raise networkx.NetworkXError("The node %s is not in the digraph." % (n,))
+        nodes = self._nodes
+        return (nodes[i] for i in self._pred[nid] or ())
+
+    def successors(self, n):
+        return list(self.successors_iter(n))
+
+    def predecessors(self, n):
+        return list(self.predecessors_iter(n))
+
+    neighbors = successors
+    neighbors_iter = successors_iter
+
+    def _node_ids_iter(self, nbunch):
+        if nbunch is None:
+            return self._ids.iteritems()
+        return ((n, self._ids[n]) for n in self.nbunch_iter(nbunch))
+
+    def edges_iter(self, nbunch=None, data=False, default=None):
+        nodes = self._nodes
+        for u, uid in self._node_ids_iter(nbunch):
+            succ = self._succ[uid]
+            if succ is None:
+                continue
+            if data is True:
+                for vid, ddict in zip(succ, self._succ_data[uid]):
+                    yield u, nodes[vid], ddict
+            elif data is not False:
+                for vid, ddict in zip(succ, self._succ_data[uid]):
+                    yield u, nodes[vid], ddict.get(data, default)
+            else:
+                for vid in succ:
+                    yield u, nodes[vid]
+
+    out_edges_iter = edges_iter
+
+    def in_edges_iter(self, nbunch=None, data=False):
+        nodes = self._nodes
+        for v, vid in self._node_ids_iter(nbunch):
+            pred = self._pred[vid]
+            if pred is None:
+                continue
+            if data:
+                for uid in pred:
+                    yield nodes[uid], v, self._edge_data(uid, vid)
+            else:
+                for uid in pred:
+                    yield nodes[uid], v
+
+    def number_of_edges(self, u=None, v=None):
+        if u is None:
+            return sum(len(succ) for succ in self._succ if succ is not None)
+        return 1 if self.has_edge(u, v) else 0
+
+    def size(self, weight=None):
+        if weight is None:
+            return self.number_of_edges()
+        return super(CFGGraph, self).size(weight=weight)
+
+    #
+    # Graph copies
+    #
+
+    def subgraph(self, nbunch):
+        bunch = set(self.nbunch_iter(nbunch))
+        h = self.__class__()
+        for n in bunch:
+            nid = h._node_id(n, index=False)
+            # node and edge attributes are shared with the subgraph, as in networkx
+            h._node_attrs[nid] = self._node_attrs[self._ids[n]]
+        for n in bunch:
+            uid, hid = self._ids[n], h._ids[n]
+            for vid, data in zip(self._succ[uid] or (), self._succ_data[uid] or ()):
+                v = self._nodes[vid]
+                if v in bunch:
+                    h._append_edge(hid, h._ids[v], data)
+        h.graph = self.graph
+        return h
+
+    def reverse(self, copy=True):
+        edges = [ (v, u, deepcopy(data) if copy else data) for u, v, data in self.edges_iter(data=True) ]
+        if copy:
+            h = self.__class__(name="Reverse of (%s)" % self.name)
+            h.add_nodes_from(self)
+            h.graph = deepcopy(self.graph)
+            for n, nid in self._ids.iteritems():
+                if self._node_attrs[nid] is not None:
+                    h._node_attrs[h._ids[n]] = deepcopy(self._node_attrs[nid])
+        else:
+            h = self
+            for nid in xrange(len(self._nodes)):
+                self._succ[nid] = self._succ_data[nid] = self._pred[nid] = None
+        for u, v, data in edges:
+            h._append_edge(h._ids[u], h._ids[v], data)
+        return h
+
+    #
+    # Address lookups
+    #
+
+    def nodes_at(self, addr):
+        """
+        Get all nodes starting at a specific address.
+
+        :param int addr: The address.
+        :return:         A list of nodes.
+        :rtype:          list
+        """
+
+        if self._addr_index is None:
+            self.generate_index()
+
+        return list(self._addr_index.get(addr, ()))
+
+    def nodes_containing(self, addr):
+        """
+        Get all nodes whose range covers a specific address, starting with the node that begins closest to it. Nodes
+        without a size only cover their own address.
+
+        :param int addr: The address.
+        :return:         A generator of nodes.
+        """
+
+        if self._addr_index is None:
+            self.generate_index()
+
+        for start, nodes in self._addr_index.iter_items(addr - self._max_node_size, addr + 1, reverse=True):
+            for n in nodes:
+                if n.size is None:
+                    if start == addr:
+                        yield n
+                elif addr < start + n.size:
+                    yield n
+
+    def generate_index(self):
+        """
+        (Re)build the address index of all nodes.
+
+        :return: None
+        """
+
+        self._addr_index = AVLTree()
+        self._max_node_size = 0
+        for n in self._ids:
+            self._index_node(n)
+
+    def _index_node(self, n):
+        if self._addr_index is None:
+            return
+        addr = getattr(n, 'addr', None)
+        if type(addr) not in (int, long):
+            return
+        nodes = self._addr_index.get(addr, None)
+        if nodes is None:
+            self._addr_index[addr] = [ n ]
+        else:
+            nodes.append(n)
+        size = getattr(n, 'size', None)
+        if size is not None and size > self._max_node_size:
+            self._max_node_size = size
+
+    def _resize_node(self, n):
+        """
+        Called when the size of a node changes, so that range lookups still reach the node if it has grown beyond the
+        largest size seen so far.
+        """
+        if self._addr_index is None:
+            return
+        size = getattr(n, 'size', None)
+        if size is not None and size > self._max_node_size:
+            self._max_node_size = size
+
+    def _unindex_node(self, n):
+        if self._addr_index is None:
+            return
+        addr = getattr(n, 'addr', None)
+        nodes = self._addr_index.get(addr, None)
+        if not nodes:
+            return
+        nodes = [ node for node in nodes if node is not n ]
+        if nodes:
+            self._addr_index[addr] = nodes
+        else:
+            del self._addr_index[addr]
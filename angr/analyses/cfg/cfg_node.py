@@ -31,6 +31,12 @@ class CFGNode(object):
     """
     This class stands for each single node in CFG.
     """
+
+    __slots__ = ('callstack', 'addr', 'input_state', 'simprocedure_name', 'syscall_name', '_size', 'looping_times',
+                 'no_ret', 'is_syscall', 'syscall', '_cfg', 'function_address', 'block_id', 'depth', 'thumb',
+                 'byte_string', 'creation_failure_info', '_callstack_key', 'name', 'return_target',
+                 'instruction_addrs', 'final_states', 'irsb', 'has_return', )
+
     def __init__(self,
                  addr,
                  size,
@@ -63,7 +69,7 @@ class CFGNode(object):
         self.input_state = input_state
         self.simprocedure_name = simprocedure_name
         self.syscall_name = syscall_name
-        self.size = size
+        self._size = size
         self.looping_times = looping_times
         self.no_ret = no_ret
         self.is_syscall = is_syscall
@@ -116,6 +122,25 @@ class CFGNode(object):
 
         self.has_return = False
 
+    def __getstate__(self):
+        return { k: getattr(self, k) for k in self.__slots__ if hasattr(self, k) }
+
+    def __setstate__(self, s):
+        for k, v in s.iteritems():
+            setattr(self, k, v)
+
+    @property
+    def size(self):
+        return self._size
+
+    @size.setter
+    def size(self, v):
+        self._size = v
+        # let the graph of the CFG know that the node may cover more addresses now
+        graph = getattr(getattr(self, '_cfg', None), '_graph', None)
+        if isinstance(graph, CFGGraph):
+            graph._resize_node(self)
+
     @property
     def callstack_key(self):
         return self._callstack_key
@@ -214,3 +239,4 @@ class CFGNode(object):
         return b
 
 from ...codenode import BlockNode, HookNode
+from .cfg_graph import CFGGraph
@@ -6,6 +6,11 @@ import pyvex
 from . import Analysis
 
 from .code_location import CodeLocation
+from .cfg.cfg_utils import CFGUtils
+from .variable_recovery.variable_recovery_fast import SpAndOffset
+from ..codenode import BlockNode
+from ..knowledge_plugins.data_dependencies import FunctionDataDependencies
+from ..storage.page_table import _Node, _EMPTY, _BITS, _MASK
 from ..errors import SimSolverModeError, SimUnsatError, AngrDDGError
 from ..sim_variable import SimRegisterVariable, SimMemoryVariable, SimTemporaryVariable, SimConstantVariable, \
     SimStackVariable
@@ -92,9 +97,158 @@ class DDGJob(object):
         return "<DDGJob %s, call_depth %d>" % (self.cfg_node, self.call_depth)
 
 
+class DefinitionMap(object):
+    """
+    A persistent map from byte offsets, which may be negative, to the frozensets of code locations defining them.
+
+    Offsets are grouped in chunks of consecutive bytes, and the map is a dict from chunk numbers to chunks, so that a
+    lookup is a dict lookup and a list index. Both the dict and the chunks are copy-on-write: branching a map shares them
+    with the branch, and the first modification afterwards copies the dict and the chunk being modified. Merging two
+    maps that were branched from each other skips the chunks they still share.
+    """
+
+    __slots__ = ('_chunks', '_shared', '_owner', )
+
+    def __init__(self):
+        self._chunks = { }
+        # whether _chunks is shared with another map, and must be copied before being modified
+        self._shared = False
+        # chunks may only be modified in place by the map owning them
+        self._owner = object()
+
+    def branch(self):
+        """
+        Return a copy of this map. The frozensets of code locations are not copied.
+        """
+        m = DefinitionMap.__new__(DefinitionMap)
+        m._chunks = self._chunks
+        m._shared = self._shared = True
+        m._owner = object()
+        # every chunk we own is now shared with the branch
+        self._owner = object()
+        return m
+
+    copy = branch
+
+    def merge(self, other):
+        """
+        Add the code locations of every byte of another map to this one.
+
+        :param DefinitionMap other: The other map.
+        :return: True if any of the code locations was new to a byte, False otherwise.
+        :rtype: bool
+        """
+
+        if other._chunks is self._chunks or not other._chunks:
+            return False
+
+        # every chunk the other map owns may end up shared with this one
+        other._owner = object()
+
+        if not self._chunks:
+            self._chunks = other._chunks
+            self._shared = other._shared = True
+            return True
+
+        new_defs_added = False
+        # bytes that shared the same sets of code locations in both maps will share the union as well
+        unions = { }
+
+        for number, theirs in other._chunks.iteritems():
+            ours = self._chunks.get(number, None)
+            if ours is theirs:
+                continue
+            if ours is None:
+                self._writable_chunks()[number] = theirs
+                new_defs_added = True
+                continue
+
+            chunk = None
+            for idx, locs in enumerate(theirs.slots):
+                if locs is _EMPTY:
+                    continue
+                old = ours.slots[idx]
+                if old is locs:
+                    continue
+                if old is _EMPTY:
+                    new = locs
+                else:
+                    key = (id(old), id(locs))
+                    if key in unions:
+                        new = unions[key][2]
+                    else:
+                        if locs <= old:
+                            new = old
+                        elif old <= locs:
+                            new = locs
+                        else:
+                            new = old | locs
+                        # keep both operands alive, so that their ids are not reused while merging
+                        unions[key] = (old, locs, new)
+                    if new is old:
+                        continue
+                if chunk is None:
+                    chunk = self._writable_chunk(number)
+                chunk.slots[idx] = new
+                new_defs_added = True
+
+        return new_defs_added
+
+    def _writable_chunks(self):
+        if self._shared:
+            self._chunks = self._chunks.copy()
+            self._shared = False
+        return self._chunks
+
+    def _writable_chunk(self, number):
+        chunks = self._writable_chunks()
+        chunk = chunks.get(number, None)
+        if chunk is None:
+            chunk = chunks[number] = _Node(self._owner)
+        elif chunk.owner is not self._owner:
+            chunk = chunks[number] = _Node(self._owner, list(chunk.slots))
+        return chunk
+
+    #
+    # Dict interface
+    #
+
+    def __getitem__(self, key):
+        chunk = self._chunks.get(key >> _BITS, None)
+        if chunk is not None:
+            v = chunk.slots[key & _MASK]
+            if v is not _EMPTY:
+                return v
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        self._writable_chunk(key >> _BITS).slots[key & _MASK] = value
+
+    def __contains__(self, key):
+        return self.get(key, _EMPTY) is not _EMPTY
+
+    def get(self, key, default=None):
+        chunk = self._chunks.get(key >> _BITS, None)
+        if chunk is None:
+            return default
+        v = chunk.slots[key & _MASK]
+        return default if v is _EMPTY else v
+
+    def iteritems(self):
+        for number, chunk in self._chunks.iteritems():
+            for idx, v in enumerate(chunk.slots):
+                if v is not _EMPTY:
+                    yield (number << _BITS) | idx, v
+
+
 class LiveDefinitions(object):
     """
     A collection of live definitions with some handy interfaces for definition killing and lookups.
+
+    Definitions are copy-on-write. The byte-to-definition maps of registers and memory are persistent DefinitionMaps, and
+    all sets of code locations are frozensets that are shared between bytes and between branches, so branching a
+    collection takes constant time and only the entries that are modified afterwards are copied. Merging collections
+    only visits the entries that differ between them.
     """
     def __init__(self):
         """
@@ -102,11 +256,11 @@ class LiveDefinitions(object):
         """
 
         # byte-to-byte mappings
-        # TODO: make it copy-on-write in order to save memory.
-        # TODO: options are either cooldict.COWDict or a modified version of simuvex.SimPagedMemory
-        self._memory_map = defaultdict(set)
-        self._register_map = defaultdict(set)
-        self._defs = defaultdict(set)
+        self._memory_map = DefinitionMap()
+        self._register_map = DefinitionMap()
+        self._defs = { }
+        # whether _defs is shared with another LiveDefinitions instance, and must be copied before being modified
+        self._defs_shared = False
 
     #
     # Overridden methods
@@ -128,26 +282,22 @@ class LiveDefinitions(object):
         """
 
         ld = LiveDefinitions()
-        ld._memory_map = self._memory_map.copy()
-        ld._register_map = self._register_map.copy()
-        ld._defs = self._defs.copy()
+        ld._memory_map = self._memory_map.branch()
+        ld._register_map = self._register_map.branch()
+        ld._defs = self._defs
+        ld._defs_shared = self._defs_shared = True
 
         return ld
 
     def copy(self):
         """
-        Make a hard copy of `self`.
+        Make a copy of `self`. Since live definitions are copy-on-write, this is the same as branching.
 
         :return: A new LiveDefinition instance.
         :rtype: LiveDefinitions
         """
 
-        ld = LiveDefinitions()
-        ld._memory_map = self._memory_map.copy()
-        ld._register_map = self._register_map.copy()
-        ld._defs = self._defs.copy()
-
-        return ld
+        return self.branch()
 
     def add_def(self, variable, location, size_threshold=32):
         """
@@ -160,36 +310,25 @@ class LiveDefinitions(object):
         :rtype: bool
         """
 
-        new_defs_added = False
-
         if isinstance(variable, SimRegisterVariable):
             if variable.reg is None:
                 l.warning('add_def: Got a None for a SimRegisterVariable. Consider fixing.')
-                return new_defs_added
+                return False
 
-            size = min(variable.size, size_threshold)
-            offset = variable.reg
-            while offset < variable.reg + size:
-                if location not in self._register_map[offset]:
-                    new_defs_added = True
-                self._register_map[offset].add(location)
-                offset += 1
-
-            self._defs[variable].add(location)
+            new_defs_added = self._add_to_range(self._register_map, variable.reg, min(variable.size, size_threshold),
+                                                location)
 
         elif isinstance(variable, SimMemoryVariable):
-            size = min(variable.size, size_threshold)
-            offset = variable.addr
-            while offset < variable.addr + size:
-                if location not in self._memory_map[offset]:
-                    new_defs_added = True
-                self._memory_map[offset].add(location)
-                offset += 1
-
-            self._defs[variable].add(location)
+            new_defs_added = self._add_to_range(self._memory_map, variable.addr, min(variable.size, size_threshold),
+                                                location)
 
         else:
             l.error('Unsupported variable type "%s".', type(variable))
+            return False
+
+        locs = self._defs.get(variable, None)
+        if locs is None or location not in locs:
+            self._writable_defs()[variable] = locs | { location } if locs is not None else frozenset((location, ))
 
         return new_defs_added
 
@@ -211,6 +350,41 @@ class LiveDefinitions(object):
 
         return new_defs_added
 
+    def merge(self, other):
+        """
+        Add all live definitions of another collection to this one.
+
+        The byte-to-definition maps are merged byte by byte, skipping the parts that both collections still share since
+        they were branched from each other.
+
+        :param LiveDefinitions other: The other collection.
+        :return: True if any of the definitions was new, False otherwise
+        :rtype: bool
+        """
+
+        if other is self:
+            return False
+
+        new_defs_added = self._register_map.merge(other._register_map)
+        new_defs_added |= self._memory_map.merge(other._memory_map)
+
+        if other._defs is self._defs:
+            return new_defs_added
+
+        if not self._defs:
+            self._defs = other._defs
+            self._defs_shared = other._defs_shared = True
+            return new_defs_added or bool(other._defs)
+
+        for variable, locs in other._defs.iteritems():
+            old = self._defs.get(variable, None)
+            if old is not None and (old is locs or locs <= old):
+                continue
+            self._writable_defs()[variable] = locs if old is None or old <= locs else old | locs
+            new_defs_added = True
+
+        return new_defs_added
+
     def kill_def(self, variable, location, size_threshold=32):
         """
         Add a new definition for variable and kill all previous definitions.
@@ -221,27 +395,25 @@ class LiveDefinitions(object):
         :return: None
         """
 
+        locs = frozenset((location, ))
+
         if isinstance(variable, SimRegisterVariable):
             if variable.reg is None:
                 l.warning('kill_def: Got a None for a SimRegisterVariable. Consider fixing.')
                 return None
 
             size = min(variable.size, size_threshold)
-            offset = variable.reg
-            while offset < variable.reg + size:
-                self._register_map[offset] = { location }
-                offset += 1
+            for offset in xrange(variable.reg, variable.reg + size):
+                self._register_map[offset] = locs
 
-            self._defs[variable] = { location }
+            self._writable_defs()[variable] = locs
 
         elif isinstance(variable, SimMemoryVariable):
             size = min(variable.size, size_threshold)
-            offset = variable.addr
-            while offset < variable.addr + size:
-                self._memory_map[offset] = { location }
-                offset += 1
+            for offset in xrange(variable.addr, variable.addr + size):
+                self._memory_map[offset] = locs
 
-            self._defs[variable] = { location }
+            self._writable_defs()[variable] = locs
 
         else:
             l.error('Unsupported variable type "%s".', type(variable))
@@ -266,23 +438,26 @@ class LiveDefinitions(object):
                 return live_def_locs
 
             size = min(variable.size, size_threshold)
+            m = self._register_map
             offset = variable.reg
-            while offset < variable.reg + size:
-                if offset in self._register_map:
-                    live_def_locs |= self._register_map[offset]
-                offset += 1
 
         elif isinstance(variable, SimMemoryVariable):
             size = min(variable.size, size_threshold)
+            m = self._memory_map
             offset = variable.addr
-            while offset < variable.addr + size:
-                if offset in self._memory_map:
-                    live_def_locs |= self._memory_map[offset]
-                offset += 1
 
         else:
             # umm unsupported variable type
             l.error('Unsupported variable type "%s".', type(variable))
+            return live_def_locs
+
+        last_locs = None
+        for offset in xrange(offset, offset + size):
+            locs = m.get(offset, None)
+            # adjacent bytes usually share the same set of definitions
+            if locs is not None and locs is not last_locs:
+                live_def_locs |= locs
+                last_locs = locs
 
         return live_def_locs
 
@@ -306,6 +481,41 @@ class LiveDefinitions(object):
 
         return self._defs.iterkeys()
 
+    #
+    # Private methods
+    #
+
+    def _writable_defs(self):
+        if self._defs_shared:
+            self._defs = self._defs.copy()
+            self._defs_shared = False
+        return self._defs
+
+    @staticmethod
+    def _add_to_range(m, start, size, location):
+        """
+        Add a definition to every byte of a range in a byte-to-definition map.
+
+        :return: True if the definition was new to any of the bytes, False otherwise.
+        :rtype: bool
+        """
+
+        new_defs_added = False
+        # bytes that shared a set of definitions before will share the extended set as well
+        extended = { }
+
+        for offset in xrange(start, start + size):
+            locs = m.get(offset, None)
+            if locs is not None and location in locs:
+                continue
+            new_defs_added = True
+            key = id(locs)
+            if key not in extended:
+                extended[key] = locs | { location } if locs is not None else frozenset((location, ))
+            m[offset] = extended[key]
+
+        return new_defs_added
+
 
 class DDGViewItem(object):
     def __init__(self, ddg, variable, simplified=False):
@@ -441,6 +651,248 @@ class DDGView(object):
             return DDGViewInstruction(self._cfg, self._ddg, key, simplified=self._simplified)
 
 
+class StaticBlockProcessor(object):
+    """
+    Tracks the data dependencies of a single block by walking its VEX statements, for the static mode of DDG. Registers,
+    temporary variables, and memory at constant addresses or at constant offsets from the stack pointer are tracked.
+    """
+    def __init__(self, ddg, block, live_defs, sp, bp):
+        """
+        :param DDG ddg:                 The DDG analysis the dependencies are added to.
+        :param angr.Block block:        The block to process.
+        :param LiveDefinitions live_defs: Live definitions at the beginning of the block. They are updated in place.
+        :param int or None sp:          Offset of the stack pointer from its value at the function entry, or None if it
+                                        is unknown.
+        :param bp:                      Value of the base pointer, or None if it is unknown.
+        """
+
+        self.ddg = ddg
+        self.arch = ddg.project.arch
+        self.block = block
+        self.vex_block = block.vex
+        self.tyenv = self.vex_block.tyenv
+        self.live_defs = live_defs
+        self.sp = sp
+        self.bp = bp
+
+        self.stmt_idx = None
+        self.ins_addr = None
+        self.code_location = None
+        # definitions of temporary variables, and the stack offsets or constants they hold
+        self.tmps = { }
+        self.tmp_values = { }
+        # program variables read by the current statement, with the labels of the edges to the variable it defines
+        self.variables_read = None
+
+    def process(self):
+
+        self.ddg._live_defs = self.live_defs
+
+        for stmt_idx, stmt in enumerate(self.vex_block.statements):
+
+            self.stmt_idx = stmt_idx
+            if type(stmt) is pyvex.IRStmt.IMark:
+                self.ins_addr = stmt.addr + stmt.delta
+                continue
+
+            self.code_location = CodeLocation(self.block.addr, stmt_idx, ins_addr=self.ins_addr)
+            self.variables_read = [ ]
+
+            handler = "_handle_%s" % type(stmt).__name__
+            if hasattr(self, handler):
+                getattr(self, handler)(stmt)
+
+        self.ddg._live_defs = None
+        self.stmt_idx = None
+        self.ins_addr = None
+        self.code_location = None
+
+    #
+    # Statement handlers
+    #
+
+    def _handle_WrTmp(self, stmt):
+        value = self._expr(stmt.data)
+        self._define_tmp(stmt.tmp, value, stmt.data)
+
+    def _handle_Put(self, stmt):
+        value = self._expr(stmt.data)
+
+        if stmt.offset == self.arch.sp_offset:
+            self.sp = value.offset if type(value) is SpAndOffset else None
+        elif stmt.offset == self.arch.bp_offset:
+            self.bp = value
+
+        variable = SimRegisterVariable(stmt.offset, stmt.data.result_size(self.tyenv) / 8)
+        self.ddg._kill(variable, self.code_location)
+        self._define(ProgramVariable(variable, self.code_location, arch=self.arch), stmt.data)
+
+    def _handle_Store(self, stmt):
+        addr = self._expr(stmt.addr, 'mem_addr')
+        self._expr(stmt.data, 'mem_data')
+
+        variable = self._memory_variable(addr, stmt.data.result_size(self.tyenv) / 8)
+        if variable is not None:
+            self.ddg._kill(variable, self.code_location)
+            self._define(ProgramVariable(variable, self.code_location, arch=self.arch), stmt.data)
+
+    def _handle_StoreG(self, stmt):
+        self._expr(stmt.guard)
+        addr = self._expr(stmt.addr, 'mem_addr')
+        self._expr(stmt.data, 'mem_data')
+
+        variable = self._memory_variable(addr, stmt.data.result_size(self.tyenv) / 8)
+        if variable is not None:
+            # the store may not happen, so previous definitions stay alive
+            self.live_defs.add_def(variable, self.code_location)
+            self._define(ProgramVariable(variable, self.code_location, arch=self.arch), stmt.data)
+
+    def _handle_LoadG(self, stmt):
+        self._expr(stmt.guard)
+        addr = self._expr(stmt.addr, 'mem_addr')
+        self._expr(stmt.alt)
+
+        variable = self._memory_variable(addr, self.tyenv.sizeof(stmt.dst) / 8)
+        if variable is not None:
+            self._read(variable, 'mem')
+        self._define_tmp(stmt.dst, None, None)
+
+    def _handle_Dirty(self, stmt):
+        for arg in stmt.args:
+            self._expr(arg)
+        if 0 <= stmt.tmp < len(self.tyenv.types):
+            self._define_tmp(stmt.tmp, None, None)
+
+    def _handle_Exit(self, stmt):
+        self._expr(stmt.guard)
+
+    #
+    # Expression handlers
+    #
+
+    def _expr(self, expr, type_=None):
+        """
+        Record all variables an expression reads, and evaluate it if it is a constant or a stack pointer offset.
+
+        :param expr:        The VEX expression.
+        :param str type_:   Label of the data dependence edges from the variables being read.
+        :return:            An int, a SpAndOffset, or None if the expression cannot be evaluated.
+        """
+
+        handler = "_handle_%s" % type(expr).__name__
+        if hasattr(self, handler):
+            return getattr(self, handler)(expr, type_)
+
+        # just record what the operands read
+        for arg in getattr(expr, 'args', ()):
+            self._expr(arg, type_)
+        return None
+
+    def _handle_RdTmp(self, expr, type_):
+        tmp = expr.tmp
+        if tmp in self.tmps:
+            pv = self.tmps[tmp]
+            self.ddg._stmt_graph_add_edge(pv.location, self.code_location, type='tmp', data=tmp)
+            self.variables_read.append((pv, type_))
+        return self.tmp_values.get(tmp, None)
+
+    def _handle_Get(self, expr, type_):
+        reg_offset = expr.offset
+        self._read(SimRegisterVariable(reg_offset, expr.result_size(self.tyenv) / 8), type_)
+
+        if reg_offset == self.arch.sp_offset:
+            return SpAndOffset(self.arch.bits, self.sp) if self.sp is not None else None
+        elif reg_offset == self.arch.bp_offset:
+            return self.bp
+        return None
+
+    def _handle_Load(self, expr, type_):
+        addr = self._expr(expr.addr, 'mem_addr')
+
+        variable = self._memory_variable(addr, expr.result_size(self.tyenv) / 8)
+        if variable is not None:
+            self._read(variable, type_)
+        return None
+
+    def _handle_Const(self, expr, type_):  # pylint:disable=unused-argument,no-self-use
+        return expr.con.value
+
+    def _handle_ITE(self, expr, type_):
+        self._expr(expr.cond, type_)
+        self._expr(expr.iftrue, type_)
+        self._expr(expr.iffalse, type_)
+        return None
+
+    def _handle_Binop(self, expr, type_):
+        arg0 = self._expr(expr.args[0], type_)
+        arg1 = self._expr(expr.args[1], type_)
+
+        if arg0 is None or arg1 is None:
+            return None
+        try:
+            if expr.op.startswith('Iop_Add'):
+                return arg0 + arg1
+            elif expr.op.startswith('Iop_Sub'):
+                return arg0 - arg1
+        except TypeError:
+            pass
+        return None
+
+    #
+    # Private methods
+    #
+
+    def _read(self, variable, type_):
+        """
+        Read a register or memory variable, and add the dependencies on all its live definitions.
+        """
+
+        definitions = self.ddg._def_lookup(variable)
+        for definition_location, labels in definitions.iteritems():
+            self.ddg._stmt_graph_add_edge(definition_location, self.code_location, **labels)
+            self.variables_read.append((ProgramVariable(variable, definition_location, arch=self.arch), type_))
+
+        if not definitions:
+            # the variable was never defined before - it must be passed in as an argument
+            self.variables_read.append((ProgramVariable(variable, self.code_location, initial=True, arch=self.arch),
+                                        type_))
+            self.live_defs.kill_def(variable, self.code_location)
+
+    def _define(self, pv, data):
+        """
+        Add the dependencies of a newly defined program variable on all the variables read by the current statement.
+        """
+
+        self.ddg._data_graph_add_node(pv)
+
+        for read_pv, type_ in self.variables_read:
+            if type_ is None:
+                self.ddg._data_graph_add_edge(read_pv, pv)
+            else:
+                self.ddg._data_graph_add_edge(read_pv, pv, type=type_)
+
+        if not self.variables_read and isinstance(data, pyvex.IRExpr.Const):
+            const_pv = ProgramVariable(SimConstantVariable(value=data.con.value), self.code_location, arch=self.arch)
+            self.ddg._data_graph_add_edge(const_pv, pv)
+
+    def _define_tmp(self, tmp, value, data):
+        pv = ProgramVariable(SimTemporaryVariable(tmp), self.code_location, arch=self.arch)
+        self.tmps[tmp] = pv
+        if value is not None:
+            self.tmp_values[tmp] = value
+        else:
+            self.tmp_values.pop(tmp, None)
+        self._define(pv, data)
+
+    def _memory_variable(self, addr, size):
+        if type(addr) is SpAndOffset:
+            return SimStackVariable(addr.offset, size, base='sp')
+        elif type(addr) in (int, long):
+            return SimMemoryVariable(addr, size)
+        # we do not know where it is
+        return None
+
+
 class DDG(Analysis):
     """
     This is a fast data dependence graph directly generated from our CFG analysis result. The only reason for its
@@ -452,26 +904,41 @@ class DDG(Analysis):
 
     Also note that since we are using states from CFG, any improvement in analysis performed on CFG (like a points-to
     analysis) will directly benefit the DDG.
+
+    In static mode, no states are needed. Dependencies are computed function by function from the VEX statements of
+    each block, and the result of each function is stored in the `data_dependencies` knowledge base plugin as soon as
+    the function is done, so that memory usage is bounded by the largest function. Only registers, temporary variables,
+    and memory at constant addresses or at constant offsets from the stack pointer are tracked, and calls are not
+    followed. The whole-program graphs are only assembled from the per-function results when they are accessed.
     """
-    def __init__(self, cfg, start=None, call_depth=None, block_addrs=None):
+    def __init__(self, cfg, start=None, call_depth=None, block_addrs=None, static=False):
         """
         :param cfg:         Control flow graph. Please make sure each node has an associated `state` with it. You may
-                            want to generate your CFG with `keep_state=True`.
-        :param start:       An address, Specifies where we start the generation of this data dependence graph.
+                            want to generate your CFG with `keep_state=True`. Any CFG will do in static mode.
+        :param start:       An address, Specifies where we start the generation of this data dependence graph. In
+                            static mode, it is the address of the first function to analyze, and None means analyzing
+                            all functions.
         :param call_depth:  None or integers. A non-negative integer specifies how deep we would like to track in the
                             call tree. None disables call_depth limit.
         :param iterable or None block_addrs: A collection of block addresses that the DDG analysis should be performed
                                              on.
+        :param bool static: Compute the dependencies from the lifted blocks instead of the states kept in the CFG.
         """
 
         # Sanity check
-        if not cfg._keep_state:
+        if not static and not cfg._keep_state:
             raise AngrDDGError('CFG must have "keep_state" set to True.')
 
         self._cfg = cfg
-        self._start = self.project.entry if start is None else start
+        self._static = static
+        if static:
+            self._start = start
+        else:
+            self._start = self.project.entry if start is None else start
         self._call_depth = call_depth
         self._block_addrs = block_addrs
+        # addresses of functions analyzed in static mode
+        self._static_function_addrs = [ ]
 
         # analysis output
         self._stmt_graph = networkx.DiGraph()
@@ -499,7 +966,10 @@ class DDG(Analysis):
         self._register_edges = None
 
         # Begin construction!
-        self._construct()
+        if static:
+            self._construct_static()
+        else:
+            self._construct()
 
     #
     # Properties
@@ -512,6 +982,9 @@ class DDG(Analysis):
         :rtype: networkx.DiGraph
         """
 
+        if self._stmt_graph is None:
+            self._compose_static_graphs()
+
         return self._stmt_graph
 
     @property
@@ -523,6 +996,9 @@ class DDG(Analysis):
         :rtype: networkx.DiGraph
         """
 
+        if self._data_graph is None:
+            self._compose_static_graphs()
+
         return self._data_graph
 
     @property
@@ -778,9 +1254,7 @@ class DDG(Analysis):
                         defs_for_next_node = LiveDefinitions()
                         live_defs_per_node[successing_node] = defs_for_next_node
 
-                    for var, code_loc_set in suc_new_defs.iteritems():
-                        # l.debug("Adding %d new definitions for variable %s.", len(code_loc_set), var)
-                        changed |= defs_for_next_node.add_defs(var, code_loc_set)
+                    changed |= defs_for_next_node.merge(suc_new_defs)
 
                 if changed:
                     if (self._call_depth is None) or \
@@ -790,6 +1264,137 @@ class DDG(Analysis):
                             nw = DDGJob(successor, new_call_depth)
                             self._worklist_append(nw, worklist, worklist_set)
 
+    def _construct_static(self):
+        """
+        Construct the data dependence graph of each function from the VEX statements of its blocks, and store them in
+        the knowledge base.
+        """
+
+        for func in self._static_functions():
+            self._stmt_graph = networkx.DiGraph()
+            self._data_graph = networkx.DiGraph()
+
+            self._construct_function_static(func)
+
+            self.kb.data_dependencies[func.addr] = FunctionDataDependencies(graph=self._stmt_graph,
+                                                                            data_graph=self._data_graph)
+            self._static_function_addrs.append(func.addr)
+
+        # the whole-program graphs are composed on demand
+        self._stmt_graph = None
+        self._data_graph = None
+        self._simplified_data_graph = None
+
+    def _static_functions(self):
+        """
+        Get all functions to analyze in static mode: the function at `start` and its callees up to `call_depth` calls
+        away, or every function if there is no `start`.
+
+        :return: A list of Function instances.
+        :rtype: list
+        """
+
+        functions = self.kb.functions
+
+        if self._start is None:
+            func_addrs = list(functions)
+        else:
+            depths = { self._start: 0 }
+            queue = [ self._start ]
+            while queue:
+                func_addr = queue.pop(0)
+                if self._call_depth is not None and depths[func_addr] >= self._call_depth:
+                    continue
+                if func_addr not in functions.callgraph:
+                    continue
+                for callee_addr in functions.callgraph.successors(func_addr):
+                    if callee_addr not in depths:
+                        depths[callee_addr] = depths[func_addr] + 1
+                        queue.append(callee_addr)
+            func_addrs = sorted(depths)
+
+        return [ functions[addr] for addr in func_addrs
+                 if functions.contains_addr(addr) and not functions[addr].is_simprocedure ]
+
+    def _construct_function_static(self, func):
+        """
+        Track data dependencies inside a function until a fixed point is reached.
+
+        :param knowledge.Function func: The function.
+        :return: None
+        """
+
+        if func.startpoint is None:
+            return
+
+        graph = func.graph
+        node_order = dict((n, i) for i, n in enumerate(CFGUtils.quasi_topological_sort_nodes(graph)))
+
+        # live definitions and stack pointer offsets at the beginning of each node
+        live_defs_per_node = { func.startpoint: LiveDefinitions() }
+        sp_per_node = { func.startpoint: (0, None) }
+
+        worklist = [ func.startpoint ]
+        worklist_set = { func.startpoint }
+
+        while worklist:
+            worklist.sort(key=lambda n: node_order.get(n, 0))
+            node = worklist.pop(0)
+            worklist_set.remove(node)
+
+            live_defs = live_defs_per_node[node].copy()
+            sp, bp = sp_per_node[node]
+            is_call = False
+
+            if isinstance(node, BlockNode) and (self._block_addrs is None or node.addr in self._block_addrs):
+                block = self.project.factory.block(node.addr, size=node.size, thumb=node.thumb)
+                processor = StaticBlockProcessor(self, block, live_defs, sp, bp)
+                processor.process()
+                sp, bp = processor.sp, processor.bp
+                is_call = block.vex.jumpkind == 'Ijk_Call'
+
+            for _, successor, data in graph.out_edges([node], data=True):
+                suc_defs, suc_sp = live_defs, sp
+                if data.get('type', None) == 'fake_return':
+                    suc_defs = self._filter_defs_at_call_sites(live_defs)
+                    if is_call and sp is not None and self.project.arch.call_pushes_ret:
+                        # the callee pops the return address
+                        suc_sp = sp + self.project.arch.bytes
+
+                if successor not in live_defs_per_node:
+                    live_defs_per_node[successor] = LiveDefinitions()
+                    sp_per_node[successor] = (suc_sp, bp)
+                    changed = True
+                else:
+                    changed = False
+                    old_sp, old_bp = sp_per_node[successor]
+                    new_sp = old_sp if old_sp == suc_sp else None
+                    new_bp = old_bp if old_bp == bp else None
+                    if (new_sp, new_bp) != (old_sp, old_bp):
+                        sp_per_node[successor] = (new_sp, new_bp)
+                        changed = True
+
+                changed |= live_defs_per_node[successor].merge(suc_defs)
+
+                if changed and successor not in worklist_set:
+                    worklist.append(successor)
+                    worklist_set.add(successor)
+
+    def _compose_static_graphs(self):
+        """
+        Assemble the whole-program graphs from the per-function results of static mode.
+        """
+
+        self._stmt_graph = networkx.DiGraph()
+        self._data_graph = networkx.DiGraph()
+
+        for func_addr in self._static_function_addrs:
+            deps = self.kb.data_dependencies[func_addr]
+            self._stmt_graph.add_edges_from(deps.graph.edges(data=True))
+            self._stmt_graph.add_nodes_from(deps.graph.nodes())
+            self._data_graph.add_edges_from(deps.data_graph.edges(data=True))
+            self._data_graph.add_nodes_from(deps.data_graph.nodes())
+
     def _track(self, state, live_defs, statements):
         """
         Given all live definitions prior to this program point, track the changes, and return a new list of live
@@ -1460,6 +2065,13 @@ class DDG(Analysis):
         Build dependency graphs for each function, and save them in self._function_data_dependencies.
         """
 
+        if self._static:
+            self._function_data_dependencies = dict(
+                (self.kb.functions[func_addr], self.kb.data_dependencies[func_addr].graph)
+                for func_addr in self._static_function_addrs
+            )
+            return
+
         # This is a map between functions and its corresponding dependencies
         self._function_data_dependencies = defaultdict(networkx.DiGraph)
 
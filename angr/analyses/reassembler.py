@@ -2153,18 +2153,14 @@ class Reassembler(Analysis):
             return False
 
         insn_addr = next(iter(cgcpl_memory_data.refs))[2]
-        # get the basic block
-        cfg_node = self.cfg.get_any_node(insn_addr, anyaddr=True)
-        if not cfg_node:
+        # get the function
+        function = self.cfg.functions.function_containing(insn_addr)
+        if function is None:
             return False
-
-        func_addr = cfg_node.function_address
+        func_addr = function.addr
 
         # this function should be calling another function
         sub_func_addr = None
-        if func_addr not in self.cfg.functions:
-            return False
-        function = self.cfg.functions[func_addr]
         # traverse the graph and make sure there is only one call edge
         calling_targets = [ ]
         for _, dst, data in function.transition_graph.edges(data=True):
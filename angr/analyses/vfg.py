@@ -1,4 +1,7 @@
 import logging
+import multiprocessing
+import cPickle
+from cStringIO import StringIO
 from collections import defaultdict
 
 import angr
@@ -9,7 +12,7 @@ from . import Analysis
 
 from .cfg.cfg_job_base import BlockID, FunctionKey, CFGJobBase
 from .cfg.cfg_utils import CFGUtils
-from .forward_analysis import ForwardAnalysis, AngrSkipJobNotice, AngrDelayJobNotice
+from .forward_analysis import ForwardAnalysis, CallGraphVisitor, AngrSkipJobNotice, AngrDelayJobNotice
 from .. import sim_options
 from ..engines import SimEngineProcedure
 from ..engines import SimSuccessors
@@ -17,6 +20,7 @@ from ..errors import AngrVFGError, AngrError, AngrVFGRestartAnalysisNotice, Angr
     SimIRSBError, SimError
 from ..procedures import SIM_PROCEDURES
 from ..state_plugins.callstack import CallStack
+from ..state_plugins.abstract_memory import SimAbstractMemory
 
 l = logging.getLogger("angr.analyses.vfg")
 
@@ -41,6 +45,8 @@ class VFGJob(CFGJobBase):
         self.call_skipped = False
         # if the call is skipped, calling stack of the skipped function is saved in `call_context_key`
         self.call_function_key = None  # type: FunctionKey
+        # if the call is skipped because a summary of the callee covers its initial state, that summary
+        self.call_summary = None  # type: FunctionSummary
 
         self.call_task = None  # type: CallAnalysis
 
@@ -121,6 +127,9 @@ class CallAnalysis(AnalysisTask):
         self.skipped = False
         self._final_jobs = [ ]
 
+        # initial states of the functions being called, keyed by function address
+        self.initial_states = { }
+
     def __repr__(self):
         s = "<Call @ %#08x with %d function tasks>" % (self.address, len(self.function_analysis_tasks))
         return s
@@ -163,6 +172,172 @@ class CallAnalysis(AnalysisTask):
         return job
 
 
+class FunctionSummary(object):
+    """
+    A value-set summary of a function: the state the function was entered with, and the state at its return site after
+    it has returned.
+    """
+
+    __slots__ = ('function_address', 'initial_state', 'final_state', )
+
+    def __init__(self, function_address, initial_state, final_state):
+        self.function_address = function_address
+        self.initial_state = initial_state
+        self.final_state = final_state
+
+    def __repr__(self):
+        return "<FunctionSummary of %#08x>" % self.function_address
+
+    def covers(self, state, plugin_whitelist=None):
+        """
+        Check if the initial state of this summary subsumes the given state. If it does, analyzing the function with the
+        given state cannot yield anything that is not already included in the final state of this summary.
+
+        Merging the states reports a change whenever the memory objects of the two states differ, even if their values
+        are the same, so the values of the merged state are compared with the values of the initial state of this
+        summary instead.
+
+        :param SimState state:          The initial state of the function, with its return address replaced with the
+                                        same placeholder as in the initial state of this summary.
+        :param tuple plugin_whitelist:  Names of the plugins to compare.
+        :return:                        True if the given state is covered, False otherwise.
+        :rtype:                         bool
+        """
+
+        merged_state, _, merging_occurred = self.initial_state.merge(state, plugin_whitelist=plugin_whitelist)
+        if not merging_occurred:
+            return True
+
+        for name in plugin_whitelist:
+            ours, merged = self.initial_state.get_plugin(name), merged_state.get_plugin(name)
+            if isinstance(ours, SimAbstractMemory):
+                for region_id, region in merged.regions.iteritems():
+                    our_region = ours.regions.get(region_id, None)
+                    if our_region is None or not self._same_values(our_region.memory, region.memory):
+                        return False
+            elif not self._same_values(ours, merged):
+                return False
+        return True
+
+    @staticmethod
+    def _same_values(ours, merged):
+        """
+        Check if the bytes of a memory are the same as the bytes of another memory it was merged into.
+
+        :param SimSymbolicMemory ours:      The memory.
+        :param SimSymbolicMemory merged:    The merged memory.
+        :return:                            True if all values are the same, False otherwise.
+        :rtype:                             bool
+        """
+
+        for addr in ours.changed_bytes(merged):
+            if addr not in ours.mem or addr not in merged.mem:
+                return False
+            our_byte = ours.mem[addr].bytes_at(addr, 1)
+            merged_byte = merged.mem[addr].bytes_at(addr, 1)
+            if our_byte is not merged_byte and not claripy.backends.vsa.identical(our_byte, merged_byte):
+                return False
+        return True
+
+    def apply(self, state, return_address, plugin_names):
+        """
+        Replace the values in a state at a return site with the values in the final state of this summary.
+
+        :param SimState state:      The state at the return site.
+        :param int return_address:  The return address.
+        :param tuple plugin_names:  Names of the plugins to replace.
+        :return:                    None
+        """
+
+        for name in plugin_names:
+            state.register_plugin(name, self.final_state.get_plugin(name).copy(), inhibit_init=True)
+        state.regs.ip = return_address
+
+
+class StackRelativeSummary(FunctionSummary):
+    """
+    A value-set summary of a function that was analyzed on its own, from an initial state that does not depend on any
+    call site. It covers every call to the function.
+
+    The stack of the function was not laid out below the stack of any caller, so only the effects of the function that
+    do not depend on the stack are kept when the summary is applied at a return site: the values it leaves in global
+    memory, and its return value unless that points to the stack. Values the function writes through pointers to the
+    stack of its caller are lost. A global byte that the function writes on some paths only is joined with the value it
+    has at the return site, since the value the function was summarized with is not the value of the caller.
+    """
+
+    __slots__ = ()
+
+    def __repr__(self):
+        return "<StackRelativeSummary of %#08x>" % self.function_address
+
+    def covers(self, state, plugin_whitelist=None):
+        return True
+
+    def apply(self, state, return_address, plugin_names):
+        """
+        Apply the effects of the function to a state at a return site, whose stack pointer has already been adjusted
+        and whose return value has already been cleared.
+
+        :param SimState state:      The state at the return site.
+        :param int return_address:  The return address.
+        :param tuple plugin_names:  Names of the plugins to update.
+        :return:                    None
+        """
+
+        if 'memory' in plugin_names:
+            initial_region = self.initial_state.memory.regions.get('global', None)
+            final_region = self.final_state.memory.regions.get('global', None)
+            if initial_region is not None and final_region is not None:
+                final_memory = final_region.memory
+                changed = [ addr for addr in initial_region.memory.changed_bytes(final_memory)
+                            if addr in final_memory.mem ]
+                if changed:
+                    if 'global' not in state.memory.regions:
+                        state.memory.create_region('global', state, False, None, state.memory.endness)
+                    memory = state.memory.regions['global'].memory
+                    initial_memory = initial_region.memory
+                    for addr in sorted(changed):
+                        final_byte = final_memory.mem[addr].bytes_at(addr, 1)
+                        if addr in initial_memory.mem and \
+                                not self._may_keep(initial_memory.mem[addr].bytes_at(addr, 1), final_byte):
+                            # the function overwrites the byte on every path
+                            value = final_byte
+                        elif addr in memory.mem:
+                            # the function may leave the byte alone, in which case it keeps the value of the caller
+                            value = memory.mem[addr].bytes_at(addr, 1).union(final_byte)
+                        else:
+                            value = state.se.TSI(8)
+                        memory.store(addr, value, inspect=False)
+
+        if 'registers' in plugin_names:
+            ret_offset = state.arch.ret_offset
+            ret_expr = self.final_state.registers.load(ret_offset)
+            model = ret_expr._model_vsa
+            if not isinstance(model, claripy.vsa.ValueSet) or \
+                    not any(region.startswith('stack_') for region, _ in model.items()):
+                state.registers.store(ret_offset, ret_expr)
+
+        state.regs.ip = return_address
+
+    @staticmethod
+    def _may_keep(initial_byte, final_byte):
+        """
+        Check if a byte of global memory may still hold its initial value when the function returns. The final value of
+        the byte is merged from every path through the function, so it includes the initial value if any path leaves
+        the byte alone.
+
+        :param initial_byte:    The value of the byte in the initial state of the summary.
+        :param final_byte:      The value of the byte in the final state of the summary.
+        :return:                True if the function may not write the byte, False if it writes it on every path.
+        :rtype:                 bool
+        """
+
+        if initial_byte is final_byte:
+            return True
+        return claripy.backends.vsa.identical(final_byte.union(initial_byte), final_byte)
+
+
 class VFGNode(object):
     """
     A descriptor of nodes in a Value-Flow Graph
@@ -220,6 +395,72 @@ class VFGNode(object):
             self.widened_state = s
 
 
+# the VFG instance that forked workers summarize functions for. It is set right before the pool is created, so every
+# worker inherits it (and its project, CFG and function summaries) through fork() instead of receiving a pickled copy.
+_summary_vfg = None
+
+
+def _summarize_function(vfg, function_address):
+    """
+    Analyze a function on its own, from an initial state that does not depend on any call site, and summarize it. The
+    functions it calls are not analyzed again if they are summarized already.
+
+    :param VFG vfg:                 The VFG that the function is summarized for.
+    :param int function_address:    Address of the function.
+    :return:                        The summary, or None if the function could not be analyzed or does not return.
+    :rtype:                         StackRelativeSummary
+    """
+
+    try:
+        function_vfg = vfg.project.analyses.VFG(vfg._cfg,
+                                                context_sensitivity_level=vfg._context_sensitivity_level,
+                                                start=function_address,
+                                                interfunction_level=vfg._interfunction_level,
+                                                avoid_runs=vfg._avoid_runs,
+                                                remove_options=vfg._state_options_to_remove,
+                                                timeout=vfg._timeout,
+                                                max_iterations_before_widening=vfg._max_iterations_before_widening,
+                                                max_iterations=vfg._max_iterations,
+                                                widening_interval=vfg._widening_interval,
+                                                function_summaries={ addr: list(summaries) for addr, summaries
+                                                                     in vfg._function_summaries.iteritems() },
+                                                )
+    except (AngrError, SimError):
+        l.warning("Failed to summarize function %#x.", function_address, exc_info=True)
+        return None
+
+    if function_vfg._start_final_state is None:
+        return None
+    return StackRelativeSummary(function_address, function_vfg._start_initial_state, function_vfg._start_final_state)
+
+
+def _summarize_worker(function_address):
+    """
+    Summarize a function inside a worker process.
+
+    :param int function_address:    Address of the function.
+    :return:                        The summary serialized with cPickle, or None if the function could not be
+                                    summarized or its summary could not be serialized.
+    """
+
+    vfg = _summary_vfg
+    summary = _summarize_function(vfg, function_address)
+    if summary is None:
+        return None
+
+    try:
+        f = StringIO()
+        pickler = cPickle.Pickler(f, cPickle.HIGHEST_PROTOCOL)
+        # the project is shared with the parent process
+        project = vfg.project
+        pickler.persistent_id = lambda obj: 'project' if obj is project else 'arch' if obj is project.arch else None
+        pickler.dump(summary)
+        return f.getvalue()
+    except Exception:  # pylint:disable=broad-except
+        l.warning("Failed to serialize the summary of function %#x in a worker.", function_address, exc_info=True)
+        return None
+
+
 class VFG(ForwardAnalysis, Analysis):   # pylint:disable=abstract-method
     """
     This class represents a control-flow graph with static analysis result.
@@ -256,7 +497,11 @@ class VFG(ForwardAnalysis, Analysis):   # pylint:disable=abstract-method
                  widening_interval=3,
                  final_state_callback=None,
                  status_callback=None,
-                 record_function_final_states=False
+                 record_function_final_states=False,
+                 reuse_function_summaries=False,
+                 function_summaries=None,
+                 bottom_up=False,
+                 processes=None,
                  ):
         """
         :param cfg: The control-flow graph to base this analysis on. If none is provided, we will
@@ -270,6 +515,18 @@ class VFG(ForwardAnalysis, Analysis):   # pylint:disable=abstract-method
         :param remove_options: State options to remove from the initial state. It only works when `initial_state` is
                                 None
         :param int timeout:
+        :param bool reuse_function_summaries:   Summarize each analyzed callee by its initial and final states, and do
+                                                not analyze a callee again if its initial state is covered by the
+                                                initial state of one of its summaries.
+        :param dict function_summaries: A dict that maps function addresses to lists of FunctionSummary instances to
+                                        start with, e.g. from another VFG. New summaries are added to it. Implies
+                                        reuse_function_summaries.
+        :param bool bottom_up:  Before the analysis starts, summarize every function that is reachable from the start
+                                function in the call graph on its own, callees first, from an initial state that does
+                                not depend on any call site. Calls to these functions are then not analyzed inline, but
+                                replaced by the effects in their StackRelativeSummary. Implies reuse_function_summaries.
+        :param int processes:   Summarize the functions that do not call each other in this many forked worker
+                                processes. Implies bottom_up.
         """
 
         ForwardAnalysis.__init__(self, order_jobs=True, allow_merging=True, allow_widening=True,
@@ -302,6 +559,19 @@ class VFG(ForwardAnalysis, Analysis):   # pylint:disable=abstract-method
 
         self._record_function_final_states = record_function_final_states
 
+        self._processes = processes
+        self._bottom_up = bottom_up or processes is not None
+        self._reuse_function_summaries = reuse_function_summaries or function_summaries is not None or \
+                                         self._bottom_up
+        # Summaries of each function, keyed by function address
+        self._function_summaries = defaultdict(list)
+        if function_summaries is not None:
+            self._function_summaries.update(function_summaries)
+        self._external_function_summaries = function_summaries
+        # Initial state of the start function, and the merged state after it returns
+        self._start_initial_state = None
+        self._start_final_state = None
+
         self._nodes = {}            # all the vfg nodes, keyed on block IDs
         self._normal_states = { }   # Last available state for each program point without widening
         self._widened_states = { }  # States on which widening has occurred
@@ -388,6 +658,10 @@ class VFG(ForwardAnalysis, Analysis):   # pylint:disable=abstract-method
     def function_final_states(self):
         return self._function_final_states
 
+    @property
+    def function_summaries(self):
+        return self._function_summaries
+
     #
     # Public methods
     #
@@ -469,6 +743,9 @@ class VFG(ForwardAnalysis, Analysis):   # pylint:disable=abstract-method
             l.warning("The given CFG is not normalized, which might impact the performance/accuracy of the VFG "
                       "analysis.")
 
+        if self._bottom_up:
+            self._summarize_callees()
+
         # Prepare the state
         initial_state = self._prepare_initial_state(self._start, self._initial_state)
         initial_state.ip = self._start
@@ -489,6 +766,10 @@ class VFG(ForwardAnalysis, Analysis):   # pylint:disable=abstract-method
             self._final_address = 0x4fff0000
             self._set_return_address(state, self._final_address)
 
+            if self._reuse_function_summaries:
+                self._start_initial_state = self._summary_state(state)
+                self._start_final_state = None
+
         call_stack = None
         if not self._start_at_function:
             # we should build a custom call stack
@@ -565,6 +846,14 @@ class VFG(ForwardAnalysis, Analysis):   # pylint:disable=abstract-method
         if self._final_address is not None and job.addr == self._final_address:
             # our analysis should be termianted here
             l.debug("%s is viewed as a final state. Skip.", job)
+            if self._start_initial_state is not None:
+                # keep the final state of the start function for its summary
+                if self._start_final_state is None:
+                    self._start_final_state = job.state.copy()
+                else:
+                    self._start_final_state = self._start_final_state.merge(job.state,
+                                                                           plugin_whitelist=self._mergeable_plugins
+                                                                           )[0]
             raise AngrSkipJobNotice()
 
         l.debug("Handling VFGJob %s", job)
@@ -798,7 +1087,27 @@ class VFG(ForwardAnalysis, Analysis):   # pylint:disable=abstract-method
 
             new_function_key = FunctionKey.new(successor_addr, new_call_stack_suffix)
             # Save the initial state for the function
-            self._save_function_initial_state(new_function_key, successor_addr, successor.copy())
+            function_initial_state = successor.copy()
+            self._save_function_initial_state(new_function_key, successor_addr, function_initial_state)
+
+            # bail out if the function has been analyzed with an initial state that covers this one
+            if self._reuse_function_summaries and fakeret_successor is not None:
+                summary_state = self._summary_state(successor)
+                summary = self._get_function_summary(successor_addr, summary_state)
+                if summary is not None:
+                    l.debug('We are not tracing into a new function %#08x as %s covers it', successor_addr, summary)
+
+                    job.dbg_exit_status[successor] = "Skipped (summarized)"
+
+                    job.call_skipped = True
+                    job.call_function_key = new_function_key
+                    job.call_summary = summary
+
+                    job.call_task.skipped = True
+
+                    return [ ]
+
+                job.call_task.initial_states[successor_addr] = summary_state
 
             # bail out if we hit the interfunction_level cap
             if len(job.call_stack) >= self._interfunction_level:
@@ -952,6 +1261,9 @@ class VFG(ForwardAnalysis, Analysis):   # pylint:disable=abstract-method
                                 # merge all jobs, and create a new job
                                 new_job = task.merge_jobs()
 
+                                if self._reuse_function_summaries:
+                                    self._save_function_summary(task, new_job.state)
+
                                 # register the job to the top task
                                 self._top_task.jobs.append(new_job)
 
@@ -1077,7 +1389,13 @@ class VFG(ForwardAnalysis, Analysis):   # pylint:disable=abstract-method
             l.debug("Tracing a missing return %s", repr(pending_ret_key))
 
     def _post_analysis(self):
-        pass
+
+        if self._start_initial_state is not None and self._start_final_state is not None:
+            self._add_function_summary(FunctionSummary(self._function_start,
+                                                       self._start_initial_state,
+                                                       self._start_final_state
+                                                       )
+                                       )
 
     #
     # State widening, merging, and narrowing
@@ -1402,19 +1720,28 @@ class VFG(ForwardAnalysis, Analysis):   # pylint:disable=abstract-method
             # callee does not return normally, but don't process them right away.
 
             # Clear the useless values (like return addresses, parameters) on stack if needed
-            if self._cfg is not None:
-                current_function = self.kb.functions.function(job.call_target)
-                if current_function is not None:
-                    sp_difference = current_function.sp_delta
-                else:
-                    sp_difference = 0
-                reg_sp_offset = successor_state.arch.sp_offset
-                reg_sp_expr = successor_state.registers.load(reg_sp_offset) + sp_difference
-                successor_state.registers.store(successor_state.arch.sp_offset, reg_sp_expr)
+            if job.call_summary is not None and not isinstance(job.call_summary, StackRelativeSummary):
+                # the callee is summarized. its final state tells us what the values are after it returns
+                job.call_summary.apply(successor_state, successor_addr, self._mergeable_plugins)
 
-                # Clear the return value with a TOP
-                top_si = successor_state.se.TSI(successor_state.arch.bits)
-                successor_state.registers.store(successor_state.arch.ret_offset, top_si)
+            else:
+                if self._cfg is not None:
+                    current_function = self.kb.functions.function(job.call_target)
+                    if current_function is not None:
+                        sp_difference = current_function.sp_delta
+                    else:
+                        sp_difference = 0
+                    reg_sp_offset = successor_state.arch.sp_offset
+                    reg_sp_expr = successor_state.registers.load(reg_sp_offset) + sp_difference
+                    successor_state.registers.store(successor_state.arch.sp_offset, reg_sp_expr)
+
+                    # Clear the return value with a TOP
+                    top_si = successor_state.se.TSI(successor_state.arch.bits)
+                    successor_state.registers.store(successor_state.arch.ret_offset, top_si)
+
+                if job.call_summary is not None:
+                    # the callee was summarized on its own. apply its effects on top of the state of the caller
+                    job.call_summary.apply(successor_state, successor_addr, self._mergeable_plugins)
 
             if job.call_skipped:
 
@@ -1693,6 +2020,153 @@ class VFG(ForwardAnalysis, Analysis):   # pylint:disable=abstract-method
         else:
             self._function_final_states[function_address][function_key] = state
 
+    #
+    # Function summaries
+    #
+
+    def _get_function_summary(self, function_address, state):
+        """
+        Find a summary of a function whose initial state covers the given state. Summaries of the function from a call
+        site are preferred over a summary of the function on its own, which is less precise.
+
+        :param int function_address:    Address of the function.
+        :param SimState state:          Initial state of the function, as returned by _summary_state().
+        :return:                        The summary, or None if there is no such summary.
+        :rtype:                         FunctionSummary
+        """
+
+        summaries = self._function_summaries.get(function_address, ())
+        for summary in summaries:
+            if not isinstance(summary, StackRelativeSummary) and \
+                    summary.covers(state, plugin_whitelist=self._mergeable_plugins):
+                return summary
+        for summary in summaries:
+            if isinstance(summary, StackRelativeSummary):
+                return summary
+        return None
+
+    def _summary_state(self, state):
+        """
+        Make a copy of the initial state of a function that does not depend on the call site: its return address is
+        replaced with a placeholder, so that calls to the function from different places can share summaries.
+
+        :param SimState state:  The initial state of the function.
+        :return:                The new state.
+        :rtype:                 SimState
+        """
+
+        state = state.copy()
+        placeholder = state.se.BVV(0, self.project.arch.bits)
+
+        if self.project.arch.name in ('X86', 'AMD64'):
+            # the return address has been pushed onto the stack
+            state.memory.store(state.regs.sp, placeholder, endness=self.project.arch.memory_endness)
+        elif self.project.arch.name in ('ARMEL', 'ARMHF', 'AARCH64', 'PPC32', 'PPC64'):
+            state.regs.lr = placeholder
+        elif self.project.arch.name in ('MIPS32', 'MIPS64'):
+            state.regs.ra = placeholder
+
+        return state
+
+    def _save_function_summary(self, call_task, final_state):
+        """
+        Summarize the function that a finished call analysis task has analyzed.
+
+        :param CallAnalysis call_task:  The call analysis task.
+        :param SimState final_state:    The merged state after the function returns.
+        :return:                        None
+        """
+
+        if len(call_task.function_analysis_tasks) != 1 or len(call_task.initial_states) != 1:
+            # we cannot tell which callee the final state belongs to
+            return
+
+        function_address, initial_state = call_task.initial_states.items()[0]
+        self._add_function_summary(FunctionSummary(function_address, initial_state, final_state.copy()))
+
+    def _add_function_summary(self, summary):
+        """
+        Add a function summary, and share it with the dict of summaries we were given, if there is one.
+
+        :param FunctionSummary summary: The summary to add.
+        :return:                        None
+        """
+
+        l.debug('Saving %s', summary)
+
+        self._function_summaries[summary.function_address].append(summary)
+        if self._external_function_summaries is not None:
+            self._external_function_summaries[summary.function_address] = \
+                self._function_summaries[summary.function_address]
+
+    def _summarize_callees(self):
+        """
+        Summarize all functions that are reachable from the start function in the call graph, each on its own. Functions
+        are summarized bottom-up: a function is only summarized after all functions it calls are, so that its analysis
+        applies their summaries instead of analyzing them again. Functions that do not call each other are summarized
+        in parallel in forked worker processes if more than one process is allowed.
+
+        :return: None
+        """
+
+        global _summary_vfg  # pylint:disable=global-statement
+
+        callgraph = self.kb.functions.callgraph
+        if self._function_start not in callgraph:
+            return
+
+        reachable = networkx.descendants(callgraph, self._function_start)
+        reachable.discard(self._function_start)
+        if not reachable:
+            return
+
+        # the call graph visitor orders callers before callees. walk it backwards, and place each function one level
+        # above the highest of its callees that has been placed already (recursive calls are ignored)
+        subgraph = callgraph.subgraph(reachable)
+        levels = { }
+        for func_addr in reversed(list(CallGraphVisitor(subgraph).nodes())):
+            callee_levels = [ levels[callee] for callee in subgraph.successors(func_addr) if callee in levels ]
+            levels[func_addr] = max(callee_levels) + 1 if callee_levels else 0
+
+        waves = defaultdict(list)
+        for func_addr, level in levels.iteritems():
+            if not self.kb.functions.contains_addr(func_addr) or self.kb.functions[func_addr].is_simprocedure:
+                continue
+            if any(isinstance(s, StackRelativeSummary) for s in self._function_summaries.get(func_addr, ())):
+                continue
+            waves[level].append(func_addr)
+
+        shared = { 'project': self.project, 'arch': self.project.arch }
+        for level in sorted(waves):
+            func_addrs = sorted(waves[level])
+
+            if self._processes is None or self._processes <= 1 or len(func_addrs) == 1:
+                summaries = [ _summarize_function(self, func_addr) for func_addr in func_addrs ]
+
+            else:
+                _summary_vfg = self
+                pool = multiprocessing.Pool(processes=self._processes)
+                try:
+                    results = pool.map(_summarize_worker, func_addrs, chunksize=1)
+                finally:
+                    pool.close()
+                    pool.join()
+                    _summary_vfg = None
+
+                summaries = [ ]
+                for r in results:
+                    if r is None:
+                        continue
+                    unpickler = cPickle.Unpickler(StringIO(r))
+                    unpickler.persistent_load = shared.__getitem__
+                    summaries.append(unpickler.load())
+
+            for summary in summaries:
+                if summary is not None:
+                    self._add_function_summary(summary)
+
+        l.debug("Summarized %d functions in %d levels of the call graph.", len(levels), len(waves))
+
     def _trace_pending_job(self, job_key):
 
         state, call_stack = self._pending_returns.pop(job_key)
@@ -18,6 +18,16 @@ class SimConcretizationStrategy(object):
         self._exact = exact
         self._filter = filter
 
+    def _model_cache(self, memory, kwargs):
+        """
+        Get the cache of models of the state, if it can answer a query with these arguments.
+        """
+        if o.CONCRETIZATION_MODEL_CACHE not in memory.state.options:
+            return None
+        if not kwargs.get('exact', self._exact) or any(k not in ('exact', 'extra_constraints') for k in kwargs):
+            return None
+        return getattr(memory, 'concretization_models', None)
+
     def _min(self, memory, addr, **kwargs):
         """
         Gets the minimum solution of an address.
@@ -34,12 +44,28 @@ class SimConcretizationStrategy(object):
         """
         Gets any solution of an address.
         """
+        models = self._model_cache(memory, kwargs)
+        if models is not None:
+            extra_constraints = kwargs.get('extra_constraints', ())
+            values = models.values(memory.state, addr, 1, extra_constraints=extra_constraints)
+            if values:
+                models.hits += 1
+                return values[0]
+            models.misses += 1
+            return models.solve(memory.state, addr, extra_constraints=extra_constraints)
         return memory.state.se.eval(addr, exact=kwargs.pop('exact', self._exact), **kwargs)
 
     def _eval(self, memory, addr, n, **kwargs):
         """
         Gets n solutions for an address.
         """
+        models = self._model_cache(memory, kwargs)
+        if models is not None:
+            values = models.values(memory.state, addr, n, extra_constraints=kwargs.get('extra_constraints', ()))
+            if len(values) == n:
+                models.hits += 1
+                return values
+            models.misses += 1
         return memory.state.se.eval_upto(addr, n, exact=kwargs.pop('exact', self._exact), **kwargs)
 
     def _range(self, memory, addr, **kwargs):
@@ -48,6 +74,20 @@ class SimConcretizationStrategy(object):
         """
         return (self._min(memory, addr, **kwargs), self._max(memory, addr, **kwargs))
 
+    def _exceeds_range(self, memory, addr, limit, **kwargs):
+        """
+        Checks, without the solver, if the solutions of an address are known to span more than limit. Returns False
+        if that is not known.
+        """
+        models = self._model_cache(memory, kwargs)
+        if models is None:
+            return False
+        values = models.values(memory.state, addr, models.size, extra_constraints=kwargs.get('extra_constraints', ()))
+        if len(values) > 1 and max(values) - min(values) > limit:
+            models.hits += 1
+            return True
+        return False
+
     def concretize(self, memory, addr):
         """
         Concretizes the address into a list of values.
@@ -76,6 +116,7 @@ class SimConcretizationStrategy(object):
         """
         pass
 
+from .model_cache import SimConcretizationModelCache
 from .any import SimConcretizationStrategyAny
 from .controlled_data import SimConcretizationStrategyControlledData
 from .eval import SimConcretizationStrategyEval
@@ -87,3 +128,5 @@ from .norepeats_range import SimConcretizationStrategyNorepeatsRange
 from .range import SimConcretizationStrategyRange
 from .single import SimConcretizationStrategySingle
 from .solutions import SimConcretizationStrategySolutions
+
+from .. import sim_options as o
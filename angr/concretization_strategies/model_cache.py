@@ -0,0 +1,142 @@
+import itertools
+
+import claripy
+
+
+class _Model(object):
+    """
+    An assignment of concrete values to some symbolic variables.
+    """
+
+    __slots__ = ('replacements', 'variables', 'verified', )
+
+    def __init__(self, leaves, values):
+        self.replacements = tuple(
+            (leaf, claripy.BoolV(v) if isinstance(leaf, claripy.ast.Bool) else claripy.BVV(v, leaf.length))
+            for leaf, v in zip(leaves, values)
+        )
+        self.variables = frozenset(leaf.args[0] for leaf in leaves)
+        # the keys of the clusters of constraints this model is known to satisfy
+        self.verified = set()
+
+    def evaluate(self, expr):
+        """
+        Evaluate an expression under this model.
+
+        :return:    The value of the expression, or None if the model does not assign all of its variables.
+        """
+        if not expr.variables <= self.variables:
+            return None
+        for leaf, value in self.replacements:
+            if leaf.args[0] in expr.variables:
+                expr = expr.replace(leaf, value)
+        v = expr._model_concrete
+        return v if isinstance(v, bool) else v.value
+
+    def satisfies(self, clusters, constraints):
+        """
+        Check if this model satisfies some clusters of constraints, and some other constraints.
+        """
+        for cluster in clusters:
+            if cluster.key in self.verified:
+                continue
+            if not all(self.evaluate(c) is True for c in cluster.constraints):
+                return False
+            self.verified.add(cluster.key)
+        return all(self.evaluate(c) is True for c in constraints)
+
+
+class SimConcretizationModelCache(object):
+    """
+    A cache of recent satisfying models of the constraints of a state, shared by the concretization strategies of
+    its memory when the CONCRETIZATION_MODEL_CACHE option is enabled. Strategies evaluate addresses against these
+    models before asking the solver.
+
+    A model is only used if it satisfies the independent clusters of constraints the address depends on, which is
+    checked every time it is used. Models therefore never go stale, and the copies of a state share them.
+
+    :ivar int hits:     The number of concretizations that were served from cache.
+    :ivar int misses:   The number of concretizations that needed the solver.
+    """
+
+    def __init__(self, size=8, models=None, hits=0, misses=0):
+        """
+        :param int size:    The maximum number of cached models. The least recent models are evicted first.
+        """
+        self.size = size
+        self.models = [ ] if models is None else models
+        self.hits = hits
+        self.misses = misses
+
+    def __repr__(self):
+        return "<SimConcretizationModelCache with %d models: %d hits, %d misses>" % (len(self.models), self.hits,
+                                                                                    self.misses)
+
+    def copy(self):
+        return SimConcretizationModelCache(size=self.size, models=list(self.models), hits=self.hits,
+                                           misses=self.misses)
+
+    @staticmethod
+    def _dependencies(state, expr, extra_constraints):
+        variables = set(expr.variables)
+        for c in extra_constraints:
+            variables.update(c.variables)
+        return state.se._independent_constraints(variables)
+
+    def values(self, state, expr, n, extra_constraints=()):
+        """
+        Evaluate an expression under the cached models.
+
+        :param state:               The state whose constraints the models should satisfy.
+        :param expr:                The expression.
+        :param int n:               The maximum number of values.
+        :param extra_constraints:   Extra constraints the models should satisfy.
+        :return:                    A list of at most n distinct values, from the most recent models first.
+        """
+        if not self.models:
+            return [ ]
+
+        clusters, ground = self._dependencies(state, expr, extra_constraints)
+        constraints = ground + tuple(extra_constraints)
+        values = [ ]
+        for model in self.models:
+            if not model.satisfies(clusters, constraints):
+                continue
+            v = model.evaluate(expr)
+            if v is not None and v not in values:
+                values.append(v)
+                if len(values) >= n:
+                    break
+        return values
+
+    def solve(self, state, expr, extra_constraints=()):
+        """
+        Evaluate an expression with the solver, and cache the model its value comes from.
+
+        :param state:               The state.
+        :param expr:                The expression.
+        :param extra_constraints:   Extra constraints for this solve.
+        :return:                    A value of the expression.
+        """
+        clusters, ground = self._dependencies(state, expr, extra_constraints)
+
+        leaves = { }
+        for e in itertools.chain((expr, ), extra_constraints, ground, *(c.constraints for c in clusters)):
+            for leaf in e.leaf_asts():
+                if leaf.symbolic:
+                    leaves[leaf.args[0]] = leaf
+        leaves = leaves.values()
+        if not all(isinstance(leaf, (claripy.ast.BV, claripy.ast.Bool)) for leaf in leaves):
+            return state.se.eval(expr, extra_constraints=extra_constraints)
+
+        solutions = state.se.batch_eval([ expr ] + leaves, 1, extra_constraints=extra_constraints)
+        if not solutions:
+            raise SimUnsatError("No solution for %s" % expr)
+
+        model = _Model(leaves, solutions[0][1:])
+        model.verified.update(c.key for c in clusters)
+        self.models.insert(0, model)
+        del self.models[self.size:]
+        return solutions[0][0]
+
+from ..errors import SimUnsatError
@@ -10,6 +10,8 @@ class SimConcretizationStrategyRange(SimConcretizationStrategy):
         self._limit = limit
 
     def _concretize(self, memory, addr):
+        if self._exceeds_range(memory, addr, self._limit):
+            return None
         mn,mx = self._range(memory, addr)
         if mx - mn <= self._limit:
             return self._eval(memory, addr, self._limit)
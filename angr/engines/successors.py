@@ -33,11 +33,11 @@ class SimSuccessors(object):
         self.addr = addr
         self.initial_state = initial_state
 
-        self.successors = [ ]
+        self._successors = [ ]
         self.all_successors = [ ]
-        self.flat_successors = [ ]
-        self.unsat_successors = [ ]
-        self.unconstrained_successors = [ ]
+        self._flat_successors = [ ]
+        self._unsat_successors = [ ]
+        self._unconstrained_successors = [ ]
 
         # the engine that should process or did process this request
         self.engine = None
@@ -46,6 +46,10 @@ class SimSuccessors(object):
         self.sort = None
         self.artifacts = {}
 
+        # successors whose categorization is deferred until all the successors of the step are known, or until any of
+        # the successor lists is read, as tuples of the state and the target, guard and jumpkind of its exit
+        self._pending = [ ]
+
     @classmethod
     def failure(cls):
         return cls(None, None)
@@ -74,6 +78,46 @@ class SimSuccessors(object):
         return not self.all_successors and not self.flat_successors and not self.unsat_successors and \
                not self.unconstrained_successors
 
+    #
+    # Successor lists. Reading any of them categorizes the pending successors first
+    #
+
+    @property
+    def successors(self):
+        self._categorize_pending_successors()
+        return self._successors
+
+    @successors.setter
+    def successors(self, v):
+        self._successors = v
+
+    @property
+    def flat_successors(self):
+        self._categorize_pending_successors()
+        return self._flat_successors
+
+    @flat_successors.setter
+    def flat_successors(self, v):
+        self._flat_successors = v
+
+    @property
+    def unsat_successors(self):
+        self._categorize_pending_successors()
+        return self._unsat_successors
+
+    @unsat_successors.setter
+    def unsat_successors(self, v):
+        self._unsat_successors = v
+
+    @property
+    def unconstrained_successors(self):
+        self._categorize_pending_successors()
+        return self._unconstrained_successors
+
+    @unconstrained_successors.setter
+    def unconstrained_successors(self, v):
+        self._unconstrained_successors = v
+
     def __getitem__(self, k):
         return self.flat_successors[k]
 
@@ -114,6 +158,11 @@ class SimSuccessors(object):
         state.scratch.exit_ins_addr = exit_ins_addr
 
         self._preprocess_successor(state, add_guard=add_guard)
+        if o.BATCHED_SUCCESSOR_CHECKS in state.options:
+            # the exit breakpoint fires once the state is categorized
+            self.all_successors.append(state)
+            self._pending.append((state, target, guard, jumpkind))
+            return
         self._categorize_successor(state)
         state._inspect('exit', BP_AFTER, exit_target=target, exit_guard=guard, exit_jumpkind=jumpkind)
         state.inspect.downsize()
@@ -152,7 +201,7 @@ class SimSuccessors(object):
         if self.initial_state.arch.sp_offset is not None:
             self._manage_callstack(state)
 
-        if len(self.successors) != 0:
+        if len(self._successors) != 0 or self._pending:
             # This is a fork!
             state._inspect('fork', BP_AFTER)
 
@@ -206,16 +255,104 @@ class SimSuccessors(object):
                 state._inspect('return', BP_AFTER)
 
 
-    def _categorize_successor(self, state):
+    def _categorize_pending_successors(self):
+        """
+        Categorize the successors that were added with BATCHED_SUCCESSOR_CHECKS enabled. This is called once all the
+        successors of the step have been added, or as soon as any of the successor lists is read.
+        """
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, [ ]
+        satisfiable = self._check_satisfiability([ state for state, _, _, _ in pending
+                                                   if self._needs_satisfiability_check(state) ])
+        for state, _, _, _ in pending:
+            self._categorize_successor(state, satisfiable=satisfiable.get(id(state), None), added=True)
+        for state, target, guard, jumpkind in pending:
+            state._inspect('exit', BP_AFTER, exit_target=target, exit_guard=guard, exit_jumpkind=jumpkind)
+            state.inspect.downsize()
+
+    @staticmethod
+    def _has_batchable_solver(state):
+        """
+        Check if the satisfiability of a state is decided by an exact check of its solver.
+        """
+        if o.LAZY_SOLVES in state.options or o.SYMBOLIC not in state.options:
+            return False
+        if { o.APPROXIMATE_GUARDS, o.APPROXIMATE_SATISFIABILITY, o.ABSTRACT_SOLVER, o.REPLACEMENT_SOLVER } & \
+                state.options:
+            return False
+        return True
+
+    @staticmethod
+    def _needs_satisfiability_check(state):
+        """
+        Check if a successor will be categorized based on a satisfiability check that can be batched.
+        """
+        if not SimSuccessors._has_batchable_solver(state):
+            return False
+        # successors with a concretely false guard are unsat without asking the solver
+        return state.scratch.guard.symbolic or not state.se.is_false(state.scratch.guard)
+
+    def _check_satisfiability(self, states):
+        """
+        Check the satisfiability of several successor states through the solver of the state the step started from.
+
+        The successors of a step usually share all the constraints of that state, which its solver has already
+        asserted and found models for. Every successor is checked by passing its own constraints (usually just the guard
+        of its exit) as extra constraints to that solver, through the solver plugin, so that the solver result cache and
+        sliced queries are used as for any other query. A satisfiable successor then continues with a branch of that
+        solver, which carries over the models that were found, including one that satisfies its guard.
+
+        Successors that do not extend the constraints of the initial state, or that use a different kind of solver, are
+        checked on their own.
+
+        :param list states: The successor states.
+        :return:            A dict mapping the id of every state to whether its constraints are satisfiable.
+        """
+        parent = self.initial_state
+        if len(states) < 2 or any(s is parent for s in states) or not self._has_batchable_solver(parent):
+            return { id(s): s.satisfiable() for s in states }
+
+        parent_solver = parent.se._solver
+        parent_constraints = set(hash(c) for c in parent_solver.constraints)
+
+        results = { }
+        for state in states:
+            constraints = state.se.constraints
+            hashes = set(hash(c) for c in constraints)
+            if type(state.se._solver) is not type(parent_solver) or not parent_constraints.issubset(hashes):
+                results[id(state)] = state.satisfiable()
+                continue
+
+            extra_constraints = [ c for c in constraints if hash(c) not in parent_constraints ]
+            try:
+                sat = parent.se.satisfiable(extra_constraints=extra_constraints)
+            except (SimSolverError, claripy.ClaripyError):
+                l.warning("Batched satisfiability check failed, falling back to checking %s alone.", state,
+                          exc_info=True)
+                results[id(state)] = state.satisfiable()
+                continue
+
+            if sat:
+                solver = parent_solver.branch()
+                solver.add(extra_constraints)
+                state.se._stored_solver = solver
+            results[id(state)] = sat
+        return results
+
+    def _categorize_successor(self, state, satisfiable=None, added=False):
         """
         Append state into successor lists.
 
-        :param state: a SimState instance
-        :param target: The target (of the jump/call/ret)
+        :param state:               a SimState instance
+        :param bool satisfiable:    Whether the state is known to be satisfiable, or None if it is not known.
+        :param bool added:          Whether the state is already in all_successors.
         :return: The state
         """
 
-        self.all_successors.append(state)
+        if not added:
+            self.all_successors.append(state)
         target = state.scratch.target
 
         # categorize the state
@@ -223,25 +360,26 @@ class SimSuccessors(object):
             if o.VALIDATE_APPROXIMATIONS in state.options:
                 if state.satisfiable():
                     raise Exception('WTF')
-            self.unsat_successors.append(state)
+            self._unsat_successors.append(state)
         elif o.APPROXIMATE_SATISFIABILITY in state.options and not state.se.satisfiable(exact=False):
             if o.VALIDATE_APPROXIMATIONS in state.options:
                 if state.se.satisfiable():
                     raise Exception('WTF')
-            self.unsat_successors.append(state)
+            self._unsat_successors.append(state)
         elif not state.scratch.guard.symbolic and state.se.is_false(state.scratch.guard):
-            self.unsat_successors.append(state)
-        elif o.LAZY_SOLVES not in state.options and not state.satisfiable():
-            self.unsat_successors.append(state)
+            self._unsat_successors.append(state)
+        elif o.LAZY_SOLVES not in state.options and \
+                not (state.satisfiable() if satisfiable is None else satisfiable):
+            self._unsat_successors.append(state)
         elif o.NO_SYMBOLIC_JUMP_RESOLUTION in state.options and state.se.symbolic(target):
-            self.unconstrained_successors.append(state)
+            self._unconstrained_successors.append(state)
         elif not state.se.symbolic(target) and not state.history.jumpkind.startswith("Ijk_Sys"):
             # a successor with a concrete IP, and it's not a syscall
-            self.successors.append(state)
-            self.flat_successors.append(state)
+            self._successors.append(state)
+            self._flat_successors.append(state)
         elif state.history.jumpkind.startswith("Ijk_Sys"):
             # syscall
-            self.successors.append(state)
+            self._successors.append(state)
 
             # Misuse the ip_at_syscall register to save the return address for this syscall
             # state.ip *might be* changed to be the real address of syscall SimProcedures by syscall handling code in
@@ -257,15 +395,15 @@ class SimSuccessors(object):
                         split_state.inspect.downsize()
                         self._fix_syscall_ip(split_state)
 
-                        self.flat_successors.append(split_state)
+                        self._flat_successors.append(split_state)
                 else:
                     # We cannot resolve the syscall number
                     # However, we still put it to the flat_successors list, and angr.SimOS.handle_syscall will pick it
                     # up, and create a "unknown syscall" stub for it.
                     self._fix_syscall_ip(state)
-                    self.flat_successors.append(state)
+                    self._flat_successors.append(state)
             except AngrUnsupportedSyscallError:
-                self.unsat_successors.append(state)
+                self._unsat_successors.append(state)
 
         else:
             # a successor with a symbolic IP
@@ -288,7 +426,7 @@ class SimSuccessors(object):
                         "Exit state has over 257 possible solutions. Likely unconstrained; skipping. %s",
                         target.shallow_repr()
                     )
-                    self.unconstrained_successors.append(state)
+                    self._unconstrained_successors.append(state)
                 else:
                     for a in addrs:
                         split_state = state.copy()
@@ -298,10 +436,10 @@ class SimSuccessors(object):
                             split_state.add_constraints(target == a, action=True)
                             split_state.regs.ip = a
                         split_state.inspect.downsize()
-                        self.flat_successors.append(split_state)
-                    self.successors.append(state)
+                        self._flat_successors.append(split_state)
+                    self._successors.append(state)
             except SimSolverModeError:
-                self.unsat_successors.append(state)
+                self._unsat_successors.append(state)
 
         return state
 
@@ -370,7 +508,7 @@ class SimSuccessors(object):
 
 
 from ..state_plugins.inspect import BP_BEFORE, BP_AFTER
-from ..errors import SimSolverModeError, AngrUnsupportedSyscallError, SimValueError
+from ..errors import SimSolverError, SimSolverModeError, AngrUnsupportedSyscallError, SimValueError
 from ..calling_conventions import SYSCALL_CC
 from ..state_plugins.sim_action_object import _raw_ast
 from ..state_plugins.callstack import CallStack
@@ -0,0 +1,187 @@
+"""
+Compilation of IRSBs into lists of specialized statement handlers.
+
+Executing a statement through translate_stmt() instantiates a SimIRStmt object, and a SimIRExpr object for every
+expression it contains, every time the statement is executed. Compiling an IRSB resolves everything that only depends
+on the IRSB once: register offsets and sizes, temp numbers, constants and IROp handlers. The result is one closure per
+statement, taking the state and the SimSuccessors, which is reused every time the block is executed.
+
+Only integer expressions and the statements that do not record anything in the SimSuccessors are compiled. Every other
+statement is compiled into a call to the engine's generic statement handler. Compiled handlers assume that none of the
+options in COMPILE_BLOCKERS is set, and that no breakpoints are set.
+"""
+
+import logging
+
+import claripy
+from pyvex.const import get_type_size
+
+from ... import sim_options as o
+from ...errors import SimValueError, SimStatementError, SimOperationError, SimReliftException, UnsupportedIROpError
+from .irop import operations, translate_inner
+
+l = logging.getLogger("angr.engines.vex.compiler")
+
+# options that need the statement and expression objects, or that change the semantics of compiled statements
+COMPILE_BLOCKERS = o.refs | { o.TRACK_OP_ACTIONS, o.SIMPLIFY_EXPRS, o.CONCRETIZE, o.SUPER_FASTPATH, o.SYMBOLIC_TEMPS }
+
+
+class _NotCompilable(Exception):
+    pass
+
+
+def can_execute_compiled(state):
+    """
+    Check if a state can execute compiled IRSBs.
+    """
+    if o.COMPILED_IRSB not in state.options or not COMPILE_BLOCKERS.isdisjoint(state.options):
+        return False
+    if state.has_plugin('inspect') and any(state.inspect._breakpoints.itervalues()):
+        return False
+    return True
+
+
+def compile_irsb(engine, irsb):
+    """
+    Compile an IRSB.
+
+    :param engine:  The SimEngineVEX whose generic statement handler is used for statements that are not compiled.
+    :param irsb:    The IRSB.
+    :return:        A list of callables, one per statement of the IRSB, taking a state and a SimSuccessors.
+    """
+    handlers = [ ]
+    for stmt in irsb.statements:
+        try:
+            handlers.append(_compile_stmt(stmt, irsb.tyenv))
+        except _NotCompilable:
+            handlers.append(_generic_stmt(engine, stmt))
+    return handlers
+
+
+#
+# Statements
+#
+
+def _generic_stmt(engine, stmt):
+    handle_statement = engine._handle_statement
+
+    def generic(state, successors):
+        handle_statement(state, successors, stmt)
+    return generic
+
+
+def _compile_stmt(stmt, tyenv):
+    tag = stmt.tag
+
+    if tag == 'Ist_IMark':
+        ins_addr = stmt.addr + stmt.delta
+        insn_bytes = range(stmt.addr, stmt.addr + stmt.len)
+
+        def imark(state, successors):  # pylint:disable=unused-argument
+            scratch = state.scratch
+            scratch.ins_addr = ins_addr
+            # relift if we are suddenly in self-modifying code
+            if scratch.dirty_addrs:
+                for addr in insn_bytes:
+                    if addr in scratch.dirty_addrs:
+                        raise SimReliftException(state)
+            scratch.num_insns += 1
+            state.history.recent_instruction_count += 1
+        return imark
+
+    if tag in ('Ist_NoOp', 'Ist_AbiHint'):
+        return lambda state, successors: None
+
+    if tag == 'Ist_WrTmp':
+        tmp = stmt.tmp
+        data = _compile_expr(stmt.data, tyenv)
+        expected_size = stmt.data.result_size(tyenv)
+
+        def wrtmp(state, successors):  # pylint:disable=unused-argument
+            v = data(state)
+            state.scratch.temps[tmp] = v
+            if v.size() != expected_size:
+                raise SimStatementError("WrTmp expected length %d but got %d" % (expected_size, v.size()))
+        return wrtmp
+
+    if tag == 'Ist_Put':
+        offset = stmt.offset
+        data = _compile_expr(stmt.data, tyenv)
+
+        def put(state, successors):  # pylint:disable=unused-argument
+            v = data(state)
+            if o.DO_PUTS in state.options:
+                state.registers.store(offset, v)
+        return put
+
+    raise _NotCompilable()
+
+
+#
+# Expressions
+#
+
+def _compile_expr(expr, tyenv):
+    tag = expr.tag
+    if tag in ('Iex_GSPTR', 'Iex_VECRET'):
+        raise _NotCompilable()
+
+    ty = expr.result_type(tyenv)
+    if not ty.startswith('Ity_I'):
+        # floating point and vector types are left to the generic handlers
+        raise _NotCompilable()
+
+    if tag == 'Iex_RdTmp':
+        tmp = expr.tmp
+
+        def rdtmp(state):
+            v = state.scratch.temps.get(tmp, None)
+            if v is None:
+                raise SimValueError('VEX temp variable %d does not exist. This is usually the result of an incorrect '
+                                    'slicing.' % tmp
+                                    )
+            return v
+        return rdtmp
+
+    if tag == 'Iex_Get':
+        offset = expr.offset
+        size_bits = get_type_size(ty)
+
+        def get(state):
+            return state.registers.load(offset, size_bits // state.arch.byte_width)
+        return get
+
+    if tag == 'Iex_Const':
+        if not isinstance(expr.con.value, (int, long)):
+            raise _NotCompilable()
+        value = claripy.BVV(expr.con.value, get_type_size(expr.con.type))
+        return lambda state: value
+
+    if tag in ('Iex_Unop', 'Iex_Binop', 'Iex_Triop', 'Iex_Qop'):
+        irop = operations.get(expr.op, None)
+        if irop is None or irop._float:
+            raise _NotCompilable()
+        args = [ _compile_expr(a, tyenv) for a in expr.args ]
+        size_bits = get_type_size(ty)
+        name = type(expr).__name__
+
+        def op(state):
+            try:
+                return translate_inner(state, irop, [ a(state) for a in args ])
+            except UnsupportedIROpError:
+                if o.BYPASS_UNSUPPORTED_IROP not in state.options:
+                    raise
+                state.history.add_event('resilience', resilience_type='irop', op=expr.op, message='unsupported IROp')
+                if o.UNSUPPORTED_BYPASS_ZERO_DEFAULT in state.options:
+                    return state.se.BVV(0, size_bits)
+                return state.se.Unconstrained(name, size_bits)
+            except SimOperationError as e:
+                e.bbl_addr = state.scratch.bbl_addr
+                e.stmt_idx = state.scratch.stmt_idx
+                e.ins_addr = state.scratch.ins_addr
+                e.executed_instruction_count = state.history.recent_instruction_count
+                raise
+        return op
+
+    raise _NotCompilable()
+
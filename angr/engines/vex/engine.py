@@ -14,6 +14,8 @@ from ...errors import (SimError, SimIRSBError, SimSolverError, SimMemoryAddressE
 from ..engine import SimEngine
 from .statements import translate_stmt
 from .expressions import translate_expr
+from .irsb_cache import IRSBCache
+from .compiler import compile_irsb, can_execute_compiled
 
 import logging
 l = logging.getLogger("angr.engines.vex.engine")
@@ -26,12 +28,17 @@ VEX_IRSB_MAX_INST = 99
 class SimEngineVEX(SimEngine):
     """
     Execution engine based on VEX, Valgrind's IR.
+
+    Lifted blocks are kept in an in-process LRU cache. If a persistent cache (an :class:`IRSBCache`, or the path to
+    one) is given, or set on the project, blocks that are not in the LRU cache are looked up there before being lifted,
+    and newly lifted blocks are stored there, so that they are shared with other processes and later runs.
     """
 
     def __init__(self, project=None,
             stop_points=None,
             use_cache=None,
             cache_size=50000,
+            persistent_cache=None,
             default_opt_level=1,
             support_selfmodifying_code=None,
             single_step=False):
@@ -55,6 +62,9 @@ class SimEngineVEX(SimEngine):
                 self._support_selfmodifying_code = project._support_selfmodifying_code
             else:
                 self._support_selfmodifying_code = False
+        if persistent_cache is None and project is not None:
+            persistent_cache = project._persistent_translation_cache
+        self._persistent_cache = IRSBCache(persistent_cache) if isinstance(persistent_cache, basestring) else persistent_cache
 
         # block cache
         self._block_cache = None
@@ -74,6 +84,8 @@ class SimEngineVEX(SimEngine):
         self._block_cache = LRUCache(maxsize=self._cache_size)
         self._block_cache_hits = 0
         self._block_cache_misses = 0
+        # compiled statement handlers, keyed by the id of their IRSB. IRSBs are kept alive along with their handlers
+        self._compiled_cache = LRUCache(maxsize=self._cache_size)
 
     def process(self, state,
             irsb=None,
@@ -235,6 +247,12 @@ class SimEngineVEX(SimEngine):
         # set the current basic block address that's being processed
         state.scratch.bbl_addr = irsb.addr
 
+        # use the compiled statement handlers if we execute the whole block and nothing needs the statement objects
+        handlers = None
+        if skip_stmts == 0 and whitelist is None and (last_stmt is None or num_stmts <= last_stmt) and \
+                can_execute_compiled(state):
+            handlers = self._compiled_handlers(irsb)
+
         for stmt_idx, stmt in enumerate(ss):
             if isinstance(stmt, pyvex.IRStmt.IMark):
                 insn_addrs.append(stmt.addr + stmt.delta)
@@ -251,6 +269,9 @@ class SimEngineVEX(SimEngine):
 
             try:
                 state.scratch.stmt_idx = stmt_idx
+                if handlers is not None:
+                    handlers[stmt_idx](state, successors)
+                    continue
                 state._inspect('statement', BP_BEFORE, statement=stmt_idx)
                 self._handle_statement(state, successors, stmt)
                 state._inspect('statement', BP_AFTER)
@@ -338,6 +359,20 @@ class SimEngineVEX(SimEngine):
             l.debug('Add an incomplete successor state as the result of an incomplete execution due to the white-list.')
             successors.flat_successors.append(state)
 
+    def _compiled_handlers(self, irsb):
+        """
+        Get the compiled statement handlers of an IRSB, compiling it if it has not been compiled yet.
+        """
+        try:
+            cached_irsb, handlers = self._compiled_cache[id(irsb)]
+            if cached_irsb is irsb:
+                return handlers
+        except KeyError:
+            pass
+        handlers = compile_irsb(self, irsb)
+        self._compiled_cache[id(irsb)] = (irsb, handlers)
+        return handlers
+
     def _handle_statement(self, state, successors, stmt):
         """
         This function receives an initial state and imark and processes a list of pyvex.IRStmts
@@ -504,12 +539,7 @@ class SimEngineVEX(SimEngine):
         l.debug("Creating pyvex.IRSB of arch %s at %#x", arch.name, addr)
         try:
             for subphase in xrange(2):
-                irsb = pyvex.IRSB(buff, addr + thumb, arch,
-                                  num_bytes=size,
-                                  num_inst=num_inst,
-                                  bytes_offset=thumb,
-                                  traceflags=traceflags,
-                                  opt_level=opt_level)
+                irsb = self._lift_irsb(buff, addr, arch, size, num_inst, thumb, traceflags, opt_level)
 
                 if subphase == 0:
                     # check for possible stop points
@@ -532,6 +562,37 @@ class SimEngineVEX(SimEngine):
             e_type, value, traceback = sys.exc_info()
             raise SimTranslationError, ("Translation error", e_type, value), traceback
 
+    def _lift_irsb(self, buff, addr, arch, size, num_inst, thumb, traceflags, opt_level):
+        """
+        Lift bytes into an IRSB with pyvex, or load the IRSB from the persistent cache.
+        """
+        key = None
+        if self._persistent_cache is not None:
+            insn_bytes = buff[:size] if isinstance(buff, str) else str(pyvex.ffi.buffer(buff, size))
+            key = IRSBCache.key(arch, addr, insn_bytes, size, num_inst, thumb, opt_level, traceflags)
+            irsb = self._persistent_cache.get(key, arch)
+            if irsb is not None:
+                return irsb
+
+        irsb = pyvex.IRSB(buff, addr + thumb, arch,
+                          num_bytes=size,
+                          num_inst=num_inst,
+                          bytes_offset=thumb,
+                          traceflags=traceflags,
+                          opt_level=opt_level)
+
+        if key is not None:
+            self._persistent_cache.put(key, irsb)
+        return irsb
+
+    @property
+    def persistent_cache(self):
+        """
+        The persistent IRSB cache of this engine, or None. Its ``hits`` and ``misses`` counters tell how many blocks
+        were loaded from it and how many had to be lifted.
+        """
+        return self._persistent_cache
+
     def _load_bytes(self, addr, max_size, state=None, clemory=None):
         if not clemory:
             if state is None:
@@ -603,6 +664,7 @@ class SimEngineVEX(SimEngine):
 
     def clear_cache(self):
         self._block_cache = LRUCache(maxsize=self._cache_size)
+        self._compiled_cache = LRUCache(maxsize=self._cache_size)
 
         self._block_cache_hits = 0
         self._block_cache_misses = 0
@@ -619,6 +681,7 @@ class SimEngineVEX(SimEngine):
         self._support_selfmodifying_code = state['_support_selfmodifying_code']
         self._single_step = state['_single_step']
         self._cache_size = state['_cache_size']
+        self._persistent_cache = state['_persistent_cache']
 
         # rebuild block cache
         self._initialize_block_cache()
@@ -632,5 +695,6 @@ class SimEngineVEX(SimEngine):
         s['_support_selfmodifying_code'] = self._support_selfmodifying_code
         s['_single_step'] = self._single_step
         s['_cache_size'] = self._cache_size
+        s['_persistent_cache'] = self._persistent_cache
 
         return s
@@ -0,0 +1,164 @@
+import os
+import hashlib
+import sqlite3
+import logging
+import cPickle
+import pkg_resources
+from cStringIO import StringIO
+
+l = logging.getLogger("angr.engines.vex.irsb_cache")
+
+
+class IRSBCache(object):
+    """
+    A content-addressed on-disk cache of lifted IRSBs, which can be shared by any number of processes.
+
+    IRSBs are keyed on the architecture, the address, a hash of the lifted bytes, and every lifting parameter that
+    affects the result, so a cache can be shared by all analyses of a binary (and even of different binaries). The
+    cache also records the versions of angr and pyvex and the format of the IRSBs it stores, and is emptied when it is
+    opened with different ones. The cache is stored in a SQLite database, which is memory-mapped by every process that
+    reads it.
+
+    :ivar int hits:     The number of IRSBs loaded from the cache by this process.
+    :ivar int misses:   The number of lookups that did not find an IRSB in the cache in this process.
+    """
+
+    MMAP_SIZE = 1 << 30
+    FORMAT = 1
+
+    def __init__(self, path):
+        """
+        :param str path:    Path to the database file. It is created if it does not exist.
+        """
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+
+        self._db = None
+        self._pid = None
+
+        db = self._connection()
+        version = self.version()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute("CREATE TABLE IF NOT EXISTS irsbs (key TEXT PRIMARY KEY, data BLOB)")
+            db.execute("CREATE TABLE IF NOT EXISTS info (name TEXT PRIMARY KEY, value TEXT)")
+            row = db.execute("SELECT value FROM info WHERE name = 'version'").fetchone()
+            if row is None or row[0] != version:
+                if row is not None:
+                    l.info("IRSB cache %s was written by %s, emptying it.", self.path, row[0])
+                db.execute("DELETE FROM irsbs")
+                db.execute("INSERT OR REPLACE INTO info (name, value) VALUES ('version', ?)", (version,))
+        except:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def __getstate__(self):
+        return {'path': self.path}
+
+    def __setstate__(self, s):
+        self.path = s['path']
+        self.hits = 0
+        self.misses = 0
+        self._db = None
+        self._pid = None
+
+    def __repr__(self):
+        return "<IRSBCache %s: %d hits, %d misses>" % (self.path, self.hits, self.misses)
+
+    def _connection(self):
+        # connections must not be shared across a fork
+        if self._db is None or self._pid != os.getpid():
+            self._db = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA mmap_size=%d" % self.MMAP_SIZE)
+            self._pid = os.getpid()
+        return self._db
+
+    @classmethod
+    def version(cls):
+        """
+        Describe the versions of angr and pyvex and the format of cached IRSBs.
+
+        :return:    The description as a string. IRSBs cached with a different one are never loaded.
+        """
+        versions = [ ]
+        for dist in ('angr', 'pyvex'):
+            try:
+                versions.append("%s %s" % (dist, pkg_resources.get_distribution(dist).version))
+            except pkg_resources.DistributionNotFound:
+                versions.append("%s unknown" % dist)
+        return "format %d, pickle %d, %s" % (cls.FORMAT, cPickle.HIGHEST_PROTOCOL, ", ".join(versions))
+
+    @staticmethod
+    def key(arch, addr, insn_bytes, size, num_inst, thumb, opt_level, traceflags):
+        """
+        Compute the cache key of an IRSB.
+
+        :param arch:            The architecture the IRSB is lifted with.
+        :param int addr:        The address of the block.
+        :param str insn_bytes:  The bytes that are lifted.
+        :return:                The key as a string.
+        """
+        return "%s|%s|%#x|%s|%d|%r|%d|%r|%d" % (arch.name, arch.memory_endness, addr,
+                                                hashlib.sha1(insn_bytes).hexdigest(), size, num_inst, thumb,
+                                                opt_level, traceflags)
+
+    def get(self, key, arch):
+        """
+        Load an IRSB from the cache.
+
+        :param str key: The cache key, as returned by :meth:`key`.
+        :param arch:    The architecture that the loaded IRSB will refer to.
+        :return:        The IRSB, or None if it is not in the cache, or can not be loaded.
+        """
+        try:
+            row = self._connection().execute("SELECT data FROM irsbs WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error:
+            l.warning("Failed to read from the IRSB cache %s.", self.path, exc_info=True)
+            row = None
+        if row is None:
+            self.misses += 1
+            return None
+
+        unpickler = cPickle.Unpickler(StringIO(str(row[0])))
+        unpickler.persistent_load = {'arch': arch}.__getitem__
+        try:
+            irsb = unpickler.load()
+        except Exception:  # pylint:disable=broad-except
+            l.warning("Failed to load a cached IRSB from %s, removing it.", self.path, exc_info=True)
+            self.misses += 1
+            try:
+                self._connection().execute("DELETE FROM irsbs WHERE key = ?", (key,))
+            except sqlite3.Error:
+                l.warning("Failed to write to the IRSB cache %s.", self.path, exc_info=True)
+            return None
+
+        self.hits += 1
+        return irsb
+
+    def put(self, key, irsb):
+        """
+        Store an IRSB in the cache.
+
+        :param str key:     The cache key, as returned by :meth:`key`.
+        :param irsb:        The IRSB.
+        """
+        f = StringIO()
+        pickler = cPickle.Pickler(f, cPickle.HIGHEST_PROTOCOL)
+        pickler.persistent_id = lambda obj: 'arch' if obj is irsb.arch else None
+        pickler.dump(irsb)
+        try:
+            self._connection().execute("INSERT OR IGNORE INTO irsbs (key, data) VALUES (?, ?)",
+                                       (key, sqlite3.Binary(f.getvalue())))
+        except sqlite3.Error:
+            l.warning("Failed to write to the IRSB cache %s.", self.path, exc_info=True)
+
+    def clear(self):
+        """
+        Remove every IRSB from the cache.
+        """
+        self._connection().execute("DELETE FROM irsbs")
+        self.hits = 0
+        self.misses = 0
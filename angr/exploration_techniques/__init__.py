@@ -66,6 +66,12 @@ class ExplorationTechnique(object):
         """
         pass
 
+    def teardown(self, simgr):
+        """
+        Release any resources acquired by this technique, once it is removed from the manager.
+        """
+        pass
+
     def step(self, simgr, stash=None, **kwargs):  # pylint:disable=no-self-use
         """
         Step this stash of this manager forward. Should call ``simgr.step(stash, **kwargs)`` in order to do the actual
@@ -172,13 +178,15 @@ from .crash_monitor import CrashMonitor
 from .tracer import Tracer
 from .explorer import Explorer
 from .threading import Threading
+from .process_pool import ProcessPool
+from .distributed import Distributed, WorkQueue, SQLiteWorkQueue
 from .dfs import DFS
 from .looplimiter import LoopLimiter
 from .lengthlimiter import LengthLimiter
 from .veritesting import Veritesting
 from .oppologist import Oppologist
 from .director import Director, ExecuteAddressGoal, CallFunctionGoal
-from .spiller import Spiller
+from .spiller import Spiller, SegmentStore
 from .manual_mergepoint import ManualMergepoint
 from .tech_builder import TechniqueBuilder
 from ..errors import AngrError, AngrExplorationTechniqueError
@@ -0,0 +1,525 @@
+import os
+import sys
+import time
+import uuid
+import errno
+import socket
+import sqlite3
+import logging
+import traceback
+from collections import defaultdict
+
+from . import ExplorationTechnique
+from .serialization import dumps, loads, dump_state, load_state, history_objects
+
+l = logging.getLogger("angr.exploration_techniques.distributed")
+
+
+def _stepped_stash(stash):
+    """
+    The name of the queue stash that workers put the successors of work items from a stash into.
+    """
+    return stash + '.stepped'
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError as e:
+        return e.errno == errno.EPERM
+    return True
+
+
+class WorkQueue(object):
+    """
+    The interface of a work queue shared by a :class:`Distributed` coordinator and its workers.
+
+    A work queue stores serialized states in named stashes. Work items (states in the work stash) are claimed by
+    workers, which atomically replace them with the serialized stashes of their successors once stepped. Every other
+    stash holds results, which are collected by the coordinator. Claims of workers that died or got stuck can be given
+    back to the queue with :meth:`reclaim`.
+    """
+
+    def put(self, stash, items):
+        """
+        Add serialized states to a stash.
+
+        :param str stash:   The name of the stash.
+        :param list items:  A list of serialized states.
+        """
+        raise NotImplementedError()
+
+    def claim(self, stash, n=1):
+        """
+        Atomically claim up to n unclaimed items from a stash.
+
+        :return: A list of (item id, serialized state) tuples.
+        """
+        raise NotImplementedError()
+
+    def finish(self, item_ids, stashes):
+        """
+        Atomically remove claimed items and store the serialized states that resulted from processing them.
+
+        :param list item_ids:   Ids of the claimed items, as returned by :meth:`claim`.
+        :param dict stashes:    A dict mapping stash names to lists of serialized states.
+        """
+        raise NotImplementedError()
+
+    def release(self, item_ids):
+        """
+        Give claimed items back to the queue without processing them.
+        """
+        raise NotImplementedError()
+
+    def reclaim(self, timeout=None):
+        """
+        Give back to the queue the claimed items of workers that are known to be dead, and, if a timeout is given, the
+        items that have been claimed for longer than that.
+
+        :param timeout: Number of seconds after which a claim is considered stale, or None to only reclaim the items of
+                        dead workers.
+        :return:        The number of reclaimed items.
+        """
+        raise NotImplementedError()
+
+    def last_claim(self, stash):
+        """
+        Return the time of the most recent claim on an item of a stash, or None if none of its items are claimed.
+        """
+        raise NotImplementedError()
+
+    def pop(self, stash):
+        """
+        Remove and return all unclaimed items of a stash.
+        """
+        raise NotImplementedError()
+
+    def stashes(self):
+        """
+        Return the names of all non-empty stashes.
+        """
+        raise NotImplementedError()
+
+    def pending(self, stash):
+        """
+        Return the number of items, claimed or not, in a stash.
+        """
+        raise NotImplementedError()
+
+    def clear(self):
+        """
+        Remove everything from the queue.
+        """
+        raise NotImplementedError()
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """
+    A work queue stored in a SQLite database, which allows any number of processes on the same host (or sharing a file
+    system with working locks) to share it.
+
+    Every claim records the host name and pid of the claiming process, and when it was made. Whether a worker is still
+    alive can only be checked for workers on the same host as the process calling :meth:`reclaim`; claims of workers on
+    other hosts are only reclaimed by their age.
+    """
+
+    def __init__(self, path):
+        """
+        :param str path:    Path to the database file. It is created if it does not exist.
+        """
+        self.path = path
+        self._db = None
+        self._pid = None
+
+        with self._connection() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS items "
+                       "(id INTEGER PRIMARY KEY AUTOINCREMENT, stash TEXT, data BLOB, claimed INTEGER DEFAULT 0, "
+                       "claimed_host TEXT, claimed_at REAL)")
+            db.execute("CREATE INDEX IF NOT EXISTS items_stash ON items (stash, claimed)")
+
+    def __getstate__(self):
+        return {'path': self.path}
+
+    def __setstate__(self, s):
+        self.path = s['path']
+        self._db = None
+        self._pid = None
+
+    def _connection(self):
+        # connections must not be shared across a fork
+        if self._db is None or self._pid != os.getpid():
+            self._db = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            self._pid = os.getpid()
+        return _Transaction(self._db)
+
+    def put(self, stash, items):
+        with self._connection() as db:
+            db.executemany("INSERT INTO items (stash, data) VALUES (?, ?)",
+                           [(stash, sqlite3.Binary(i)) for i in items])
+
+    def claim(self, stash, n=1):
+        with self._connection() as db:
+            rows = db.execute("SELECT id, data FROM items WHERE stash = ? AND claimed = 0 ORDER BY id LIMIT ?",
+                              (stash, n)).fetchall()
+            claim = (os.getpid(), socket.gethostname(), time.time())
+            db.executemany("UPDATE items SET claimed = ?, claimed_host = ?, claimed_at = ? WHERE id = ?",
+                           [claim + (i,) for i, _ in rows])
+        return [(i, str(data)) for i, data in rows]
+
+    def finish(self, item_ids, stashes):
+        with self._connection() as db:
+            db.executemany("DELETE FROM items WHERE id = ?", [(i,) for i in item_ids])
+            for stash, items in stashes.iteritems():
+                db.executemany("INSERT INTO items (stash, data) VALUES (?, ?)",
+                               [(stash, sqlite3.Binary(i)) for i in items])
+
+    def release(self, item_ids):
+        with self._connection() as db:
+            db.executemany("UPDATE items SET claimed = 0, claimed_host = NULL, claimed_at = NULL WHERE id = ?",
+                           [(i,) for i in item_ids])
+
+    def reclaim(self, timeout=None):
+        host = socket.gethostname()
+        now = time.time()
+        with self._connection() as db:
+            rows = db.execute("SELECT id, claimed, claimed_host, claimed_at FROM items WHERE claimed != 0").fetchall()
+            stale = [(i,) for i, pid, claimed_host, claimed_at in rows
+                     if (timeout is not None and now - claimed_at > timeout) or
+                     (claimed_host == host and not _pid_alive(pid))]
+            db.executemany("UPDATE items SET claimed = 0, claimed_host = NULL, claimed_at = NULL WHERE id = ?", stale)
+        if stale:
+            l.warning("Reclaimed %d work items from dead or stuck workers.", len(stale))
+        return len(stale)
+
+    def last_claim(self, stash):
+        with self._connection() as db:
+            return db.execute("SELECT MAX(claimed_at) FROM items WHERE stash = ? AND claimed != 0",
+                              (stash,)).fetchone()[0]
+
+    def pop(self, stash):
+        with self._connection() as db:
+            rows = db.execute("SELECT id, data FROM items WHERE stash = ? AND claimed = 0 ORDER BY id",
+                              (stash,)).fetchall()
+            db.executemany("DELETE FROM items WHERE id = ?", [(i,) for i, _ in rows])
+        return [str(data) for _, data in rows]
+
+    def stashes(self):
+        with self._connection() as db:
+            return [s for s, in db.execute("SELECT DISTINCT stash FROM items").fetchall()]
+
+    def pending(self, stash):
+        with self._connection() as db:
+            return db.execute("SELECT COUNT(*) FROM items WHERE stash = ?", (stash,)).fetchone()[0]
+
+    def clear(self):
+        with self._connection() as db:
+            db.execute("DELETE FROM items")
+
+
+class _Transaction(object):
+    """
+    An exclusive transaction on a sqlite3 connection in autocommit mode.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute("BEGIN IMMEDIATE")
+        return self.db
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.db.execute("COMMIT" if exc_type is None else "ROLLBACK")
+        return False
+
+
+class Distributed(ExplorationTechnique):
+    """
+    Distribute the stepping of a stash to independent worker processes through a :class:`WorkQueue`.
+
+    Every step of the simulation manager is one round trip through the work queue: the states of the stepped stash
+    that the filters and selectors of the simulation manager let through are serialized into the queue, workers step
+    each of them once, and the successors are put back into the stash once all of them have been stepped. Other
+    stashes the workers produce (unsat, deadended, ...) are collected as well, and states whose stepping raised an
+    exception in a worker are recorded in ``simgr.errored``, with a formatted traceback. The stepping itself is done by
+    workers started with :meth:`Distributed.run_worker`, possibly on other machines sharing the queue, each of which
+    loads the same binary into its own project.
+
+    Since states are stepped remotely, ``step_state`` and ``successors`` hooks of other exploration techniques on the
+    simulation manager can not run. If any other technique installs one of them, steps are done locally instead.
+
+    States are serialized with their regular pickling support, together with the arguments of the step. The project
+    and its loader are never serialized; they are referred to by name and resolved to the project of the process that
+    loads a state. Neither is the ancestry of a state: the coordinator keeps the history of every state in the queue,
+    and attaches the successors to it when they are collected.
+    """
+
+    def __init__(self, queue, poll_interval=0.1, timeout=None, claim_timeout=None, idle_timeout=60):
+        """
+        :param WorkQueue queue:     The work queue shared with the workers.
+        :param poll_interval:       Number of seconds to wait between two polls of the queue.
+        :param timeout:             Maximum number of seconds a single step waits for the workers. States that are not
+                                    stepped in time are collected by a later step.
+        :param claim_timeout:       Number of seconds after which a work item claimed by a worker that is still alive is
+                                    given back to the queue. Items claimed by workers that died are always given back.
+        :param idle_timeout:        Number of seconds after which a step stops waiting for workers if none of them has
+                                    claimed or finished a work item in the meantime. The unclaimed work items are then
+                                    stepped locally, and the claimed ones are collected by a later step.
+        """
+        super(Distributed, self).__init__()
+        self.queue = queue
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.claim_timeout = claim_timeout
+        self.idle_timeout = idle_timeout
+        self._local_reason = None
+        # the histories of the states in the queue, by the tokens they were serialized with
+        self._histories = { }
+
+    def step(self, simgr, stash=None, **kwargs):
+        stash = stash or 'active'
+
+        if any(kwargs.get(k, None) is not None for k in ('successor_func', 'n', 'until')) or \
+                self._stepped_locally(simgr):
+            return simgr.step(stash=stash, **kwargs)
+
+        filter_func = kwargs.get('filter_func', None)
+        selector_func = kwargs.get('selector_func', None)
+        run_args = {k: v for k, v in kwargs.iteritems()
+                    if k not in ('selector_func', 'step_func', 'successor_func', 'filter_func', 'n', 'until')}
+
+        bucket = defaultdict(list)
+        work = [ ]
+        for state in simgr.stashes[stash]:
+            goto = simgr.filter(state, filter_func=filter_func)
+            if isinstance(goto, tuple):
+                goto, state = goto
+            if goto not in (None, stash):
+                bucket[goto].append(state)
+            elif not simgr.selector(state, selector_func=selector_func):
+                bucket[stash].append(state)
+            else:
+                work.append(state)
+
+        simgr.drop(stash=stash)
+        for to_stash, states in bucket.iteritems():
+            simgr.populate(to_stash, states)
+
+        if work:
+            items = [ ]
+            for state in work:
+                token = uuid.uuid4().hex
+                items.append(dump_state(self.project, state, token, run_args))
+                self._histories[token] = state.history
+            self.queue.put(stash, items)
+            leftover = self._wait(stash)
+            if leftover:
+                self._step_locally(simgr, stash, leftover)
+        self._collect(simgr, stash)
+
+        step_func = kwargs.get('step_func', None)
+        if step_func is not None:
+            return step_func(simgr)
+        return simgr
+
+    def _stepped_locally(self, simgr):
+        """
+        Check if another exploration technique on the simulation manager wants to step states by itself.
+        """
+        for tech in simgr._techniques:
+            if tech is self:
+                continue
+            for name in ('step_state', 'successors'):
+                if getattr(tech, name).__code__ is not getattr(ExplorationTechnique, name).__code__:
+                    if self._local_reason != (tech, name):
+                        l.warning("%s hooks %s, stepping states locally.", tech, name)
+                        self._local_reason = (tech, name)
+                    return True
+        return False
+
+    def _wait(self, stash):
+        """
+        Wait for the workers to step the work stash.
+
+        :return: A list of the work items that were claimed because no worker made progress, to be stepped locally.
+        """
+        start = last_active = time.time()
+        last_progress = None
+        while True:
+            pending = self.queue.pending(stash)
+            if not pending:
+                return [ ]
+            now = time.time()
+            if self.timeout is not None and now - start > self.timeout:
+                l.warning("Timed out while waiting for workers to step the work queue.")
+                return [ ]
+
+            # a worker is alive as long as items get claimed or finished
+            progress = (pending, self.queue.last_claim(stash))
+            if progress != last_progress:
+                last_progress = progress
+                last_active = now
+            elif self.idle_timeout is not None and now - last_active > self.idle_timeout:
+                items = self.queue.claim(stash, pending)
+                l.warning("No worker claimed or finished a work item in %d seconds, stepping %d states locally.",
+                          self.idle_timeout, len(items))
+                if self.queue.pending(stash) > len(items):
+                    l.warning("Leaving %d claimed work items to be collected by a later step.",
+                              self.queue.pending(stash) - len(items))
+                return items
+
+            self.queue.reclaim(self.claim_timeout)
+            time.sleep(self.poll_interval)
+
+    def _step_locally(self, simgr, stash, items):
+        """
+        Step claimed work items with the simulation manager, and remove them from the queue.
+        """
+        bucket = defaultdict(list)
+        for _, data in items:
+            _, state, run_args, _ = load_state(self.project, data, self._histories)
+            successors = simgr.step_state(state, **run_args)
+            if not any(successors.itervalues()):
+                bucket['deadended'].append(state)
+                continue
+            for to_stash, successor_states in successors.iteritems():
+                bucket[to_stash or stash].extend(successor_states)
+
+        self.queue.finish([i for i, _ in items], { })
+        for to_stash, states in bucket.iteritems():
+            simgr.populate(to_stash, states)
+
+    def _collect(self, simgr, stash):
+        stepped = _stepped_stash(stash)
+        objects = { }
+        for token, history in self._histories.iteritems():
+            objects.update(history_objects(token, history))
+
+        for s in self.queue.stashes():
+            if s == stash:
+                continue
+            items = self.queue.pop(s)
+            if s == 'errored':
+                for state, error, tb in (loads(self.project, i, objects) for i in items):
+                    simgr.errored.append(RemoteErrorRecord(state, error, tb))
+                continue
+            states = [loads(self.project, i, objects) for i in items]
+            if states:
+                l.debug("Collected %d states from stash %s.", len(states), s)
+                simgr.populate(stash if s == stepped else s, states)
+
+        if not self.queue.stashes():
+            self._histories.clear()
+
+    @staticmethod
+    def run_worker(project, queue, stash='active', techniques=None, batch_size=1, poll_interval=0.1, idle_timeout=5,
+                   **kwargs):
+        """
+        Step states from the work queue until it runs out of work.
+
+        Each batch of claimed states is stepped once with a fresh simulation manager, with the step arguments the
+        coordinator sent along with each state, and replaced in the queue with the resulting stashes. If stepping the
+        batch raises an exception, its states are stepped one by one, and the ones that raise are put into the errored
+        stash, so that a state that crashes the worker is not handed to the next worker.
+
+        :param project:         The project to step states with.
+        :param WorkQueue queue: The work queue shared with the coordinator.
+        :param stash:           The name of the work stash.
+        :param techniques:      A list of exploration techniques to use when stepping, e.g. an :class:`Explorer`.
+        :param batch_size:      The number of states to claim at once.
+        :param poll_interval:   Number of seconds to wait before polling an empty queue again.
+        :param idle_timeout:    Number of seconds after which a worker exits if the queue has stayed empty.
+        :param kwargs:          Default arguments for stepping, which are overridden by the ones sent by the
+                                coordinator.
+        :return:                The number of states that this worker stepped.
+        """
+        stepped = 0
+        idle_since = None
+
+        while True:
+            items = queue.claim(stash, batch_size)
+            if not items:
+                if idle_since is None:
+                    idle_since = time.time()
+                elif time.time() - idle_since > idle_timeout:
+                    return stepped
+                time.sleep(poll_interval)
+                continue
+            idle_since = None
+
+            Distributed._process_items(project, queue, items, stash, techniques, kwargs)
+            stepped += len(items)
+
+    @staticmethod
+    def _process_items(project, queue, items, stash, techniques, step_args):
+        """
+        Step claimed work items once, and replace them in the queue with the resulting stashes. If stepping them all at
+        once raises an exception, they are stepped one by one, and the ones that raise are put into the errored stash.
+        """
+        try:
+            results = Distributed._step_items(project, [data for _, data in items], stash, techniques, step_args)
+        except Exception:  # pylint:disable=broad-except
+            results = defaultdict(list)
+            for _, data in items:
+                try:
+                    r = Distributed._step_items(project, [data], stash, techniques, step_args)
+                except Exception as e:  # pylint:disable=broad-except
+                    l.warning("Failed to step a state.", exc_info=True)
+                    r = {'errored': [Distributed._dump_error(project, data, e, sys.exc_info()[2])]}
+                for s, states in r.iteritems():
+                    results[s].extend(states)
+
+        queue.finish([i for i, _ in items], results)
+
+    @staticmethod
+    def _step_items(project, items, stash, techniques, step_args):
+        """
+        Step serialized states once, and serialize the resulting stashes. Successors in the work stash are put into the
+        stepped stash, and errored states are put into the errored stash together with their errors. States that were
+        sent with different step arguments are stepped separately.
+        """
+        names = { }
+        groups = [ ]
+        for data in items:
+            _, state, run_args, state_names = load_state(project, data)
+            names.update(state_names)
+            args = dict(step_args, **run_args)
+            for group_args, states in groups:
+                if group_args == args:
+                    states.append(state)
+                    break
+            else:
+                groups.append((args, [state]))
+
+        results = defaultdict(list)
+        for args, states in groups:
+            simgr = project.factory.simgr([], techniques=techniques)
+            simgr.populate(stash, states)
+            simgr.step(stash=stash, **args)
+
+            for s, stepped in simgr.stashes.iteritems():
+                if stepped:
+                    results[_stepped_stash(stash) if s == stash else s].extend(dumps(project, state, names)
+                                                                               for state in stepped)
+            results['errored'].extend(Distributed._dump_error(project, e.state, e.error, e.traceback, names)
+                                      for e in simgr.errored)
+        return {s: r for s, r in results.iteritems() if r}
+
+    @staticmethod
+    def _dump_error(project, state, error, tb, names=None):
+        """
+        Serialize an errored state together with its error, or with a description of the error if the error itself
+        can not be serialized, and with the formatted traceback of the error. The state may be given already serialized.
+        """
+        if isinstance(state, str):
+            _, state, _, names = load_state(project, state)
+        tb = ''.join(traceback.format_exception(type(error), error, tb))
+        try:
+            return dumps(project, (state, error, tb), names)
+        except Exception:  # pylint:disable=broad-except
+            return dumps(project, (state, AngrError(repr(error)), tb), names)
+
+
+from ..errors import AngrError
+from ..sim_manager import RemoteErrorRecord
@@ -0,0 +1,165 @@
+import logging
+import multiprocessing
+from collections import defaultdict
+
+from . import ExplorationTechnique
+from .serialization import dumps, loads, load_state, dump_state, history_objects
+
+l = logging.getLogger("angr.exploration_techniques.process_pool")
+
+# the project that forked workers step states with. It is set right before the pool is created, so every worker
+# inherits it through fork() instead of receiving a pickled copy.
+_worker_project = None
+
+
+def _step_worker(job):
+    """
+    Step a single serialized state inside a worker process.
+
+    :param job:     A state serialized by :func:`dump_state`, with its run_args as the extra object.
+    :return:        A serialized dict of stashes, or None if stepping raised an exception. In the latter case the parent
+                    steps the state again by itself, so that errors are recorded and categorized as usual.
+    """
+    try:
+        _, state, run_args, names = load_state(_worker_project, job)
+        successors = _worker_project.factory.successors(state, **run_args)
+        stashes = {None: successors.flat_successors,
+                   'unsat': successors.unsat_successors,
+                   'unconstrained': successors.unconstrained_successors}
+        return dumps(_worker_project, stashes, names)
+    except Exception:  # pylint:disable=broad-except
+        l.debug("Worker failed to step a state. It will be stepped in the parent process.", exc_info=True)
+        return None
+
+
+class ProcessPool(ExplorationTechnique):
+    """
+    Step states in parallel in a pool of forked worker processes.
+
+    Unlike :class:`Threading`, stepping is not serialized by the GIL, so this scales with the number of cores even when
+    most of the time is spent in angr itself. States are pickled to the workers and their successors are pickled back,
+    while the project (and its loader) is inherited read-only by the workers when the pool is forked and is never
+    serialized. The ancestry of a state stays in the parent process: successors are attached to the history of the
+    original state when they are loaded back.
+
+    Filters and selectors are applied once to every state of the stepped stash, and only the states that get stepped are
+    sent to the workers. Only the default successor function (``project.factory.successors``) runs in the workers. Steps
+    with a custom ``successor_func``, steps of a stash that another technique steps by itself, as well as states whose
+    stepping raised an exception in a worker, are stepped in the parent process. Note that ``successors`` hooks
+    installed by other exploration techniques are not run in the workers, and that breakpoints do not survive the trip,
+    since the inspect plugin is not pickled with a state.
+
+    The pool is started by the first step that needs it, and shut down once the stepped stash runs empty or the
+    technique is removed from the simulation manager.
+
+    This technique requires the ``fork`` start method, and is therefore not supported on Windows.
+    """
+    def __init__(self, processes=None, chunksize=1):
+        """
+        :param processes:   The number of worker processes. Default: the number of CPUs.
+        :param chunksize:   The number of states sent to a worker at once.
+        """
+        super(ProcessPool, self).__init__()
+        self.processes = processes if processes is not None else multiprocessing.cpu_count()
+        self.chunksize = chunksize
+
+        self._pool = None
+        self._stash = None
+        self._precomputed = {}
+
+    def complete(self, simgr):
+        if self._stash is not None and not simgr.stashes.get(self._stash, None):
+            self.close()
+        return False
+
+    def teardown(self, simgr):
+        self.close()
+
+    def close(self):
+        """
+        Terminate the worker processes. A new pool is started if the technique is used for stepping again.
+        """
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def step(self, simgr, stash=None, **kwargs):
+        stash = stash or 'active'
+
+        if any(kwargs.get(k, None) is not None for k in ('successor_func', 'n', 'until')) or \
+                simgr._immutable or self._stepped_elsewhere(simgr):
+            return simgr.step(stash=stash, **kwargs)
+
+        filter_func = kwargs.pop('filter_func', None)
+        selector_func = kwargs.pop('selector_func', None)
+        step_func = kwargs.pop('step_func', None)
+        run_args = {k: v for k, v in kwargs.iteritems() if k not in ('successor_func', 'n', 'until')}
+        self._stash = stash
+
+        bucket = defaultdict(list)
+        work = [ ]
+        for state in simgr.stashes[stash]:
+            goto = simgr.filter(state, filter_func=filter_func)
+            if isinstance(goto, tuple):
+                goto, state = goto
+            if goto not in (None, stash):
+                bucket[goto].append(state)
+            elif not simgr.selector(state, selector_func=selector_func):
+                bucket[stash].append(state)
+            else:
+                work.append(state)
+
+        if len(work) > 1:
+            self._precompute(work, run_args)
+
+        try:
+            for state in work:
+                successors = simgr.step_state(state, **run_args)
+                if not any(successors.itervalues()):
+                    bucket['deadended'].append(state)
+                    continue
+                for to_stash, successor_states in successors.iteritems():
+                    bucket[to_stash or stash].extend(successor_states)
+        finally:
+            self._precomputed = {}
+
+        simgr.drop(stash=stash)
+        for to_stash, states in bucket.iteritems():
+            simgr.populate(to_stash, states)
+
+        if step_func is not None:
+            return step_func(simgr)
+        return simgr
+
+    def step_state(self, simgr, state, successor_func=None, **kwargs):
+        result = self._precomputed.pop(id(state), None)
+        if result is None or successor_func is not None:
+            return simgr.step_state(state, successor_func=successor_func, **kwargs)
+        token, data = result
+        return loads(self.project, data, history_objects(token, state.history))
+
+    def _stepped_elsewhere(self, simgr):
+        """
+        Check if a step hook of another exploration technique would be skipped by stepping the stash here, i.e. if a
+        technique that was installed before this one steps states by itself.
+        """
+        step = simgr.step
+        return isinstance(step, HookedMethod) and bool(step.pending)
+
+    def _precompute(self, states, run_args):
+        """
+        Step states in the pool, and keep their serialized successors for :meth:`step_state`.
+        """
+        global _worker_project  # pylint:disable=global-statement
+        if self._pool is None:
+            _worker_project = self.project
+            self._pool = multiprocessing.Pool(processes=self.processes)
+
+        tokens = [str(i) for i in xrange(len(states))]
+        jobs = [dump_state(self.project, s, t, run_args) for s, t in zip(states, tokens)]
+        results = self._pool.map(_step_worker, jobs, chunksize=self.chunksize)
+        self._precomputed = {id(s): (t, r) for s, t, r in zip(states, tokens, results) if r is not None}
+
+
+from ..misc.hookset import HookedMethod
@@ -0,0 +1,113 @@
+"""
+Serialization of states and other objects that refer to a project, shared by the exploration techniques that move
+states out of the process (:class:`ProcessPool`, :class:`Distributed`) or out of memory (:class:`Spiller`).
+"""
+
+import cPickle
+from cStringIO import StringIO
+
+
+def shared_objects(project):
+    """
+    Return the objects of a project that are shared read-only by all of its states, keyed by their persistent ids.
+    These objects are never serialized; they are referred to by name and resolved to the objects of the project that
+    loads the serialized data.
+    """
+    return {
+        'project': project,
+        'loader': project.loader,
+        'loader_memory': project.loader.memory,
+    }
+
+
+def dumps(project, obj, names=None):
+    """
+    Serialize an object. The shared objects of the project, as well as the objects whose ids are keys of ``names``, are
+    not serialized, but referred to by name.
+    """
+    shared = {id(v): k for k, v in shared_objects(project).iteritems()}
+    if names:
+        shared.update(names)
+    f = StringIO()
+    pickler = cPickle.Pickler(f, cPickle.HIGHEST_PROTOCOL)
+    pickler.persistent_id = lambda o: shared.get(id(o), None)
+    pickler.dump(obj)
+    return f.getvalue()
+
+
+def loads(project, s, objects=None):
+    """
+    Deserialize an object serialized by :func:`dumps`. Names that do not refer to a shared object of the project are
+    resolved with ``objects``.
+    """
+    shared = shared_objects(project)
+    if objects:
+        shared.update(objects)
+    unpickler = cPickle.Unpickler(StringIO(s))
+    unpickler.persistent_load = shared.__getitem__
+    return unpickler.load()
+
+
+def history_objects(token, history):
+    """
+    Name a history, and the address traces it shares with its children, after the token of the serialized state that
+    it belongs to. Successors of the state refer to these objects by name when they are serialized back, so that they
+    are attached to the original objects instead of copies of them.
+    """
+    objects = {'history:%s' % token: history}
+    if history._sealed is not None:
+        for kind, trace in zip(('bbl_trace', 'ins_trace'), history._sealed):
+            if trace is not None:
+                objects['%s:%s' % (kind, token)] = trace
+    return objects
+
+
+def dump_state(project, state, token, extra=None):
+    """
+    Serialize a state to be stepped in another process, together with an extra object.
+
+    The ancestry of the state is not serialized: the state gets a copy of its history that has no parent, and objects
+    that refer to it are serialized with the names given by :func:`history_objects`. Pickling the history itself would
+    cut it from its ancestors, which it may share with other states, and would serialize the whole ancestry with every
+    state.
+
+    :param token:   A string that identifies the serialized state among the states whose successors are loaded
+                    together.
+    :return:        The serialized state.
+    """
+    history = state.history
+    if history._bbl_trace is not None:
+        # seal the traces here, so that the successors of the state share them with the original history
+        history._seal()
+
+    detached = SimStateHistory.__new__(SimStateHistory)
+    detached.__dict__.update(history.__dict__)
+    detached.parent = None
+    detached.merged_from = [ ]
+    detached.state = None
+    detached.strongref_state = None
+
+    names = {id(history): 'history:%s' % token}
+    return dumps(project, (token, dumps(project, detached), dumps(project, state, names), extra))
+
+
+def load_state(project, data, histories=None):
+    """
+    Deserialize a state serialized by :func:`dump_state`.
+
+    :param histories:   A dict mapping tokens to the original histories of serialized states. If the token of the state
+                        is in it, the state is loaded with its original history. Otherwise, it is loaded with the copy
+                        of its history that was serialized with it.
+    :return:            A tuple of the token, the state, the extra object, and a dict mapping the ids of the objects
+                        named after the token to their names, to serialize the successors of the state with.
+    """
+    token, history_data, state_data, extra = loads(project, data)
+    history = histories.get(token, None) if histories else None
+    if history is None:
+        history = loads(project, history_data)
+    objects = history_objects(token, history)
+    state = loads(project, state_data, objects)
+    return token, state, extra, {id(v): k for k, v in objects.iteritems()}
+
+
+from ..state_plugins.history import SimStateHistory
@@ -1,9 +1,19 @@
+import os
+import Queue
+import heapq
+import cPickle
 import logging
+import tempfile
+import threading
+import itertools
+import weakref
+from cStringIO import StringIO
 
 l = logging.getLogger("angr.exploration_techniques.spiller")
 
 import ana
 from . import ExplorationTechnique
+from .serialization import shared_objects
 
 class SpilledState(ana.Storable):
     def __init__(self, state):
@@ -15,6 +25,340 @@ class SpilledState(ana.Storable):
     def _ana_setstate(self, s):
         self.state = s[0]
 
+class _ReducedHistory(object):
+    """
+    The serialized form of a SimStateHistory in a SegmentStore: its attributes, with the parent replaced by a record
+    key.
+    """
+    __slots__ = ('attrs', 'parent_key')
+
+    def __init__(self, attrs, parent_key):
+        self.attrs = attrs
+        self.parent_key = parent_key
+
+    def __getstate__(self):
+        return self.attrs, self.parent_key
+
+    def __setstate__(self, s):
+        self.attrs, self.parent_key = s
+
+class _ReducedTrace(object):
+    """
+    The serialized form of an AddressTrace in a SegmentStore: the record keys of its full chunks (or the chunks
+    themselves, for chunks that are lists), the offsets in its last chunk if that one is not full, and its range.
+    """
+    __slots__ = ('chunk_keys', 'tail', 'bases', 'start', 'stop')
+
+    def __init__(self, chunk_keys, tail, bases, start, stop):
+        self.chunk_keys = chunk_keys
+        self.tail = tail
+        self.bases = bases
+        self.start = start
+        self.stop = stop
+
+    def __getstate__(self):
+        return self.chunk_keys, self.tail, self.bases, self.start, self.stop
+
+    def __setstate__(self, s):
+        self.chunk_keys, self.tail, self.bases, self.start, self.stop = s
+
+
+class SegmentStore(object):
+    """
+    A spill backend storing states in an append-only segment file.
+
+    States are serialized in batches, and each batch is appended to the file with a single write, optionally from a
+    background thread. Objects that are commonly shared between states (history nodes, memory pages, and the chunks of
+    address traces) are stored once, as separate records, and are referred to by their record key from every state
+    that contains them, so that spilling many sibling states does not rewrite the same ancestry and pages over and over.
+    The project and its loader are never stored.
+
+    Records are never removed from the file, which is deleted when the store is closed if it was created by the store.
+    Shared objects are assumed not to be mutated after they are stored, which holds for history nodes that have
+    children, for pages that are shared copy-on-write between states, and for full address trace chunks.
+    """
+
+    def __init__(self, project, path=None, async_writes=True):
+        """
+        :param project:         The project that spilled states belong to.
+        :param path:            Path to the segment file. By default, a temporary file is used.
+        :param async_writes:    Whether to write batches to the file from a background thread.
+        """
+        self.project = project
+        self._shared_by_name = shared_objects(project)
+        self._shared_by_id = { id(v): k for k, v in self._shared_by_name.iteritems() }
+
+        self._owns_file = path is None
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix="angr_spill_", suffix=".seg")
+            os.close(fd)
+        self.path = path
+        self._file = open(path, 'w+b')
+        self._end = 0
+
+        self._keys = itertools.count()
+        self._index = { } # record key -> (offset, length)
+        self._pending = { } # record key -> data that is not yet written to the file
+        self._written = { } # id of a stored shared object -> (record key, weakref to the object)
+        self._loaded = weakref.WeakValueDictionary() # record key -> shared object
+
+        self._lock = threading.Lock()
+        self._queue = None
+        self._writer = None
+        if async_writes:
+            self._queue = Queue.Queue()
+            self._writer = threading.Thread(target=self._write_batches, name="angr spiller writer")
+            self._writer.daemon = True
+            self._writer.start()
+
+        from ..state_plugins.history import SimStateHistory, AddressTrace
+        from ..storage.paged_memory import BasePage
+        self._history_cls = SimStateHistory
+        self._trace_cls = AddressTrace
+        self._page_cls = BasePage
+
+    def __len__(self):
+        return len(self._index)
+
+    #
+    # Public interface
+    #
+
+    def store(self, states):
+        """
+        Serialize a batch of states and append them to the segment file.
+
+        :param states:  A list of states.
+        :return:        A list of record keys, one for each state.
+        """
+        batch = [ ]
+        keys = [ self._record(state, batch) for state in states ]
+        self._append(batch)
+        return keys
+
+    def load(self, key):
+        """
+        Load a state that was previously stored.
+
+        :param key: The record key of the state, as returned by :meth:`store`.
+        :return:    The state.
+        """
+        return self._unserialize(self._read(key))
+
+    def flush(self):
+        """
+        Wait until all pending batches are written to the segment file.
+        """
+        if self._queue is not None:
+            self._queue.join()
+
+    def close(self):
+        """
+        Stop the writer thread and close the segment file.
+        """
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+        self._file.close()
+        if self._owns_file:
+            os.unlink(self.path)
+
+    #
+    # Writing
+    #
+
+    def _persistent_id(self, batch, root, obj):
+        if obj is root:
+            return None
+        name = self._shared_by_id.get(id(obj), None)
+        if name is not None:
+            return name
+        if isinstance(obj, self._history_cls):
+            return self._record_history(obj, batch)
+        if isinstance(obj, self._page_cls):
+            return self._record_shared(obj, batch)
+        if isinstance(obj, self._trace_cls):
+            return self._record_trace(obj, batch)
+        return None
+
+    def _serialize(self, obj, root, batch):
+        f = StringIO()
+        pickler = cPickle.Pickler(f, cPickle.HIGHEST_PROTOCOL)
+        pickler.persistent_id = lambda o: self._persistent_id(batch, root, o)
+        pickler.dump(obj)
+        return f.getvalue()
+
+    def _record(self, obj, batch, payload=None):
+        key = next(self._keys)
+        data = self._serialize(obj if payload is None else payload, obj, batch)
+        batch.append((key, data))
+        return key
+
+    def _stored_key(self, obj):
+        entry = self._written.get(id(obj), None)
+        if entry is not None and entry[1]() is obj:
+            return entry[0]
+        return None
+
+    def _remember(self, key, obj):
+        i = id(obj)
+        written = self._written
+
+        # forget the object when it dies, before its id can be reused
+        def forget(ref):
+            entry = written.get(i, None)
+            if entry is not None and entry[1] is ref:
+                del written[i]
+
+        written[i] = (key, weakref.ref(obj, forget))
+
+    def _record_shared(self, obj, batch):
+        key = self._stored_key(obj)
+        if key is None:
+            key = self._record(obj, batch)
+            self._remember(key, obj)
+        return key
+
+    def _record_history(self, history, batch):
+        # store the ancestry oldest-first, so that deep histories do not recurse
+        chain = [ ]
+        h = history
+        while h is not None and self._stored_key(h) is None:
+            chain.append(h)
+            h = h.parent
+        parent_key = None if h is None else self._stored_key(h)
+
+        for h in reversed(chain):
+            attrs = dict(h.__dict__)
+            attrs['state'] = None
+            attrs['strongref_state'] = None
+            del attrs['parent']
+            parent_key = self._record(h, batch, payload=_ReducedHistory(attrs, parent_key))
+            self._remember(parent_key, h)
+
+        return self._stored_key(history)
+
+    def _record_trace(self, trace, batch):
+        key = self._stored_key(trace)
+        if key is not None:
+            return key
+
+        # only full chunks are stored as shared records, since the last chunk of a trace may still be appended to.
+        # chunks that were widened to lists can not be referred to weakly, and are stored inline
+        chunks, bases, start, stop = trace.__getstate__()
+        num_full = stop >> trace.CHUNK_BITS
+        chunk_keys = [ chunk if isinstance(chunk, list) else self._record_shared(chunk, batch)
+                       for chunk in chunks[:num_full] ]
+        tail = None
+        if stop & trace.CHUNK_MASK:
+            tail = chunks[num_full][:stop & trace.CHUNK_MASK]
+        payload = _ReducedTrace(chunk_keys, tail, bases[:len(chunk_keys) + (tail is not None)], start, stop)
+
+        key = self._record(trace, batch, payload=payload)
+        self._remember(key, trace)
+        return key
+
+    def _append(self, batch):
+        if not batch:
+            return
+
+        offset = self._end
+        for key, data in batch:
+            self._index[key] = (self._end, len(data))
+            self._end += len(data)
+
+        blob = ''.join(data for _, data in batch)
+        if self._queue is None:
+            with self._lock:
+                self._file.seek(offset)
+                self._file.write(blob)
+        else:
+            with self._lock:
+                self._pending.update(batch)
+            self._queue.put((offset, blob, [ key for key, _ in batch ]))
+
+    def _write_batches(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                offset, blob, keys = job
+                with self._lock:
+                    self._file.seek(offset)
+                    self._file.write(blob)
+                    self._file.flush()
+                    for key in keys:
+                        del self._pending[key]
+            finally:
+                self._queue.task_done()
+
+    #
+    # Reading
+    #
+
+    def _read(self, key):
+        with self._lock:
+            try:
+                return self._pending[key]
+            except KeyError:
+                offset, length = self._index[key]
+                self._file.seek(offset)
+                return self._file.read(length)
+
+    def _persistent_load(self, pid):
+        if isinstance(pid, str):
+            return self._shared_by_name[pid]
+
+        obj = self._loaded.get(pid, None)
+        if obj is not None:
+            return obj
+
+        payload = self._unserialize(self._read(pid))
+        if isinstance(payload, _ReducedHistory):
+            return self._load_history(pid, payload)
+        if isinstance(payload, _ReducedTrace):
+            payload = self._load_trace(payload)
+
+        self._loaded[pid] = payload
+        self._remember(pid, payload)
+        return payload
+
+    def _load_history(self, key, payload):
+        # rebuild the ancestry oldest-first, so that deep histories do not recurse
+        chain = [ (key, payload) ]
+        parent_key = payload.parent_key
+        while parent_key is not None and parent_key not in self._loaded:
+            parent_payload = self._unserialize(self._read(parent_key))
+            chain.append((parent_key, parent_payload))
+            parent_key = parent_payload.parent_key
+        parent = None if parent_key is None else self._loaded[parent_key]
+
+        for k, p in reversed(chain):
+            h = self._history_cls.__new__(self._history_cls)
+            h.__dict__.update(p.attrs)
+            h.parent = parent
+            self._loaded[k] = h
+            self._remember(k, h)
+            parent = h
+
+        return parent
+
+    def _load_trace(self, payload):
+        chunks = [ k if isinstance(k, list) else self._persistent_load(k) for k in payload.chunk_keys ]
+        if payload.tail is not None:
+            chunks.append(payload.tail)
+        t = self._trace_cls.__new__(self._trace_cls)
+        t.__setstate__((chunks, list(payload.bases), payload.start, payload.stop))
+        return t
+
+    def _unserialize(self, data):
+        unpickler = cPickle.Unpickler(StringIO(data))
+        unpickler.persistent_load = self._persistent_load
+        return unpickler.load()
+
+
 class Spiller(ExplorationTechnique):
     """
     Automatically spill states out. It can spill out states to a different stash, spill
@@ -25,7 +369,7 @@ class Spiller(ExplorationTechnique):
         self,
         src_stash="active", min=5, max=10, #pylint:disable=redefined-builtin
         staging_stash="spill_stage", staging_min=10, staging_max=20,
-        pickle_callback=None, unpickle_callback=None, priority_key=None
+        pickle_callback=None, unpickle_callback=None, priority_key=None, storage=None
     ):
         """
         Initializes the spiller.
@@ -35,6 +379,7 @@ class Spiller(ExplorationTechnique):
         @param staging_stash: the stash *to* which to spill states (default: "spill_stage")
         @param staging_max: the number of states that can be in the staging stash before things get spilled to ANA (default: None. If staging_stash is set, then this means unlimited, and ANA will not be used).
         @param priority_key: a function that takes a state and returns its numberical priority (MAX_INT is lowest priority). By default, self.state_priority will be used, which prioritizes by object ID.
+        @param storage: a SegmentStore to spill states to instead of ANA (default: None).
         """
         super(Spiller, self).__init__()
         self.max = max
@@ -49,15 +394,19 @@ class Spiller(ExplorationTechnique):
         self.unpickle_callback = unpickle_callback
         self.pickle_callback = pickle_callback
 
-        # tracking of pickled stuff
+        self.storage = storage
+
+        # tracking of pickled stuff, as a heap of (priority, id) tuples
         self._pickled_states = [ ]
         self._ever_pickled = 0
         self._ever_unpickled = 0
 
     def _unpickle(self, n):
-        self._pickled_states.sort()
-        unpickled = [ SpilledState.ana_load(pid).state for _,pid in self._pickled_states[:n] ]
-        self._pickled_states[:n] = [ ]
+        ids = [ heapq.heappop(self._pickled_states)[1] for _ in xrange(min(n, len(self._pickled_states))) ]
+        if self.storage is not None:
+            unpickled = [ self.storage.load(key) for key in ids ]
+        else:
+            unpickled = [ SpilledState.ana_load(pid).state for pid in ids ]
         self._ever_unpickled += len(unpickled)
         if self.unpickle_callback:
             map(self.unpickle_callback, unpickled)
@@ -69,11 +418,16 @@ class Spiller(ExplorationTechnique):
     def _pickle(self, states):
         if self.pickle_callback:
             map(self.pickle_callback, states)
-        wrappers = [ SpilledState(state) for state in states ]
         self._ever_pickled += len(states)
-        for w in wrappers:
-            w.make_uuid()
-        self._pickled_states += [ (self._get_priority(w.state), w.ana_store()) for w in wrappers ]
+        if self.storage is not None:
+            ids = self.storage.store(states)
+        else:
+            wrappers = [ SpilledState(state) for state in states ]
+            for w in wrappers:
+                w.make_uuid()
+            ids = [ w.ana_store() for w in wrappers ]
+        for state, i in zip(states, ids):
+            heapq.heappush(self._pickled_states, (self._get_priority(state), i))
 
     def step(self, simgr, stash=None, **kwargs):
         simgr = simgr.step(stash=stash, **kwargs)
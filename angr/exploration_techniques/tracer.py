@@ -1,6 +1,8 @@
 import os
+import bisect
 import tempfile
 import logging
+from collections import defaultdict
 
 import claripy
 
@@ -23,9 +25,15 @@ class Tracer(ExplorationTechnique):
     If the given concrete input makes the program crash, the last correct
     states that you might want are kept in the 'predecessors' list. The crashed
     state can be found with CrashMonitor exploration technique.
+
+    In fast-forward mode, the stretches of the trace where the path does not fork are executed in a tight loop within
+    a single step, through the filter, selector and step_state hooks of the simulation manager, and only the blocks
+    where angr and the trace may disagree (forks, syscalls, hooks, errors and the end of the trace) are synchronized by
+    the tracer. Concrete stretches are executed in bulk by unicorn if the state has the unicorn options enabled.
     """
 
-    def __init__(self, trace=None, resiliency=True, use_cache=True, dump_syscall=False, keep_predecessors=1):
+    def __init__(self, trace=None, resiliency=True, use_cache=True, dump_syscall=False, keep_predecessors=1,
+                 fast_forward=False):
         """
         :param trace:               The basic block trace.
         :param resiliency:          Should we continue to step forward even if qemu and angr disagree?
@@ -33,6 +41,8 @@ class Tracer(ExplorationTechnique):
         :param dump_syscall:        True if we want to dump the syscall information.
         :param keep_predecessors:   Number of states before the final state we should preserve.
                                     Default 1, must be greater than 0.
+        :param fast_forward:        True if we want to fast-forward through the stretches of the trace that do not
+                                    fork.
         """
 
         super(Tracer, self).__init__()
@@ -53,6 +63,15 @@ class Tracer(ExplorationTechnique):
             self._syscalls = []
 
         self._use_cache = use_cache
+        self._fast_forward = fast_forward
+
+        # the positions of every block address in the trace
+        self._trace_index = defaultdict(list)
+        for i, addr in enumerate(self._trace or ()):
+            self._trace_index[addr].append(i)
+
+        # the back loop targets and jumpkinds of the blocks of the trace, only cached in fast-forward mode
+        self._back_targets = {}
 
     def setup(self, simgr):
         simgr.populate('missed', [])  # create the 'missed' stash
@@ -119,9 +138,8 @@ class Tracer(ExplorationTechnique):
         if len(simgr.active) == 1:
             current = simgr.active[0]
 
-            if current.history.recent_block_count > 1:
-                # executed unicorn fix bb_cnt
-                current.globals['bb_cnt'] += current.history.recent_block_count - 1 - current.history.recent_syscall_count
+            # executed unicorn fix bb_cnt
+            current.globals['bb_cnt'] += self._unicorn_blocks(current)
 
             if not self._no_follow:
                 # termination condition: we exhausted the dynamic trace log
@@ -153,9 +171,7 @@ class Tracer(ExplorationTechnique):
                     l.debug("previous addr %#x", current.history.addr)
                     l.debug("bb_cnt %d", current.globals['bb_cnt'])
                     # we need step to the return
-                    current_addr = current.addr
-                    while current.globals['bb_cnt'] < len(self._trace) and current_addr != self._trace[current.globals['bb_cnt']]:
-                        current.globals['bb_cnt'] += 1
+                    current.globals['bb_cnt'] = self._next_in_trace(current.addr, current.globals['bb_cnt'])
                     # step 1 more for the normal step that would happen
                     current.globals['bb_cnt'] += 1
                     l.debug("bb_cnt after the correction %d", current.globals['bb_cnt'])
@@ -182,36 +198,26 @@ class Tracer(ExplorationTechnique):
             self.predecessors.append(current)
             self.predecessors.pop(0)
 
-            # Basic block's max size in angr is greater than the one in Qemu
-            # We follow the one in Qemu
-            if current.globals['bb_cnt'] >= len(self._trace):
-                bbl_max_bytes = 800
-            else:
-                y2 = self._trace[current.globals['bb_cnt']]
-                y1 = self._trace[current.globals['bb_cnt'] - 1]
-                bbl_max_bytes = y2 - y1
-                if bbl_max_bytes <= 0:
-                    bbl_max_bytes = 800
-
-            # detect back loops (a block jumps back to the middle of itself) that have to be differentiated from the
-            # case where max block sizes doesn't match.
-
-            # this might still break for huge basic blocks with back loops, but it seems unlikely.
-            try:
-                bl = self.project.factory.block(self._trace[current.globals['bb_cnt']-1],
-                        backup_state=current)
-                back_targets = set(bl.vex.constant_jump_targets) & set(bl.instruction_addrs)
-                if current.globals['bb_cnt'] < len(self._trace) and self._trace[current.globals['bb_cnt']] in back_targets:
-                    target_to_jumpkind = bl.vex.constant_jump_targets_and_jumpkinds
-                    if target_to_jumpkind[self._trace[current.globals['bb_cnt']]] == "Ijk_Boring":
-                        bbl_max_bytes = 800
-            except (SimMemoryError, SimEngineError):
-                bbl_max_bytes = 800
+            bbl_max_bytes = self._bbl_max_bytes(current)
+
+            stepped = None
+            if self._fast_forward and not self._no_follow:
+                current, bbl_max_bytes, stepped = self._fast_forward_state(simgr, current, bbl_max_bytes, stash)
+                simgr.drop(stash=stash)
+                if stepped is None:
+                    simgr.populate(stash, [current])
 
             # drop the missed stash before stepping, since driller needs missed paths later.
             simgr.drop(stash='missed')
 
-            simgr.step(stash=stash, size=bbl_max_bytes)
+            if stepped is None:
+                simgr.step(stash=stash, size=bbl_max_bytes)
+            else:
+                # the last state was already stepped while fast-forwarding, store its successors like a step would
+                if not any(stepped.itervalues()):
+                    stepped = {'deadended': [current]}
+                for to_stash, states in stepped.iteritems():
+                    simgr.populate(to_stash or stash, states)
 
             # if our input was preconstrained we have to keep on the lookout for unsat paths.
             if current.preconstrainer._preconstrain_input:
@@ -275,6 +281,116 @@ class Tracer(ExplorationTechnique):
 
         return simgr
 
+    def _fast_forward_state(self, simgr, state, bbl_max_bytes, stash):
+        """
+        Step a state that is synchronized with the trace outside of the simulation manager, for as long as it follows
+        the trace without forking.
+
+        Every block goes through the filter, selector and step_state hooks of the simulation manager, so the other
+        exploration techniques see the fast-forwarded states as if they were stepped one by one.
+
+        :param simgr:           The simulation manager.
+        :param state:           The state, whose block counter already accounts for its address.
+        :param bbl_max_bytes:   The size of the next block to execute.
+        :param stash:           The name of the stash that is stepped.
+        :return:                A tuple of the last synchronized state, the size of its next block, and the result of
+                                stepping it as a dict mapping stash names to states (or None if it should be stepped
+                                normally).
+        """
+        while state.globals['bb_cnt'] < len(self._trace) - 1:
+            # states that other exploration techniques filter out or hold back are handled by a normal step
+            goto = simgr.filter(state)
+            filtered = state
+            if isinstance(goto, tuple):
+                goto, filtered = goto
+            if goto not in (None, stash) or not simgr.selector(filtered):
+                break
+            if filtered is not state:
+                state = filtered
+                bbl_max_bytes = self._bbl_max_bytes(state)
+
+            stepped = simgr.step_state(state, size=bbl_max_bytes)
+
+            # forks, unsat and unconstrained successors and errors are categorized by the tracer as usual
+            successors = stepped.get(None, []) + stepped.get(stash, [])
+            if len(successors) != 1 or any(states for to_stash, states in stepped.iteritems()
+                                           if to_stash not in (None, stash)):
+                return state, bbl_max_bytes, stepped
+
+            successor = successors[0]
+            bb_cnt = successor.globals['bb_cnt'] + self._unicorn_blocks(successor)
+            if bb_cnt >= len(self._trace) - 1 \
+                    or successor.addr != self._trace[bb_cnt] \
+                    or successor.history.jumpkind.startswith('Ijk_Sys') \
+                    or self.project.is_hooked(successor.addr):
+                return state, bbl_max_bytes, stepped
+
+            successor.globals['bb_cnt'] = bb_cnt + 1
+            self.predecessors.append(successor)
+            self.predecessors.pop(0)
+
+            state = successor
+            bbl_max_bytes = self._bbl_max_bytes(state)
+
+        return state, bbl_max_bytes, None
+
+    @staticmethod
+    def _unicorn_blocks(state):
+        """
+        Get the number of trace entries that were executed by unicorn in the last step of a state, besides the last one.
+        """
+        if state.history.recent_block_count > 1:
+            return state.history.recent_block_count - 1 - state.history.recent_syscall_count
+        return 0
+
+    def _next_in_trace(self, addr, start):
+        """
+        Find the next occurrence of an address in the trace.
+
+        :param addr:    The block address.
+        :param start:   The position to start looking from.
+        :return:        The position of the address, or the length of the trace if it does not occur again.
+        """
+        positions = self._trace_index.get(addr, ())
+        i = bisect.bisect_left(positions, start)
+        return positions[i] if i < len(positions) else len(self._trace)
+
+    def _bbl_max_bytes(self, state):
+        """
+        Get the size of the next block a state synchronized with the trace should execute.
+        """
+        # Basic block's max size in angr is greater than the one in Qemu
+        # We follow the one in Qemu
+        bb_cnt = state.globals['bb_cnt']
+        if bb_cnt >= len(self._trace):
+            return 800
+
+        y2 = self._trace[bb_cnt]
+        y1 = self._trace[bb_cnt - 1]
+        bbl_max_bytes = y2 - y1
+        if bbl_max_bytes <= 0:
+            bbl_max_bytes = 800
+
+        # detect back loops (a block jumps back to the middle of itself) that have to be differentiated from the
+        # case where max block sizes doesn't match.
+
+        # this might still break for huge basic blocks with back loops, but it seems unlikely.
+        try:
+            back_targets = self._back_targets.get(y1, None)
+            if back_targets is None:
+                bl = self.project.factory.block(y1, backup_state=state)
+                target_to_jumpkind = bl.vex.constant_jump_targets_and_jumpkinds
+                back_targets = {t: target_to_jumpkind.get(t, None) for t in bl.vex.constant_jump_targets
+                                if t in bl.instruction_addrs}
+                if self._fast_forward:
+                    self._back_targets[y1] = back_targets
+            if back_targets.get(y2, None) == "Ijk_Boring":
+                bbl_max_bytes = 800
+        except (SimMemoryError, SimEngineError):
+            bbl_max_bytes = 800
+
+        return bbl_max_bytes
+
     def _syscall(self, state):
         syscall_addr = state.se.eval(state.ip)
         args = None
@@ -5,4 +5,5 @@ from .comments import Comments
 from .data import Data
 from .indirect_jumps import IndirectJumps
 from .labels import Labels
+from .data_dependencies import DataDependencies, FunctionDataDependencies
 from .plugin import KnowledgeBasePlugin
@@ -0,0 +1,45 @@
+import networkx
+
+from .plugin import KnowledgeBasePlugin
+
+
+class FunctionDataDependencies(object):
+    """
+    The data dependencies inside a single function, as computed by the static mode of the DDG analysis.
+    """
+
+    __slots__ = ('graph', 'data_graph', )
+
+    def __init__(self, graph=None, data_graph=None):
+        """
+        :param networkx.DiGraph graph:      Dependencies between CodeLocations.
+        :param networkx.DiGraph data_graph: Dependencies between ProgramVariables.
+        """
+
+        self.graph = networkx.DiGraph() if graph is None else graph
+        self.data_graph = networkx.DiGraph() if data_graph is None else data_graph
+
+    def __repr__(self):
+        return "<FunctionDataDependencies: %d statements, %d variables>" % (len(self.graph), len(self.data_graph))
+
+    def copy(self):
+        return FunctionDataDependencies(graph=networkx.DiGraph(self.graph),
+                                        data_graph=networkx.DiGraph(self.data_graph))
+
+
+class DataDependencies(KnowledgeBasePlugin, dict):
+    """
+    Maps function addresses to the FunctionDataDependencies of those functions.
+    """
+
+    def __init__(self, kb):
+        super(DataDependencies, self).__init__()
+        self._kb = kb
+
+    def copy(self):
+        o = DataDependencies(self._kb)
+        o.update({k: v.copy() for k, v in self.iteritems()})
+        return o
+
+
+KnowledgeBasePlugin.register_default('data_dependencies', DataDependencies)
@@ -618,6 +618,7 @@ class Function(object):
             if is_local:
                 self._local_blocks[node.addr] = node
                 self._local_block_addrs.add(node.addr)
+                self._function_manager._register_block(self.addr, node)
             # add BlockNodes to the addr_to_block_node cache if not already there
             if isinstance(node, BlockNode):
                 if node.addr not in self._addr_to_block_node:
@@ -981,6 +982,7 @@ class Function(object):
                 if n.addr in self._local_blocks and self._local_blocks[n.addr].size != new_node.size:
                     del self._local_blocks[n.addr]
                     self._local_blocks[n.addr] = new_node
+                    self._function_manager._register_block(self.addr, new_node)
 
                 # update block_cache and block_sizes
                 if (n.addr in self._block_cache and self._block_cache[n.addr].size != new_node.size) or \
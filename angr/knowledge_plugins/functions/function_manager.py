@@ -47,6 +47,58 @@ class FunctionDict(dict):
         return self._avltree.ceiling_key(addr)
 
 
+class BlockDict(dict):
+    """
+    BlockDict is a dict where the keys are block starting addresses and map to the associated block nodes. It keeps the
+    blocks sorted by address as well, so that the blocks covering an arbitrary address can be found quickly.
+    """
+    def __init__(self, *args, **kwargs):
+        super(BlockDict, self).__init__()
+        self._avltree = bintrees.AVLTree()
+        self._max_block_size = 0
+        self.update(*args, **kwargs)
+
+    def __reduce__(self):
+        return BlockDict, (dict(self), )
+
+    def __setitem__(self, addr, node):
+        self._avltree[addr] = node
+        size = node.size
+        if size is not None and size > self._max_block_size:
+            self._max_block_size = size
+        super(BlockDict, self).__setitem__(addr, node)
+
+    def __delitem__(self, addr):
+        del self._avltree[addr]
+        super(BlockDict, self).__delitem__(addr)
+
+    def update(self, *args, **kwargs):
+        for addr, node in dict(*args, **kwargs).iteritems():
+            self[addr] = node
+
+    def clear(self):
+        self._avltree.clear()
+        self._max_block_size = 0
+        super(BlockDict, self).clear()
+
+    def copy(self):
+        return BlockDict(self)
+
+    def blocks_containing(self, addr):
+        """
+        Get all blocks covering a specific address, starting with the block that begins closest to it.
+
+        :param int addr: The address.
+        :return:         A generator of block nodes.
+        """
+        for start, node in self._avltree.iter_items(addr - self._max_block_size, addr + 1, reverse=True):
+            if node.size is None:
+                if start == addr:
+                    yield node
+            elif addr < start + node.size:
+                yield node
+
+
 class FunctionManager(KnowledgeBasePlugin, collections.Mapping):
     """
     This is a function boundaries management tool. It takes in intermediate
@@ -57,7 +109,9 @@ class FunctionManager(KnowledgeBasePlugin, collections.Mapping):
         self._kb = kb
         self._function_map = FunctionDict(self)
         self.callgraph = networkx.MultiDiGraph()
-        self.block_map = {}
+        self.block_map = BlockDict()
+        # addresses of the functions each block in block_map belongs to
+        self._block_functions = collections.defaultdict(set)
 
         # Registers used for passing arguments around
         self._arg_registers = kb._project.arch.argument_registers
@@ -66,6 +120,9 @@ class FunctionManager(KnowledgeBasePlugin, collections.Mapping):
         fm = FunctionManager(self._kb)
         fm._function_map = self._function_map.copy()
         fm.callgraph = networkx.MultiDiGraph(self.callgraph)
+        fm.block_map = self.block_map.copy()
+        for block_addr, function_addrs in self._block_functions.iteritems():
+            fm._block_functions[block_addr] = set(function_addrs)
         fm._arg_registers = self._arg_registers.copy()
 
         return fm
@@ -74,6 +131,7 @@ class FunctionManager(KnowledgeBasePlugin, collections.Mapping):
         self._function_map.clear()
         self.callgraph = networkx.MultiDiGraph()
         self.block_map.clear()
+        self._block_functions.clear()
 
     def _genenare_callmap_sif(self, filepath):
         """
@@ -93,7 +151,56 @@ class FunctionManager(KnowledgeBasePlugin, collections.Mapping):
         if syscall in (True, False):
             dst_func.is_syscall = syscall
         dst_func._register_nodes(True, node)
+
+    def _register_block(self, function_addr, node):
+        """
+        Index a block of a function, so that :meth:`block_containing` and :meth:`function_containing` find it. This is
+        called by the function whenever a block is added to it.
+        """
         self.block_map[node.addr] = node
+        self._block_functions[node.addr].add(function_addr)
+
+    def _unregister_block(self, function_addr, block_addr):
+        function_addrs = self._block_functions.get(block_addr, None)
+        if function_addrs is None:
+            return
+        function_addrs.discard(function_addr)
+        if not function_addrs:
+            del self._block_functions[block_addr]
+            if block_addr in self.block_map:
+                del self.block_map[block_addr]
+
+    def _remove_node(self, addr):
+        """
+        Remove the block starting at `addr` from the block index of all functions, after it has been removed from the
+        CFG.
+
+        :param int addr: Address of the block.
+        :return:         None
+        """
+        self._block_functions.pop(addr, None)
+        if addr in self.block_map:
+            del self.block_map[addr]
+
+    def _shrink_node(self, addr, new_size):
+        """
+        Update the block index after the block starting at `addr` has been split in two in the CFG: the block now ends
+        at `addr + new_size`, and the rest of it is a new block that belongs to the same functions.
+
+        :param int addr:     Address of the block.
+        :param int new_size: The new size of the block.
+        :return:             None
+        """
+        node = self.block_map.get(addr, None)
+        if node is None or node.size is None or node.size <= new_size:
+            return
+        self.block_map[addr] = BlockNode(addr, new_size, thumb=node.thumb)
+        successor_addr = addr + new_size
+        if successor_addr not in self.block_map:
+            self.block_map[successor_addr] = BlockNode(successor_addr, node.size - new_size, thumb=node.thumb)
+        function_addrs = self._block_functions.get(addr, None)
+        if function_addrs:
+            self._block_functions[successor_addr] |= function_addrs
 
     def _add_call_to(self, function_addr, from_node, to_addr, retn_node, syscall=None, stmt_idx=None, ins_addr=None,
                      return_to_outside=False):
@@ -227,12 +334,22 @@ class FunctionManager(KnowledgeBasePlugin, collections.Mapping):
 
     def __setitem__(self, k, v):
         if isinstance(k, (int, long)):
+            old = self._function_map.get(k, None)
+            if old is not None:
+                for block_addr in old.block_addrs_set:
+                    self._unregister_block(k, block_addr)
             self._function_map[k] = v
+            for node in v._local_blocks.itervalues():
+                self._register_block(k, node)
         else:
             raise ValueError("FunctionManager.__setitem__ keys must be an int")
 
     def __delitem__(self, k):
         if isinstance(k, (int, long)):
+            func = self._function_map.get(k, None)
+            if func is not None:
+                for block_addr in func.block_addrs_set:
+                    self._unregister_block(k, block_addr)
             del self._function_map[k]
             if k in self.callgraph:
                 self.callgraph.remove_node(k)
@@ -256,6 +373,33 @@ class FunctionManager(KnowledgeBasePlugin, collections.Mapping):
         """
         return addr in self._function_map
 
+    def block_containing(self, addr):
+        """
+        Return a block of any function that covers `addr`. If there are several such blocks, the one starting closest
+        to `addr` is returned.
+
+        :param int addr: The address to query.
+        :return:         The block node, or None if no block covers `addr`.
+        """
+
+        return next(self.block_map.blocks_containing(addr), None)
+
+    def function_containing(self, addr):
+        """
+        Return a function that has a block covering `addr`. Blocks are searched starting with the one that begins closest
+        to `addr`, and if several functions share that block, the one with the lowest address is returned.
+
+        :param int addr: The address to query.
+        :return:         A Function instance, or None if no block of any function covers `addr`.
+        :rtype:          Function or None
+        """
+
+        for block in self.block_map.blocks_containing(addr):
+            function_addrs = self._block_functions.get(block.addr, None)
+            if function_addrs:
+                return self._function_map[min(function_addrs)]
+        return None
+
     def ceiling_func(self, addr):
         """
         Return the function who has the least address that is greater than or equal to `addr`.
@@ -328,3 +472,5 @@ class FunctionManager(KnowledgeBasePlugin, collections.Mapping):
             func.dbg_draw(filename)
 
 KnowledgeBasePlugin.register_default('functions', FunctionManager)
+
+from ...codenode import BlockNode
@@ -4,6 +4,22 @@ import logging
 l = logging.getLogger(name=__name__)
 
 
+class SharedPlugin(object):
+    """
+    A plugin shared by several plugin hubs. The first hub to access it gets a copy of it, unless it is the last hub
+    sharing it, in which case it takes the plugin itself.
+    """
+
+    __slots__ = ('plugin', 'holders', )
+
+    def __init__(self, plugin):
+        self.plugin = plugin
+        self.holders = 1
+
+    def __repr__(self):
+        return "<SharedPlugin %r, shared by %d hubs>" % (self.plugin, self.holders)
+
+
 class PluginHub(object):
     """
     A plugin hub is an object which contains many plugins, as well as the notion of a "preset", or a
@@ -22,6 +38,7 @@ class PluginHub(object):
     def __init__(self):
         super(PluginHub, self).__init__()
         self._active_plugins = {}
+        self._shared_plugins = {}
         self._active_preset = None
         self._provided_by_preset = []
 
@@ -54,12 +71,14 @@ class PluginHub(object):
     #
 
     def __getstate__(self):
+        self._unshare_plugins()
         return self._active_plugins, self._active_preset
 
     def __setstate__(self, s):
         plugins, preset = s
         self._active_preset = preset
         self._active_plugins = {}
+        self._shared_plugins = {}
 
         for name, plugin in plugins.items():
             if name not in self._active_plugins:
@@ -73,6 +92,7 @@ class PluginHub(object):
 
     def __dir__(self):
         out = set(self._active_plugins)
+        out.update(self._shared_plugins)
         if self.has_plugin_preset:
             out.update(self._active_preset.list_default_plugins())
 
@@ -149,6 +169,9 @@ class PluginHub(object):
         if name in self._active_plugins:
             return self._active_plugins[name]
 
+        elif name in self._shared_plugins:
+            return self._unshare_plugin(name)
+
         elif self.has_plugin_preset:
             plugin_cls = self._active_preset.request_plugin(name)
             plugin = self._init_plugin(plugin_cls)
@@ -174,7 +197,7 @@ class PluginHub(object):
         """
         Return whether or not a plugin with the name ``name`` is curently active.
         """
-        return name in self._active_plugins
+        return name in self._active_plugins or name in self._shared_plugins
 
     def register_plugin(self, name, plugin):
         """
@@ -190,6 +213,10 @@ class PluginHub(object):
         """
         Deactivate and remove the plugin with name ``name``.
         """
+        if name in self._shared_plugins:
+            self._shared_plugins.pop(name).holders -= 1
+            return
+
         plugin = self._active_plugins[name]
         if id(plugin) in self._provided_by_preset:
             self._provided_by_preset.remove(id(plugin))
@@ -197,6 +224,70 @@ class PluginHub(object):
         del self._active_plugins[name]
         delattr(self, name)
 
+    #
+    #   Methods for sharing plugins between hubs
+    #
+
+    def share_plugins(self, predicate=None):
+        """
+        Share the active plugins of this hub with a new hub, instead of copying them. A shared plugin is only copied
+        when one of the hubs sharing it accesses it. The last hub to access it takes the plugin itself.
+
+        Both hubs must only access shared plugins through the hub once this is called, and not through references to
+        the plugins they obtained earlier.
+
+        :param predicate:   A function that tells if a plugin can be shared. Other plugins are left alone.
+        :return:            A dict from plugin names to SharedPlugin objects, for the new hub's adopt_plugins().
+        """
+        memo = {}
+        for name, plugin in self._active_plugins.items():
+            if predicate is not None and not predicate(plugin):
+                continue
+            if id(plugin) not in memo:
+                memo[id(plugin)] = SharedPlugin(plugin)
+            self._shared_plugins[name] = memo[id(plugin)]
+            del self._active_plugins[name]
+            delattr(self, name)
+
+        for shared in { id(s): s for s in self._shared_plugins.itervalues() }.itervalues():
+            shared.holders += 1
+        return dict(self._shared_plugins)
+
+    def adopt_plugins(self, shared_plugins):
+        """
+        Start sharing plugins that another hub shared with share_plugins().
+        """
+        for name, shared in shared_plugins.iteritems():
+            if name in self._active_plugins:
+                self.release_plugin(name)
+            self._shared_plugins[name] = shared
+
+    def _unshare_plugin(self, name):
+        """
+        Stop sharing a plugin, and activate either a copy of it or the plugin itself.
+        """
+        shared = self._shared_plugins[name]
+        if shared.holders == 1:
+            plugin = shared.plugin
+        else:
+            plugin = shared.plugin.copy()
+            shared.holders -= 1
+
+        # the same plugin might be active under several names
+        for n, s in self._shared_plugins.items():
+            if s is shared:
+                del self._shared_plugins[n]
+                self.register_plugin(n, plugin)
+        return plugin
+
+    def _unshare_plugins(self):
+        """
+        Stop sharing all plugins.
+        """
+        for name in self._shared_plugins.keys():
+            if name in self._shared_plugins:
+                self._unshare_plugin(name)
+
 
 class PluginPreset(object):
     """
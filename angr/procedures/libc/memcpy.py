@@ -29,6 +29,12 @@ class memcpy(angr.SimProcedure):
         l.debug("Memcpy running with conditional_size %#x", conditional_size)
 
         if conditional_size > 0:
+            if not self.state.se.symbolic(limit) and ABSTRACT_MEMORY not in self.state.options:
+                # concrete bytes are copied without building an expression for them
+                src_mem = self.state.memory.load_bytes(src_addr, conditional_size)
+                self.state.memory.store_bytes(dst_addr, src_mem)
+                return dst_addr
+
             src_mem = self.state.memory.load(src_addr, conditional_size, endness='Iend_BE')
             if ABSTRACT_MEMORY in self.state.options:
                 self.state.memory.store(dst_addr, src_mem, size=conditional_size, endness='Iend_BE')
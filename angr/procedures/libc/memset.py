@@ -62,6 +62,10 @@ class memset(angr.SimProcedure):
                 if self.state.solver.symbolic(char):
                     l.debug("symbolic char")
                     write_bytes = self.state.solver.Concat(*([char] * chunksize))
+                elif ABSTRACT_MEMORY not in self.state.options:
+                    self.state.memory.store_bytes(dst_addr + offset, chr(char._model_concrete.value) * chunksize)
+                    offset += chunksize
+                    continue
                 else:
                     # Concatenating many bytes is slow, so some sort of optimization is required
                     if char._model_concrete.value == 0:
@@ -74,3 +78,5 @@ class memset(angr.SimProcedure):
                 offset += chunksize
 
         return dst_addr
+
+from ...sim_options import ABSTRACT_MEMORY
@@ -63,6 +63,8 @@ class Project(object):
     :param arch:                        The target architecture (auto-detected otherwise).
     :param simos:                       a SimOS class to use for this project.
     :param bool translation_cache:      If True, cache translated basic blocks rather than re-translating them.
+    :param persistent_translation_cache: An IRSBCache, or the path to one, to store translated basic blocks in. It is
+                                        shared by every process that uses it, and survives across runs.
     :param support_selfmodifying_code:  Whether we aggressively support self-modifying code. When enabled, emulation
                                         will try to read code from the current state instead of the original memory,
                                         regardless of the current memory protections.
@@ -99,6 +101,7 @@ class Project(object):
                  arch=None, simos=None,
                  load_options=None,
                  translation_cache=True,
+                 persistent_translation_cache=None,
                  support_selfmodifying_code=False,
                  store_function=None,
                  load_function=None,
@@ -157,6 +160,11 @@ class Project(object):
         self._ignore_functions = ignore_functions
         self._support_selfmodifying_code = support_selfmodifying_code
         self._translation_cache = translation_cache
+        if isinstance(persistent_translation_cache, basestring):
+            persistent_translation_cache = IRSBCache(persistent_translation_cache)
+        self._persistent_translation_cache = persistent_translation_cache
+        # results of solver queries, shared by the states of this project that have SOLVER_RESULT_CACHE enabled
+        self.solver_cache = SolverResultCache()
         self._executing = False # this is a flag for the convenience API, exec() and terminate_execution() below
 
         if support_selfmodifying_code:
@@ -648,5 +656,6 @@ from angr.simos import SimOS, os_mapping
 from .analyses.analysis import AnalysesHub
 from .surveyors import Surveyors
 from .knowledge_base import KnowledgeBase
-from .engines import EngineHub
+from .engines import EngineHub, IRSBCache
+from .state_plugins.solver import SolverResultCache
 from .procedures import SIM_PROCEDURES, SIM_LIBRARIES
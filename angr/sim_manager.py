@@ -222,6 +222,7 @@ class SimulationManager(ana.Storable, ImmutabilityMixin):
         HookSet.remove_hooks(self, **hooks)
 
         self._techniques.remove(tech)
+        tech.teardown(self)
         return tech
 
     #
@@ -841,6 +842,26 @@ class ErrorRecord(object):
         return self is other or self.state is other
 
 
+class RemoteErrorRecord(ErrorRecord):
+    """
+    An error that was thrown while a state was stepped in another process. The traceback of the error does not survive
+    the trip, and only its formatted text is kept.
+
+    :ivar formatted_traceback:  The formatted traceback of the error, as a string.
+    """
+
+    def __init__(self, state, error, formatted_traceback):
+        super(RemoteErrorRecord, self).__init__(state, error, None)
+        self.formatted_traceback = formatted_traceback
+
+    def debug(self):
+        """
+        Print the traceback of the error. A postmortem debug shell can not be launched, since the error was thrown in
+        another process.
+        """
+        print self.formatted_traceback
+
+
 from .errors import SimError, SimMergeError
 from .sim_state import SimState
 from .state_hierarchy import StateHierarchy
@@ -150,6 +150,9 @@ ABSTRACT_SOLVER = "ABSTRACT_SOLVER"
 # this stops SimRun for checking the satisfiability of successor states
 LAZY_SOLVES = "LAZY_SOLVES"
 
+# this makes SimSuccessors check the satisfiability of all the successor states of a step together, in one solver
+BATCHED_SUCCESSOR_CHECKS = "BATCHED_SUCCESSOR_CHECKS"
+
 # This makes angr downsize solvers wherever reasonable.
 DOWNSIZE_Z3 = "DOWNSIZE_Z3"
 
@@ -165,6 +168,12 @@ FAST_MEMORY = "FAST_MEMORY"
 # use FastMemory for registers
 FAST_REGISTERS = "FAST_REGISTERS"
 
+# store the concrete bytes of memory pages in byte arrays, and only keep memory objects for symbolic data
+ARRAY_PAGES = "ARRAY_PAGES"
+
+# compile lifted blocks into specialized statement handlers, which are reused every time a block is executed
+COMPILED_IRSB = "COMPILED_IRSB"
+
 # Under-constrained symbolic execution
 UNDER_CONSTRAINED_SYMEXEC = "UNDER_CONSTRAINED_SYMEXEC"
 
@@ -183,6 +192,9 @@ UNICORN_AGGRESSIVE_CONCRETIZATION = "UNICORN_AGGRESSIVE_CONCRETIZATION"
 
 UNICORN_HANDLE_TRANSMIT_SYSCALL = "UNICORN_HANDLE_TRANSMIT_SYSCALL"
 
+# keep the pages mapped into unicorn between runs, and only map again the pages that changed in angr's memory
+UNICORN_REUSE_PAGES = "UNICORN_REUSE_PAGES"
+
 # floating point support
 SUPPORT_FLOATING_POINT = "SUPPORT_FLOATING_POINT"
 
@@ -216,6 +228,20 @@ REPLACEMENT_SOLVER = "REPLACEMENT_SOLVER"
 # use a cache-less solver in claripy
 CACHELESS_SOLVER = "CACHELESS_SOLVER"
 
+# share the results of solver queries between all states of a project, through project.solver_cache
+SOLVER_RESULT_CACHE = "SOLVER_RESULT_CACHE"
+
+# with SOLVER_RESULT_CACHE, answer solver queries using only the independent constraints they share variables with
+SLICED_SOLVER_QUERIES = "SLICED_SOLVER_QUERIES"
+
+# let concretization strategies resolve symbolic addresses against recent models of the constraints, through
+# state.memory.concretization_models, before asking the solver
+CONCRETIZATION_MODEL_CACHE = "CONCRETIZATION_MODEL_CACHE"
+
+# share the plugins of a state with its copies, and only copy each plugin when one of the states accesses it. Plugins
+# must then be accessed through their state after a copy, not through references obtained before it.
+LAZY_PLUGIN_COPIES = "LAZY_PLUGIN_COPIES"
+
 # IR optimization
 OPTIMIZE_IR = "OPTIMIZE_IR"
 
@@ -246,6 +272,10 @@ TRACK_SOLVER_VARIABLES = "TRACK_SOLVER_VARIABLES"
 # Efficient state merging requires potential state ancestors being kept in memory
 EFFICIENT_STATE_MERGING = "EFFICIENT_STATE_MERGING"
 
+# store the block and instruction addresses of state histories in compact arrays, which are shared by all the histories
+# of a lineage. This must be enabled on the initial state.
+COMPACT_HISTORY = "COMPACT_HISTORY"
+
 # Return 0 instead of a symbolic byte for any unconstrained bytes in memory region
 ZERO_FILL_UNCONSTRAINED_MEMORY = 'ZERO_FILL_UNCONSTRAINED_MEMORY'
 
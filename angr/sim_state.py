@@ -10,7 +10,7 @@ import claripy
 import ana
 from archinfo import arch_from_id
 from .misc.ux import deprecated
-from .misc.plugins import PluginHub, PluginPreset
+from .misc.plugins import PluginHub, PluginPreset, SharedPlugin
 
 def arch_overrideable(f):
     @functools.wraps(f)
@@ -73,6 +73,10 @@ class SimState(PluginHub, ana.Storable):
             self.use_plugin_preset(plugin_preset)
 
         if plugins is not None:
+            # plugins shared with the state this one is a copy of
+            self.adopt_plugins({ n:p for n,p in plugins.iteritems() if type(p) is SharedPlugin })
+            plugins = { n:p for n,p in plugins.iteritems() if type(p) is not SharedPlugin }
+
             for n,p in plugins.iteritems():
                 self.register_plugin(n, p, inhibit_init=True)
             for p in plugins.itervalues():
@@ -141,12 +145,14 @@ class SimState(PluginHub, ana.Storable):
         self.ip_constraints = []
 
     def _ana_getstate(self):
+        self._unshare_plugins()
         s = dict(ana.Storable._ana_getstate(self))
         s = { k:v for k,v in s.iteritems() if k not in ('inspect', 'regs', 'mem')}
         s['_active_plugins'] = { k:v for k,v in s['_active_plugins'].iteritems() if k not in ('inspect', 'regs', 'mem') }
         return s
 
     def _ana_setstate(self, s):
+        s.setdefault('_shared_plugins', {})
         ana.Storable._ana_setstate(self, s)
         for p in self.plugins.values():
             p.set_state(self)
@@ -174,6 +180,7 @@ class SimState(PluginHub, ana.Storable):
     @property
     def plugins(self):
         # TODO: This shouldn't be access directly.
+        self._unshare_plugins()
         return self._active_plugins
 
     @property
@@ -372,7 +379,7 @@ class SimState(PluginHub, ana.Storable):
         Clean up after the solver engine. Calling this when a state no longer needs to be solved on will reduce memory
         usage.
         """
-        if 'solver' in self.plugins:
+        if self.has_plugin('solver'):
             self.solver.downsize()
 
     #
@@ -399,10 +406,22 @@ class SimState(PluginHub, ana.Storable):
             kwargs['addr'] = self.addr
         return self.project.factory.block(*args, backup_state=self, **kwargs)
 
+    @staticmethod
+    def _shareable_plugin(plugin):
+        # the copies of plugins are initialized for their new state right away, so plugins that need to be initialized
+        # cannot wait until they are accessed to be copied
+        return type(plugin).init_state.__func__ is SimStatePlugin.init_state.__func__
+
     # Returns a dict that is a copy of all the state's plugins
     def _copy_plugins(self):
+        if o.LAZY_PLUGIN_COPIES in self.options:
+            # plugins are only copied when either state accesses them
+            out = self.share_plugins(self._shareable_plugin)
+        else:
+            self._unshare_plugins()
+            out = {}
+
         memo = {}
-        out = {}
         for n, p in self._active_plugins.iteritems():
             if id(p) in memo:
                 out[n] = memo[id(p)]
@@ -825,6 +844,7 @@ default_state_plugin_preset = PluginPreset()
 SimState.register_preset('default', default_state_plugin_preset)
 
 from .state_plugins.history import SimStateHistory
+from .state_plugins.plugin import SimStatePlugin
 from .state_plugins.inspect import BP_AFTER, BP_BEFORE
 from .state_plugins.sim_action import SimActionConstraint
 
@@ -1,3 +1,4 @@
+import array
 import operator
 import logging
 import itertools
@@ -46,6 +47,12 @@ class SimStateHistory(SimStatePlugin):
         self.recent_stack_actions = [ ] if clone is None else list(clone.recent_stack_actions)
         self.last_stmt_idx = None if clone is None else clone.last_stmt_idx
 
+        # with COMPACT_HISTORY, the addresses of all the ancestors of this history are stored in these traces
+        self._bbl_trace = None if clone is None else clone._bbl_trace
+        self._ins_trace = None if clone is None else clone._ins_trace
+        # the traces including the addresses of this history, once they are shared with its children
+        self._sealed = None
+
         # numbers of blocks, syscalls, and instructions that were executed in this step
         self.recent_block_count = 0 if clone is None else clone.recent_block_count
         self.recent_syscall_count = 0 if clone is None else clone.recent_syscall_count
@@ -61,6 +68,9 @@ class SimStateHistory(SimStatePlugin):
 
     def init_state(self):
         self.successor_ip = self.state._ip
+        if self.parent is None and self._bbl_trace is None and sim_options.COMPACT_HISTORY in self.state.options:
+            self._bbl_trace = AddressTrace()
+            self._ins_trace = AddressTrace()
 
     def __getstate__(self):
         # flatten ancestry, otherwise we hit recursion errors trying to get the entire history...
@@ -116,6 +126,8 @@ class SimStateHistory(SimStatePlugin):
         # we must fix this in order to get
         # correct results when using constraints_since()
         self.parent = common_ancestor if common_ancestor is not None else self.parent
+        if common_ancestor is not None and self._bbl_trace is not None:
+            self._bbl_trace, self._ins_trace = common_ancestor._sealed or (None, None)
 
         self.recent_events = [e.recent_events for e in itertools.chain([self], others)
                               if not isinstance(e, SimActionConstraint)
@@ -148,6 +160,9 @@ class SimStateHistory(SimStatePlugin):
         """
         new_hist = self.copy()
         new_hist.parent = None
+        if new_hist._bbl_trace is not None:
+            new_hist._bbl_trace = AddressTrace()
+            new_hist._ins_trace = AddressTrace()
         self.state.register_plugin('history', new_hist)
 
     def filter_actions(self, block_addr=None, block_stmt=None, insn_addr=None, read_from=None, write_to=None):
@@ -358,9 +373,13 @@ class SimStateHistory(SimStatePlugin):
         return LambdaAttrIter(self, operator.attrgetter('recent_description'))
     @property
     def bbl_addrs(self):
+        if self._bbl_trace is not None:
+            return HistoryTrace(self._bbl_trace, self.recent_bbl_addrs)
         return LambdaIterIter(self, operator.attrgetter('recent_bbl_addrs'))
     @property
     def ins_addrs(self):
+        if self._ins_trace is not None:
+            return HistoryTrace(self._ins_trace, self.recent_ins_addrs)
         return LambdaIterIter(self, operator.attrgetter('recent_ins_addrs'))
     @property
     def trace(self):
@@ -433,7 +452,32 @@ class SimStateHistory(SimStatePlugin):
         return constraints
 
     def make_child(self):
-        return SimStateHistory(parent=self)
+        child = SimStateHistory(parent=self)
+        if self._bbl_trace is not None:
+            child._bbl_trace, child._ins_trace = self._seal()
+        return child
+
+    def _seal(self):
+        """
+        Append the addresses of this history to the traces of its ancestors, so that the resulting traces can be
+        shared by its children. The recent address lists of this history are replaced by read-only views of the traces.
+
+        :return: A tuple of the block address trace and the instruction address trace, or (None, None) if the
+                 addresses can not be stored in traces.
+        """
+        if self._sealed is None:
+            try:
+                bbl_trace = self._bbl_trace.extend(self.recent_bbl_addrs)
+                ins_trace = self._ins_trace.extend(self.recent_ins_addrs)
+            except TypeError:
+                l.warning("%s has non-integer addresses, which can not be stored in a compact history.", self)
+                self._sealed = (None, None)
+                return self._sealed
+
+            self.recent_bbl_addrs = bbl_trace.slice(len(self._bbl_trace), len(bbl_trace))
+            self.recent_ins_addrs = ins_trace.slice(len(self._ins_trace), len(ins_trace))
+            self._sealed = (bbl_trace, ins_trace)
+        return self._sealed
 
 class TreeIter(object):
     def __init__(self, start, end=None):
@@ -519,6 +563,219 @@ class LambdaIterIter(LambdaAttrIter):
                 yield a
 
 
+def _widen(chunk):
+    if chunk.typecode == 'i' and array.array('l').itemsize > chunk.itemsize:
+        return array.array('l', chunk)
+    return list(chunk)
+
+
+class AddressTrace(object):
+    """
+    An immutable sequence of addresses, which can be extended into a new sequence without copying it.
+
+    Addresses are stored in chunks of CHUNK_SIZE addresses. Every chunk stores the offsets of its addresses from its
+    first address, in an array of 32-bit integers that is only widened when an offset does not fit. Traces that extend
+    a common prefix share the chunks of that prefix, and the first trace that extends another one appends its
+    addresses to the shared chunks in place, so a lineage without forks is stored exactly once.
+    """
+
+    __slots__ = ('_chunks', '_bases', '_start', '_stop', '__weakref__', )
+
+    CHUNK_BITS = 12
+    CHUNK_SIZE = 1 << CHUNK_BITS
+    CHUNK_MASK = CHUNK_SIZE - 1
+
+    def __init__(self, addrs=()):
+        self._chunks = [ ]
+        self._bases = [ ]
+        self._start = 0
+        self._stop = 0
+        self._append(self._check(addrs))
+
+    def __getstate__(self):
+        return self._chunks, self._bases, self._start, self._stop
+
+    def __setstate__(self, s):
+        self._chunks, self._bases, self._start, self._stop = s
+
+    def __repr__(self):
+        return "<AddressTrace with %d addresses>" % len(self)
+
+    @staticmethod
+    def _check(addrs):
+        addrs = list(addrs)
+        for addr in addrs:
+            if type(addr) not in (int, long):
+                raise TypeError("Only integer addresses can be stored in an AddressTrace")
+        return addrs
+
+    def _append(self, addrs):
+        chunks, bases = self._chunks, self._bases
+        stop = self._stop
+        for addr in addrs:
+            if not stop & self.CHUNK_MASK:
+                chunks.append(array.array('i'))
+                bases.append(addr)
+            offset = addr - bases[-1]
+            try:
+                chunks[-1].append(offset)
+            except OverflowError:
+                chunks[-1] = _widen(chunks[-1])
+                chunks[-1].append(offset)
+            stop += 1
+        self._stop = stop
+
+    def extend(self, addrs):
+        """
+        Create a new trace, made of this trace followed by some addresses.
+
+        :param addrs:   An iterable of integer addresses.
+        :return:        The new trace.
+        """
+        if self._start:
+            raise ValueError("Slices of an AddressTrace can not be extended")
+        addrs = self._check(addrs)
+
+        t = AddressTrace.__new__(AddressTrace)
+        t._start = 0
+        t._stop = self._stop
+
+        used = self._stop & self.CHUNK_MASK
+        num_chunks = (self._stop + self.CHUNK_MASK) >> self.CHUNK_BITS
+        if len(self._chunks) == num_chunks and (not used or len(self._chunks[-1]) == used):
+            # nothing was appended to the chunks after this trace, so we can append to them in place
+            t._chunks = self._chunks
+            t._bases = self._bases
+        else:
+            t._chunks = self._chunks[:num_chunks]
+            t._bases = self._bases[:num_chunks]
+            if used:
+                t._chunks[-1] = t._chunks[-1][:used]
+
+        t._append(addrs)
+        return t
+
+    def slice(self, start, stop):
+        """
+        Create a read-only view of a part of this trace, without copying it.
+        """
+        start, stop, _ = slice(start, stop).indices(len(self))
+        t = AddressTrace.__new__(AddressTrace)
+        t._chunks = self._chunks
+        t._bases = self._bases
+        t._start = self._start + start
+        t._stop = self._start + max(start, stop)
+        return t
+
+    def _segments(self):
+        """
+        Iterate over the chunks in this trace, as tuples of the base address of the chunk, the chunk, and the range of
+        offsets in the chunk that belong to this trace.
+        """
+        start, stop = self._start, self._stop
+        for c in xrange(start >> self.CHUNK_BITS, (stop + self.CHUNK_MASK) >> self.CHUNK_BITS):
+            first = c << self.CHUNK_BITS
+            yield self._bases[c], self._chunks[c], max(start - first, 0), min(stop - first, self.CHUNK_SIZE)
+
+    def __len__(self):
+        return self._stop - self._start
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            return [ self[i] for i in xrange(*k.indices(len(self))) ]
+        if k < 0:
+            k += len(self)
+        if not 0 <= k < len(self):
+            raise IndexError(k)
+        k += self._start
+        return self._bases[k >> self.CHUNK_BITS] + self._chunks[k >> self.CHUNK_BITS][k & self.CHUNK_MASK]
+
+    def __iter__(self):
+        for base, chunk, lo, hi in self._segments():
+            for offset in itertools.islice(chunk, lo, hi):
+                yield base + offset
+
+    def __reversed__(self):
+        for base, chunk, lo, hi in reversed(list(self._segments())):
+            for i in xrange(hi - 1, lo - 1, -1):
+                yield base + chunk[i]
+
+    def __contains__(self, addr):
+        if type(addr) not in (int, long):
+            return False
+        for base, chunk, lo, hi in self._segments():
+            if lo or hi < len(chunk):
+                chunk = chunk[lo:hi]
+            if addr - base in chunk:
+                return True
+        return False
+
+    def count(self, addr):
+        """
+        Count the occurrences of an address in this trace. Every chunk is searched at once, without iterating over it
+        in Python.
+        """
+        if type(addr) not in (int, long):
+            return 0
+        n = 0
+        for base, chunk, lo, hi in self._segments():
+            if lo or hi < len(chunk):
+                chunk = chunk[lo:hi]
+            n += chunk.count(addr - base)
+        return n
+
+    @property
+    def hardcopy(self):
+        return list(self)
+
+
+class HistoryTrace(object):
+    """
+    The addresses of a history and all its ancestors, when they are stored in an AddressTrace. Unlike the iterators
+    over the ancestry of a history, it supports O(1) len() and indexing.
+    """
+
+    def __init__(self, ancestors, recent):
+        self._ancestors = ancestors
+        self._recent = recent
+
+    def __repr__(self):
+        return "<HistoryTrace with %d addresses>" % len(self)
+
+    def __len__(self):
+        return len(self._ancestors) + len(self._recent)
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            return [ self[i] for i in xrange(*k.indices(len(self))) ]
+        if k < 0:
+            k += len(self)
+        if not 0 <= k < len(self):
+            raise IndexError(k)
+        if k < len(self._ancestors):
+            return self._ancestors[k]
+        return self._recent[k - len(self._ancestors)]
+
+    def __iter__(self):
+        return itertools.chain(self._ancestors, self._recent)
+
+    def __reversed__(self):
+        return itertools.chain(reversed(self._recent), reversed(self._ancestors))
+
+    def __contains__(self, addr):
+        return addr in self._recent or addr in self._ancestors
+
+    def count(self, addr):
+        """
+        Count the occurrences of an address in the entire history.
+        """
+        return self._ancestors.count(addr) + self._recent.count(addr)
+
+    @property
+    def hardcopy(self):
+        return list(self)
+
+
 from angr.sim_state import SimState
 SimState.register_default('history', SimStateHistory)
 
@@ -1,6 +1,8 @@
 # TODO: SimValue being able to compare two symbolics for is_solution
 
 import logging
+from collections import defaultdict
+
 l = logging.getLogger("angr.state_plugins.inspect")
 
 event_types = {
@@ -201,6 +203,76 @@ class BP(object):
                (self.when, self.kwargs, "no" if self.condition is None else "with", "no" if self.action is None
                else "with")
 
+def _concrete_key(v):
+    """
+    Get the concrete value of an inspect attribute or of a breakpoint condition, or None if it is not concrete.
+    """
+    if isinstance(v, (int, long)):
+        return v
+    if isinstance(v, SimActionObject):
+        v = v.ast
+    if isinstance(v, claripy.ast.BV) and v.op == 'BVV':
+        return v.args[0]
+    return None
+
+
+class BreakpointIndex(object):
+    """
+    The breakpoints of one event type, indexed by the concrete value of one of their conditions.
+
+    A breakpoint with a condition on a concrete value (for example, ``mem_read_address=0x1000``) can only fire when the
+    corresponding inspect attribute has that value, so when the attribute is concrete, it is only checked if it is in
+    the bucket of that value. Breakpoints without any concrete condition are always checked.
+    """
+
+    def __init__(self, breakpoints):
+        self.size = len(breakpoints)
+        self._unindexed = [ ]
+        self._tables = defaultdict(lambda: defaultdict(list))
+
+        for pos, bp in enumerate(breakpoints):
+            for attr in sorted(bp.kwargs):
+                if attr.endswith('_unique'):
+                    continue
+                key = _concrete_key(bp.kwargs[attr])
+                # negative values may match the two's complement of the attribute, so they are not indexed
+                if key is not None and key >= 0:
+                    self._tables[attr][key].append((pos, bp))
+                    break
+            else:
+                self._unindexed.append((pos, bp))
+
+        self._tables = { attr: dict(table) for attr, table in self._tables.iteritems() }
+
+    def candidates(self, inspector):
+        """
+        Get the breakpoints that may fire, given the current inspect attributes.
+
+        :param SimInspector inspector:  The inspector.
+        :return:                        A list of breakpoints, in the order they were added in.
+        """
+        found = list(self._unindexed)
+        sources = 1 if found else 0
+        for attr, table in self._tables.iteritems():
+            current = getattr(inspector, attr)
+            if current is None:
+                # breakpoints with a condition on this attribute never fire
+                continue
+            key = _concrete_key(current)
+            if key is None:
+                # a symbolic attribute may match any of the breakpoints
+                for bps in table.itervalues():
+                    found.extend(bps)
+                    sources += 1
+            elif key in table:
+                found.extend(table[key])
+                sources += 1
+
+        if sources > 1:
+            found.sort(key=lambda p: p[0])
+        return [ bp for _, bp in found ]
+
+
 from .plugin import SimStatePlugin
 
 
@@ -218,6 +290,8 @@ class SimInspector(SimStatePlugin):
         self._breakpoints = { }
         for t in event_types:
             self._breakpoints[t] = [ ]
+        # BreakpointIndexes of the event types, which are built when they are first needed
+        self._indexes = { }
 
         for i in inspect_attributes:
             setattr(self, i, None)
@@ -230,20 +304,30 @@ class SimInspector(SimStatePlugin):
         Called from within SimuVEX when events happens. This function checks all breakpoints registered for that event
         and fires the ones whose conditions match.
         """
+        if not inspect_attributes.issuperset(kwargs):
+            k = next(k for k in kwargs if k not in inspect_attributes)
+            raise ValueError("Invalid inspect attribute %s passed in. Should be one of: %s" % (k, inspect_attributes))
+        self.__dict__.update(kwargs)
+
+        if not self._breakpoints[event_type]:
+            return
+
         l.debug("Event %s (%s) firing...", event_type, when)
-        for k,v in kwargs.iteritems():
-            if k not in inspect_attributes:
-                raise ValueError("Invalid inspect attribute %s passed in. Should be one of: %s" % (k, inspect_attributes))
-            #l.debug("... %s = %r", k, v)
-            l.debug("... setting %s", k)
-            setattr(self, k, v)
-
-        for bp in self._breakpoints[event_type]:
+        for bp in self._index(event_type).candidates(self):
             l.debug("... checking bp %r", bp)
             if bp.check(self.state, when):
                 l.debug("... FIRE")
                 bp.fire(self.state)
 
+    def _index(self, event_type):
+        """
+        Get the BreakpointIndex of an event type, building it if the breakpoints have changed.
+        """
+        index = self._indexes.get(event_type, None)
+        if index is None or index.size != len(self._breakpoints[event_type]):
+            index = self._indexes[event_type] = BreakpointIndex(self._breakpoints[event_type])
+        return index
+
     def make_breakpoint(self, event_type, *args, **kwargs):
         """
         Creates and adds a breakpoint which would trigger on `event_type`. Additional arguments are passed to the
@@ -270,6 +354,7 @@ class SimInspector(SimStatePlugin):
                                                                                         ", ".join(event_types))
                              )
         self._breakpoints[event_type].append(bp)
+        self._indexes.pop(event_type, None)
 
     def remove_breakpoint(self, event_type, bp=None, filter_func=None):
         """
@@ -290,6 +375,7 @@ class SimInspector(SimStatePlugin):
         except ValueError:
             # the breakpoint is not found
             l.error('remove_breakpoint(): Breakpoint %s (type %s) is not found.', bp, event_type)
+        self._indexes.pop(event_type, None)
 
     def copy(self):
         c = SimInspector()
@@ -298,6 +384,8 @@ class SimInspector(SimStatePlugin):
 
         for t,a in self._breakpoints.iteritems():
             c._breakpoints[t].extend(a)
+        # indexes are never modified, so they can be shared
+        c._indexes = dict(self._indexes)
         return c
 
     def downsize(self):
@@ -325,6 +413,7 @@ class SimInspector(SimStatePlugin):
                     if id(b) not in seen:
                         self._breakpoints[t].append(b)
                         seen.add(id(b))
+            self._indexes.pop(t, None)
         return False
 
     def merge(self, others, merge_conditions, common_ancestor=None):
@@ -336,3 +425,6 @@ class SimInspector(SimStatePlugin):
 
 from angr.sim_state import SimState
 SimState.register_default('inspect', SimInspector)
+
+import claripy
+from .sim_action_object import SimActionObject
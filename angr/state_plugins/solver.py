@@ -2,6 +2,7 @@ import sys
 import functools
 import time
 import logging
+from cachetools import LRUCache
 
 from .plugin import SimStatePlugin
 from .sim_action_object import ast_stripping_decorator, SimActionObject
@@ -187,6 +188,13 @@ class SimSolver(SimStatePlugin):
         self.temporal_tracked_variables = {} if temporal_tracked_variables is None else temporal_tracked_variables
         self.eternal_tracked_variables = {} if eternal_tracked_variables is None else eternal_tracked_variables
 
+        # the independent clusters of the constraints, used by SLICED_SOLVER_QUERIES. They are built lazily from the
+        # constraints of the solver, and are shared with the copies of the state until either side adds a constraint.
+        self._clusters = None
+        self._clusters_owned = False
+        self._ground_constraints = ()
+        self._unknown_clusters = frozenset()
+
     def reload_solver(self):
         """
         Reloads the solver. Useful when changing solver options.
@@ -195,6 +203,19 @@ class SimSolver(SimStatePlugin):
         constraints = self._solver.constraints
         self._stored_solver = None
         self._solver.add(constraints)
+        self._clusters = None
+
+    def replace_constraints(self, constraints):
+        """
+        Replace all constraints of the solver, e.g. to drop some of them. The independent clusters of constraints used
+        by SLICED_SOLVER_QUERIES are rebuilt from the new constraints.
+
+        :param constraints: The new constraints.
+        """
+
+        self._solver.constraints = list(constraints)
+        self._solver._result = None
+        self._clusters = None
 
     def get_variables(self, *keys):
         """
@@ -394,7 +415,12 @@ class SimSolver(SimStatePlugin):
     #
 
     def copy(self):
-        return SimSolver(solver=self._solver.branch(), all_variables=self.all_variables, temporal_tracked_variables=self.temporal_tracked_variables, eternal_tracked_variables=self.eternal_tracked_variables)
+        c = SimSolver(solver=self._solver.branch(), all_variables=self.all_variables, temporal_tracked_variables=self.temporal_tracked_variables, eternal_tracked_variables=self.eternal_tracked_variables)
+        c._clusters = self._clusters
+        c._ground_constraints = self._ground_constraints
+        c._unknown_clusters = self._unknown_clusters
+        self._clusters_owned = False
+        return c
 
     @error_converter
     def merge(self, others, merge_conditions, common_ancestor=None): # pylint: disable=W0613
@@ -402,6 +428,7 @@ class SimSolver(SimStatePlugin):
             [ oc._solver for oc in others ], merge_conditions,
             common_ancestor=common_ancestor._solver if common_ancestor is not None else None
         )
+        self._clusters = None
         return merging_occurred
 
     @error_converter
@@ -446,6 +473,16 @@ class SimSolver(SimStatePlugin):
         else:
             return constraints.__class__((self._adjust_constraint(self.And(*constraints)),))
 
+    def _result_cache(self):
+        """
+        Return the project-wide solver result cache, or None if results should not be cached.
+        """
+        if o.SOLVER_RESULT_CACHE not in self.state.options or self.state.project is None:
+            return None
+        if type(self._solver) not in SolverResultCache.CACHEABLE_SOLVERS:
+            return None
+        return self.state.project.solver_cache
+
     @timed_function
     @ast_stripping_decorator
     @error_converter
@@ -477,7 +514,21 @@ class SimSolver(SimStatePlugin):
         :return: a tuple of the solutions, in the form of Python primitives
         :rtype: tuple
         """
-        return self._solver.eval(e, n, extra_constraints=self._adjust_constraint_list(extra_constraints), exact=exact)
+        extra_constraints = self._adjust_constraint_list(extra_constraints)
+        cache = self._result_cache()
+        if cache is None:
+            return self._solver.eval(e, n, extra_constraints=extra_constraints, exact=exact)
+
+        solver, key, clusters = self._query_solver(cache, e, extra_constraints, exact)
+        try:
+            return cache.lookup_solutions(key, e, n)
+        except KeyError:
+            pass
+        r = solver.eval(e, n, extra_constraints=extra_constraints, exact=exact)
+        cache.store_solutions(key, e, n, r)
+        if r and exact is not False:
+            self._mark_satisfiable(cache, clusters)
+        return r
 
     @concrete_path_scalar
     @timed_function
@@ -497,7 +548,7 @@ class SimSolver(SimStatePlugin):
             er = self._solver.max(e, extra_constraints=self._adjust_constraint_list(extra_constraints))
             assert er <= ar
             return ar
-        return self._solver.max(e, extra_constraints=self._adjust_constraint_list(extra_constraints), exact=exact)
+        return self._cached_query('max', e, extra_constraints, exact)
 
     @concrete_path_scalar
     @timed_function
@@ -517,7 +568,7 @@ class SimSolver(SimStatePlugin):
             er = self._solver.min(e, extra_constraints=self._adjust_constraint_list(extra_constraints))
             assert ar <= er
             return ar
-        return self._solver.min(e, extra_constraints=self._adjust_constraint_list(extra_constraints), exact=exact)
+        return self._cached_query('min', e, extra_constraints, exact)
 
     @timed_function
     @ast_stripping_decorator
@@ -586,6 +637,22 @@ class SimSolver(SimStatePlugin):
             return ar
         return self._solver.is_false(e, extra_constraints=self._adjust_constraint_list(extra_constraints), exact=exact)
 
+    @timed_function
+    @ast_stripping_decorator
+    @error_converter
+    def batch_eval(self, exprs, n, extra_constraints=(), exact=None):
+        """
+        Evaluate several expressions together, using the solver if necessary. Returns primitives.
+
+        :param exprs: the expressions
+        :param n: the number of desired solutions
+        :param extra_constraints: extra constraints to apply to the solver
+        :param exact: if False, returns approximate solutions
+        :return: a list of at most n solutions, each a tuple with one value for every expression
+        :rtype: list
+        """
+        return self._solver.batch_eval(exprs, n, extra_constraints=self._adjust_constraint_list(extra_constraints), exact=exact)
+
     @timed_function
     @ast_stripping_decorator
     @error_converter
@@ -618,7 +685,127 @@ class SimSolver(SimStatePlugin):
             if er is True:
                 assert ar is True
             return ar
-        return self._solver.satisfiable(extra_constraints=self._adjust_constraint_list(extra_constraints), exact=exact)
+        return self._cached_query('satisfiable', None, extra_constraints, exact)
+
+    def _cached_query(self, query, e, extra_constraints, exact):
+        """
+        Run a max, min or satisfiable query through the solver result cache.
+        """
+        extra_constraints = self._adjust_constraint_list(extra_constraints)
+        args = () if e is None else (e, )
+        cache = self._result_cache()
+        if cache is None:
+            return getattr(self._solver, query)(*args, extra_constraints=extra_constraints, exact=exact)
+
+        solver, key, clusters = self._query_solver(cache, e, extra_constraints, exact)
+        try:
+            return cache.lookup(key, query, e)
+        except KeyError:
+            pass
+        r = getattr(solver, query)(*args, extra_constraints=extra_constraints, exact=exact)
+        cache.store(key, query, r, e)
+        if r is not False and exact is not False:
+            self._mark_satisfiable(cache, clusters)
+        return r
+
+    #
+    # Constraint independence
+    #
+
+    def _constraint_clusters(self):
+        """
+        Get the mapping from variables to the independent clusters of constraints they appear in, building it from
+        the constraints of the solver if necessary.
+        """
+        if self._clusters is None:
+            self._clusters = { }
+            self._clusters_owned = True
+            self._ground_constraints = ()
+            self._unknown_clusters = frozenset()
+            self._track_constraints(self._solver.constraints)
+        return self._clusters
+
+    def _track_constraints(self, constraints):
+        """
+        Add constraints to the independent clusters. Every cluster that shares a variable with a new constraint is
+        merged with it into a new cluster, which is not known to be satisfiable yet.
+        """
+        if self._clusters is None:
+            # not built yet, and will be built from the constraints of the solver
+            return
+        if not self._clusters_owned:
+            self._clusters = dict(self._clusters)
+            self._clusters_owned = True
+
+        for c in constraints:
+            if not isinstance(c, claripy.ast.Base) or not c.variables:
+                self._ground_constraints += (c, )
+                continue
+
+            merged = { self._clusters[v] for v in c.variables if v in self._clusters }
+            cluster = _ConstraintCluster.union(merged, c)
+            for v in cluster.variables:
+                self._clusters[v] = cluster
+            self._unknown_clusters = (self._unknown_clusters - merged) | { cluster }
+
+    def _query_solver(self, cache, e, extra_constraints, exact):
+        """
+        Choose the solver a cached query is dispatched to.
+
+        With SLICED_SOLVER_QUERIES, this is a solver that only holds the clusters of constraints the query shares
+        variables with, and the clusters that are not known to be satisfiable yet. Such solvers are kept by the result
+        cache, so that their models are reused by every state with the same clusters.
+
+        :return:    A tuple of the claripy solver, the cache key of the query, and the clusters the query depends on
+                    (None if the query is dispatched to the solver of the state).
+        """
+        if o.SLICED_SOLVER_QUERIES not in self.state.options or exact is False or \
+                type(self._solver) not in SolverResultCache.SLICEABLE_SOLVERS:
+            return self._solver, cache.key(self._solver, extra_constraints, exact), None
+
+        clusters = self._constraint_clusters()
+        variables = set() if e is None else set(e.variables)
+        for c in extra_constraints:
+            if isinstance(c, claripy.ast.Base):
+                variables.update(c.variables)
+        relevant = { clusters[v] for v in variables if v in clusters }
+
+        # an unsatisfiable cluster makes every query unsatisfiable, so the clusters that might be unsatisfiable are
+        # part of every query
+        if self._unknown_clusters:
+            self._unknown_clusters = frozenset(c for c in self._unknown_clusters if not cache.cluster_satisfiable(c))
+            relevant.update(self._unknown_clusters)
+
+        constraints = self._ground_constraints + tuple(c for cluster in relevant for c in cluster.constraints)
+        key = cache.key(self._solver, extra_constraints, exact, constraints=constraints)
+        return cache.cluster_solver(key[1], constraints), key, relevant
+
+    def _independent_constraints(self, variables):
+        """
+        Get the independent clusters of constraints that share variables with some variables.
+
+        :param variables:   A set of variable names.
+        :return:            A tuple of the set of clusters, and of the constraints without variables, which do not
+                            belong to any cluster.
+        """
+        clusters = self._constraint_clusters()
+        return { clusters[v] for v in variables if v in clusters }, self._ground_constraints
+
+    def _mark_satisfiable(self, cache, clusters):
+        """
+        Record that some clusters are satisfiable, after an exact query on them found a solution. None stands for every
+        cluster, which is the case for queries on the whole solver. Approximate queries prove nothing, and must not
+        be recorded.
+        """
+        if o.SLICED_SOLVER_QUERIES not in self.state.options or self._clusters is None:
+            return
+        if clusters is None:
+            clusters = self._unknown_clusters
+            self._unknown_clusters = frozenset()
+        else:
+            self._unknown_clusters = self._unknown_clusters - clusters
+        for c in clusters:
+            cache.store_cluster_satisfiable(c)
 
     @timed_function
     @ast_stripping_decorator
@@ -630,7 +817,9 @@ class SimSolver(SimStatePlugin):
         :param constraints:     Pass any constraints that you want to add (ASTs) as varargs.
         """
         cc = self._adjust_constraint_list(constraints)
-        return self._solver.add(cc)
+        r = self._solver.add(cc)
+        self._track_constraints(cc)
+        return r
 
     #
     # And some convenience stuff
@@ -888,6 +1077,191 @@ class SimSolver(SimStatePlugin):
         """
         return e.variables
 
+
+class _ConstraintCluster(object):
+    """
+    A set of constraints that transitively share variables, and that are therefore independent of all other
+    constraints. Clusters are never modified, so that the copies of a state can share them.
+    """
+
+    __slots__ = ('variables', 'constraints', 'key', )
+
+    def __init__(self, variables, constraints, key):
+        self.variables = variables
+        self.constraints = constraints
+        self.key = key
+
+    def __getstate__(self):
+        return self.variables, self.constraints, self.key
+
+    def __setstate__(self, s):
+        self.variables, self.constraints, self.key = s
+
+    def __repr__(self):
+        return "<Cluster of %d constraints over %d variables>" % (len(self.constraints), len(self.variables))
+
+    @staticmethod
+    def union(clusters, constraint):
+        """
+        Create the cluster holding a new constraint and all the constraints of some clusters.
+        """
+        return _ConstraintCluster(
+            frozenset(constraint.variables).union(*(c.variables for c in clusters)),
+            sum((c.constraints for c in clusters), ()) + (constraint, ),
+            frozenset((hash(constraint), )).union(*(c.key for c in clusters)),
+        )
+
+
+class SolverResultCache(object):
+    """
+    A bounded cache of solver query results, shared by all the states of a project. It is used by SimSolver when the
+    SOLVER_RESULT_CACHE option is enabled.
+
+    Results are keyed on the structural hashes of the constraints of the solver, of the extra constraints of the
+    query, and of the queried expression. Since the key covers everything a result depends on, a cached result is
+    never stale: sibling states, whose constraints only differ by the guards of their successors, share the results
+    of every query they have in common, and a query with different extra constraints is simply a different query.
+
+    :ivar int hits:     The number of queries that were answered from the cache.
+    :ivar int misses:   The number of queries that were not.
+    """
+
+    # solvers whose results only depend on their constraints. The replacement solver and the VSA solver are not in
+    # here, since their results also depend on their replacements and on the VSA state.
+    CACHEABLE_SOLVERS = (claripy.Solver, claripy.SolverCacheless, claripy.SolverComposite, claripy.SolverHybrid,
+                         claripy.SolverConcrete)
+
+    # solvers whose exact results can be computed from the independent clusters of their constraints
+    SLICEABLE_SOLVERS = (claripy.Solver, claripy.SolverCacheless, claripy.SolverComposite, claripy.SolverHybrid)
+
+    def __init__(self, maxsize=10000):
+        """
+        :param int maxsize: The maximum number of cached results. The least recently used results are evicted first.
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._results = LRUCache(maxsize=maxsize)
+        self._cluster_solvers = LRUCache(maxsize=max(maxsize // 100, 1))
+
+    def __getstate__(self):
+        return {'maxsize': self.maxsize}
+
+    def __setstate__(self, s):
+        self.__init__(maxsize=s['maxsize'])
+
+    def __len__(self):
+        return len(self._results)
+
+    def __repr__(self):
+        return "<SolverResultCache with %d results: %d hits, %d misses>" % (len(self._results), self.hits, self.misses)
+
+    def clear(self):
+        """
+        Remove every cached result.
+        """
+        self._results.clear()
+        self._cluster_solvers.clear()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(solver, extra_constraints, exact, constraints=None):
+        """
+        Compute the part of the cache key that is common to all queries on a solver.
+
+        :param solver:              The claripy solver.
+        :param extra_constraints:   The extra constraints of the query, after adjustment for the global condition.
+        :param exact:               The exact parameter of the query.
+        :param constraints:         The constraints the query depends on, if not all the constraints of the solver.
+        :return:                    A hashable key.
+        """
+        return (type(solver),
+                frozenset(hash(c) for c in (solver.constraints if constraints is None else constraints)),
+                frozenset(hash(c) for c in extra_constraints),
+                exact,
+                )
+
+    def lookup(self, key, query, e=None):
+        """
+        Look up the cached result of a query.
+
+        :param key:         The solver key, as returned by :meth:`key`.
+        :param str query:   The kind of query (for example, 'max' or 'satisfiable').
+        :param e:           The queried expression, if any.
+        :return:            The cached result.
+        :raises KeyError:   If the result is not cached.
+        """
+        try:
+            r = self._results[(key, query, None if e is None else hash(e))]
+        except KeyError:
+            self.misses += 1
+            raise
+        self.hits += 1
+        return r
+
+    def store(self, key, query, result, e=None):
+        """
+        Cache the result of a query.
+        """
+        self._results[(key, query, None if e is None else hash(e))] = result
+
+    def lookup_solutions(self, key, e, n):
+        """
+        Look up cached solutions of an expression. A query for n solutions is answered by any earlier query for at
+        least n solutions, and by any earlier query that found all the solutions.
+
+        :return:            A tuple of at most n solutions.
+        :raises KeyError:   If the solutions are not cached.
+        """
+        cached_n, solutions = self.lookup(key, 'eval', e)
+        if n <= cached_n:
+            return solutions[:n]
+        if len(solutions) < cached_n:
+            return solutions
+        # we know fewer solutions than requested
+        self.hits -= 1
+        self.misses += 1
+        raise KeyError((key, e, n))
+
+    def store_solutions(self, key, e, n, solutions):
+        """
+        Cache the solutions of an expression, found by a query for n solutions.
+        """
+        self.store(key, 'eval', (n, solutions), e)
+        if solutions:
+            self.store(key, 'satisfiable', True)
+
+    def cluster_satisfiable(self, cluster):
+        """
+        Check if an independent cluster of constraints is known to be satisfiable.
+        """
+        return self._results.get(('cluster', cluster.key), False)
+
+    def store_cluster_satisfiable(self, cluster):
+        """
+        Record that an independent cluster of constraints is satisfiable.
+        """
+        self._results[('cluster', cluster.key)] = True
+
+    def cluster_solver(self, key, constraints):
+        """
+        Get a solver holding some independent clusters of constraints. It is shared by every state whose queries
+        depend on the same constraints, so that the models it finds answer the queries of all of them.
+
+        :param key:         The hashes of the constraints.
+        :param constraints: The constraints.
+        :return:            A claripy solver.
+        """
+        try:
+            return self._cluster_solvers[key]
+        except KeyError:
+            pass
+        solver = claripy.Solver()
+        solver.add(constraints)
+        self._cluster_solvers[key] = solver
+        return solver
+
 from angr.sim_state import SimState
 SimState.register_default('solver', SimSolver)
 
@@ -32,7 +32,8 @@ class SimSymbolicMemory(SimMemory): #pylint:disable=abstract-method
     def __init__(
         self, memory_backer=None, permissions_backer=None, mem=None, memory_id="mem",
         endness=None, abstract_backer=False, check_permissions=None,
-        read_strategies=None, write_strategies=None, stack_region_map=None, generic_region_map=None
+        read_strategies=None, write_strategies=None, stack_region_map=None, generic_region_map=None,
+        concretization_models=None
     ):
         SimMemory.__init__(self,
                            endness=endness,
@@ -53,6 +54,8 @@ class SimSymbolicMemory(SimMemory): #pylint:disable=abstract-method
         # set up the strategies
         self.read_strategies = read_strategies
         self.write_strategies = write_strategies
+        self.concretization_models = concretization_strategies.SimConcretizationModelCache() \
+            if concretization_models is None else concretization_models
 
 
     #
@@ -72,7 +75,8 @@ class SimSymbolicMemory(SimMemory): #pylint:disable=abstract-method
             read_strategies=[ s.copy() for s in self.read_strategies ],
             write_strategies=[ s.copy() for s in self.write_strategies ],
             stack_region_map=self._stack_region_map,
-            generic_region_map=self._generic_region_map
+            generic_region_map=self._generic_region_map,
+            concretization_models=self.concretization_models.copy()
         )
 
         return c
@@ -743,6 +747,17 @@ class SimSymbolicMemory(SimMemory): #pylint:disable=abstract-method
         req.completed = True
         return req
 
+    def _load_bytes(self, addr, size):
+        if size > self._maximum_concrete_size:
+            return None
+        return self.mem.load_bytes(addr, size)
+
+    def _store_bytes(self, addr, data):
+        if self.category == 'mem':
+            self.state.scratch.dirty_addrs.update(xrange(addr, addr+len(data)))
+        self.mem.store_bytes(addr, data)
+        return True
+
     def _insert_memory_object(self, value, address, size):
         value.make_uuid()
         if self.category == 'mem':
@@ -1088,6 +1103,17 @@ class SimSymbolicMemory(SimMemory): #pylint:disable=abstract-method
         if max_size == 0:
             return None, [ ]
 
+        # copy concrete bytes without building expressions for them
+        src_c = self._concrete_int(src)
+        if condition is None and src_c is not None and self._concrete_int(dst) is not None and \
+                not self.state.se.symbolic(size) and \
+                src_memory._bulk_access_allowed('mem_read', inspect, disable_actions) and \
+                dst_memory._bulk_access_allowed('mem_write', inspect, disable_actions):
+            data = src_memory._load_bytes(src_c, max_size)
+            if data is not None:
+                dst_memory.store_bytes(dst, data, inspect=inspect, disable_actions=disable_actions)
+                return self.state.se.BVV(data)
+
         data = src_memory.load(src, max_size, inspect=inspect, disable_actions=disable_actions)
         dst_memory.store(dst, data, size=size, condition=condition, inspect=inspect, disable_actions=disable_actions)
         return data
@@ -10,6 +10,7 @@ import logging
 import pyvex
 import claripy
 import time
+from cachetools import LRUCache
 
 from ..sim_options import UNICORN_HANDLE_TRANSMIT_SYSCALL
 from ..errors import SimValueError, SimUnicornUnsupport, SimSegfaultError, SimMemoryError, SimUnicornError
@@ -90,11 +91,14 @@ class AggressiveConcretizationAnnotation(claripy.SimplificationAvoidanceAnnotati
         self.unicorn_start_addr = addr
 
 #
-# Because Unicorn leaks like crazy, we use one Uc object per thread...
+# Because Unicorn leaks like crazy, we use a small pool of Uc objects per thread...
 #
 
 _unicounter = itertools.count()
 
+# the number of unicorn contexts to keep around in each thread
+UNICORN_POOL_SIZE = 4
+
 class Uniwrapper(unicorn.Uc if unicorn is not None else object):
     # pylint: disable=non-parent-init-called
     def __init__(self, arch, cache_key):
@@ -104,6 +108,8 @@ class Uniwrapper(unicorn.Uc if unicorn is not None else object):
         self.wrapped_mapped = set()
         self.wrapped_hooks = set()
         self.id = None
+        # the regions that are kept mapped between runs, with the snapshot of the angr pages they were synced with
+        self.synced = { }
         unicorn.Uc.__init__(self, arch.uc_arch, arch.uc_mode)
 
     def hook_add(self, htype, callback, user_data=None, begin=1, end=0, arg1=0):
@@ -128,6 +134,7 @@ class Uniwrapper(unicorn.Uc if unicorn is not None else object):
         #l.debug("Unmapping %d bytes at %#x", size, addr)
         m = unicorn.Uc.mem_unmap(self, addr, size)
         self.wrapped_mapped.discard((addr, size))
+        self.synced.pop(addr, None)
         return m
 
     def mem_reset(self):
@@ -136,6 +143,7 @@ class Uniwrapper(unicorn.Uc if unicorn is not None else object):
             #l.debug("Unmapping %d bytes at %#x", size, addr)
             unicorn.Uc.mem_unmap(self, addr, size)
         self.wrapped_mapped.clear()
+        self.synced.clear()
 
     def hook_reset(self):
         #l.debug("Resetting hooks.")
@@ -150,7 +158,15 @@ class Uniwrapper(unicorn.Uc if unicorn is not None else object):
         #l.debug("Reset complete.")
 
 _unicorn_tls = threading.local()
-_unicorn_tls.uc = None
+
+def _context_pool():
+    """
+    Get the pool of unicorn contexts of the current thread, keyed by architecture name and cache key.
+    """
+    pool = getattr(_unicorn_tls, 'pool', None)
+    if pool is None:
+        pool = _unicorn_tls.pool = LRUCache(maxsize=UNICORN_POOL_SIZE)
+    return pool
 
 class _VexCacheInfo(ctypes.Structure):
     _fields_ = [
@@ -306,8 +322,14 @@ class Unicorn(SimStatePlugin):
 
         self.steps = 0
         self._mapped = 0
+        # the number of regions reused from previous runs, over the whole history of the state
+        self._reused = 0
         self._uncache_pages = []
 
+        # the regions mapped in the current run that can be kept mapped after it, and whether memory has been synced
+        self._new_synced = [ ]
+        self._memory_synced = False
+
         # following variables are used in python level hook
         # we cannot see native hooks from python
         self.syscall_hooks = { } if syscall_hooks is None else syscall_hooks
@@ -374,6 +396,7 @@ class Unicorn(SimStatePlugin):
         u.countdown_stop_point = self.countdown_stop_point
         u.transmit_addr = self.transmit_addr
         u._uncache_pages = list(self._uncache_pages)
+        u._reused = self._reused
         return u
 
     def merge(self, others, merge_conditions, common_ancestor=None):
@@ -452,7 +475,7 @@ class Unicorn(SimStatePlugin):
         self._unicount = next(_unicounter)
         self._uc_state = None
         self.cache_key = hash(self)
-        _unicorn_tls.uc = None
+        self.delete_uc()
 
     def set_state(self, state):
         SimStatePlugin.set_state(self, state)
@@ -463,34 +486,37 @@ class Unicorn(SimStatePlugin):
     def _reuse_unicorn(self):
         return self.state.arch.name != "MIPS32"
 
+    @property
+    def _reuse_pages(self):
+        return self._reuse_unicorn and options.UNICORN_REUSE_PAGES in self.state.options
+
     @property
     def uc(self):
         new_id = next(_unicounter)
 
-        if (
-            not hasattr(_unicorn_tls, "uc") or
-            _unicorn_tls.uc is None or
-            _unicorn_tls.uc.arch != self.state.arch or
-            _unicorn_tls.uc.cache_key != self.cache_key
-        ):
-            _unicorn_tls.uc = Uniwrapper(self.state.arch, self.cache_key)
-        elif _unicorn_tls.uc.id != self._unicount:
+        pool = _context_pool()
+        key = (self.state.arch.name, self.cache_key)
+        uc = pool.get(key, None)
+        if uc is None or uc.arch != self.state.arch:
+            uc = pool[key] = Uniwrapper(self.state.arch, self.cache_key)
+        elif uc.id != self._unicount:
             if not self._reuse_unicorn:
-                _unicorn_tls.uc = Uniwrapper(self.state.arch, self.cache_key)
-            else:
+                uc = pool[key] = Uniwrapper(self.state.arch, self.cache_key)
+            elif not self._reuse_pages:
                 #l.debug("Reusing unicorn state!")
-                _unicorn_tls.uc.reset()
+                uc.reset()
+            # otherwise, the pages that are still mapped are checked against our memory in setup()
         else:
             #l.debug("Reusing unicorn state!")
             pass
 
-        _unicorn_tls.uc.id = new_id
+        uc.id = new_id
         self._unicount = new_id
-        return _unicorn_tls.uc
+        return uc
 
     @staticmethod
     def delete_uc():
-        _unicorn_tls.uc = None
+        _context_pool().clear()
 
     @property
     def _uc_regs(self):
@@ -808,6 +834,7 @@ class Unicorn(SimStatePlugin):
 
         data = bytearray(length)
         taint = [ ] # this is a list to get around python's scoping craziness
+        exact = [ True ] # whether the mapped data is exactly the content of angr's memory
 
         def _taint(pos, chunk_size):
             if not taint:
@@ -816,6 +843,7 @@ class Unicorn(SimStatePlugin):
             ctypes.memset(offset, 0x2, chunk_size) # mark them as TAINT_SYMBOLIC
 
         def _missing(pos, chunk_size, data=data):
+            exact[0] = False
             if options.CGC_ZERO_FILL_UNCONSTRAINED_MEMORY not in self.state.options:
                 _taint(pos, chunk_size)
             else:
@@ -837,6 +865,9 @@ class Unicorn(SimStatePlugin):
                 #print "TAINT: %x, %d" % (mo_addr, chunk_size)
                 _taint(mo_addr, chunk_size)
             else:
+                if d is not chunk:
+                    # concretized
+                    exact[0] = False
                 s = self.state.se.eval(d, cast_to=str)
                 data[mo_addr-start:mo_addr-start+chunk_size] = s
             last_missing = mo_addr - 1
@@ -860,6 +891,8 @@ class Unicorn(SimStatePlugin):
             uc.mem_write(start, str(data))
             self._mapped += 1
             _UC_NATIVE.activate(self._uc_state, start, length, taint[0] if taint else None)
+            if exact[0] and not taint:
+                self._new_synced.append((start, length))
             return True
 
     def uncache_page(self, addr):
@@ -879,6 +912,50 @@ class Unicorn(SimStatePlugin):
         # just fyi there's a GDT in memory
         _UC_NATIVE.activate(self._uc_state, 0x1000, 0x1000, None)
 
+        self._new_synced = [ ]
+        self._memory_synced = False
+        if self._reuse_pages:
+            self._resync_pages()
+
+    def _resync_pages(self):
+        """
+        Unmap the regions kept mapped from previous runs whose pages changed in our memory, and activate the others.
+        """
+        uc = self.uc
+        mem = self.state.memory.mem
+        for start, (length, snapshot) in uc.synced.items():
+            if self._same_pages(mem.range_pages(start, length), snapshot):
+                _UC_NATIVE.activate(self._uc_state, start, length, None)
+                self._reused += 1
+            else:
+                l.debug('unmapping changed region [%#x, %#x]', start, start + length - 1)
+                uc.mem_unmap(start, length)
+
+    @staticmethod
+    def _same_pages(a, b):
+        if len(a) != len(b):
+            return False
+        for x, y in zip(a, b):
+            if x is None or y is None or x[0] is not y[0] or x[1] is not y[1]:
+                return False
+        return True
+
+    def _keep_synced_pages(self):
+        """
+        Keep the regions whose content is the same in unicorn and in our memory mapped for the next run, and unmap all
+        the others.
+        """
+        uc = self.uc
+        mem = self.state.memory.mem
+        keep = set(uc.synced) | set(start for start, _ in self._new_synced)
+        for start, length in list(uc.wrapped_mapped):
+            if start in keep:
+                snapshot = mem.range_pages(start, length, freeze=True)
+                if None not in snapshot:
+                    uc.synced[start] = (length, snapshot)
+                    continue
+            uc.mem_unmap(start, length)
+
     def start(self, step=None):
         self.jumpkind = 'Ijk_Boring'
         self.countdown_nonunicorn_blocks = self.cooldown_nonunicorn_blocks
@@ -974,6 +1051,7 @@ class Unicorn(SimStatePlugin):
             p_update = update.next
 
         _UC_NATIVE.destroy(head)    # free the linked list
+        self._memory_synced = True
 
         # adjust the countdowns
         #if self.steps >= 128:
@@ -1057,7 +1135,11 @@ class Unicorn(SimStatePlugin):
         # there's something we're not properly resetting for syscalls, so
         # we'll clear the state when they happen
         if self.stop_reason not in (STOP.STOP_NORMAL, STOP.STOP_STOPPOINT, STOP.STOP_SYMBOLIC_MEM, STOP.STOP_SYMBOLIC_REG):
-            self.delete_uc()
+            _context_pool().pop((self.state.arch.name, self.cache_key), None)
+        elif self._reuse_pages and self._memory_synced:
+            # only the pages that changed will be mapped again by the next run
+            self._keep_synced_pages()
+            return
 
         #l.debug("Resetting the unicorn state.")
         self.uc.reset()
@@ -800,6 +800,95 @@ class SimMemory(SimStatePlugin):
 
         return r
 
+    def load_bytes(self, addr, size, inspect=True, disable_actions=False):
+        """
+        Loads a range of bytes from memory.
+
+        When the address and the size are concrete and every byte in the range is concrete, the bytes are read directly
+        from the pages, without building any claripy expression. Otherwise, this is a big-endian :meth:`load`.
+
+        :param addr:            The address to load from.
+        :param size:            The number of bytes to load.
+        :param bool inspect:    Whether this load should trigger SimInspect breakpoints or not.
+        :param bool disable_actions: Whether this load should avoid creating SimActions or not.
+        :return:                A str of the bytes if they are all concrete, or a claripy expression.
+        """
+        addr_c = self._concrete_int(addr)
+        size_c = self._concrete_int(size)
+        if addr_c is not None and size_c is not None and self._bulk_access_allowed('mem_read', inspect, disable_actions):
+            data = self._load_bytes(addr_c, size_c)
+            if data is not None:
+                return data
+        return self.load(addr, size, endness='Iend_BE', inspect=inspect, disable_actions=disable_actions)
+
+    def store_bytes(self, addr, data, inspect=True, disable_actions=False):
+        """
+        Stores a range of bytes into memory.
+
+        When the address is concrete and the data are bytes, they are written directly into the pages, without building
+        any claripy expression. Otherwise, this is a big-endian :meth:`store`.
+
+        :param addr:            The address to store at.
+        :param data:            The data, as a str, a bytearray, a memoryview, or a claripy expression.
+        :param bool inspect:    Whether this store should trigger SimInspect breakpoints or not.
+        :param bool disable_actions: Whether this store should avoid creating SimActions or not.
+        """
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        elif isinstance(data, bytearray):
+            data = str(data)
+
+        if type(data) is str:
+            if not data:
+                return
+            addr_c = self._concrete_int(addr)
+            if addr_c is not None and self._bulk_access_allowed('mem_write', inspect, disable_actions):
+                try:
+                    if self._store_bytes(addr_c, data):
+                        return
+                except SimSegfaultError as e:
+                    e.original_addr = addr
+                    raise
+
+        self.store(addr, data, endness='Iend_BE', inspect=inspect, disable_actions=disable_actions)
+
+    @staticmethod
+    def _concrete_int(v):
+        v = _raw_ast(v)
+        if type(v) in (int, long):
+            return v
+        if isinstance(v, claripy.ast.BV) and v.op == 'BVV':
+            return v.args[0]
+        return None
+
+    def _bulk_access_allowed(self, event_type, inspect, disable_actions):
+        """
+        Check whether a bulk access can skip the claripy path, i.e., whether nothing needs to see it as an expression.
+        """
+        if self.category == 'reg' or self._abstract_backer or self.state.arch.byte_width != 8:
+            return False
+        if not disable_actions and o.AUTO_REFS in self.state.options:
+            return False
+        if inspect and self.state.has_plugin('inspect') and self.state.inspect._breakpoints[event_type]:
+            return False
+        return True
+
+    def _load_bytes(self, addr, size): #pylint:disable=no-self-use,unused-argument
+        """
+        Load concrete bytes directly from memory.
+
+        :return: The bytes, or None if they are not all concrete.
+        """
+        return None
+
+    def _store_bytes(self, addr, data): #pylint:disable=no-self-use,unused-argument
+        """
+        Store bytes directly into memory.
+
+        :return: True if the bytes were stored, or False if they have to be stored as an expression.
+        """
+        return False
+
     def _constrain_underconstrained_index(self, addr_e):
         if not self.state.uc_manager.is_bounded(addr_e) or self.state.se.max_int(addr_e) - self.state.se.min_int( addr_e) >= self._read_address_range:
             # in under-constrained symbolic execution, we'll assign a new memory region for this address
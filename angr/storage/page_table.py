@@ -0,0 +1,209 @@
+_BITS = 5
+_WIDTH = 1 << _BITS
+_MASK = _WIDTH - 1
+
+_EMPTY = object()
+
+
+class _Node(object):
+    """
+    An inner node or a leaf of a PageTable trie.
+
+    A node may only be modified in place by the table whose edit token is its owner. Nodes owned by anybody else are
+    shared with other tables and are copied before being modified.
+    """
+
+    __slots__ = ('owner', 'slots', )
+
+    def __init__(self, owner, slots=None):
+        self.owner = owner
+        self.slots = [ _EMPTY ] * _WIDTH if slots is None else slots
+
+
+class PageTable(object):
+    """
+    A persistent map from page numbers (non-negative integers) to pages, implemented as a radix trie with structural
+    sharing.
+
+    Branching a table is O(1): both tables keep referring to the same trie, and the first modification of a key after a
+    branch only copies the nodes on the path from the root to that key. Recently accessed entries are kept in a
+    per-table dict, so that repeated accesses to the same pages do not walk the trie.
+    """
+
+    __slots__ = ('_root', '_shift', '_len', '_owner', '_cache', '__weakref__', )
+
+    def __init__(self, items=None):
+        self._owner = object()
+        self._root = _Node(self._owner)
+        self._shift = 0
+        self._len = 0
+        self._cache = { }
+
+        if items is not None:
+            for k, v in (items.iteritems() if hasattr(items, 'iteritems') else items):
+                self[k] = v
+
+    def branch(self):
+        """
+        Return a copy of this table. Pages themselves are not copied.
+        """
+        t = self.__class__.__new__(self.__class__)
+        t._root = self._root
+        t._shift = self._shift
+        t._len = self._len
+        t._cache = { }
+        t._owner = object()
+        # every node we own is now shared with the branch
+        self._owner = object()
+        return t
+
+    copy = branch
+
+    #
+    # Trie operations
+    #
+
+    def _lookup(self, key):
+        if key < 0 or key >> (self._shift + _BITS):
+            return _EMPTY
+        node = self._root
+        shift = self._shift
+        while shift:
+            node = node.slots[(key >> shift) & _MASK]
+            if node is _EMPTY:
+                return _EMPTY
+            shift -= _BITS
+        return node.slots[key & _MASK]
+
+    def _editable(self, node):
+        if node.owner is self._owner:
+            return node
+        return _Node(self._owner, list(node.slots))
+
+    def _store(self, key, value):
+        """
+        Store a value (or _EMPTY, to remove a key) and return the previous value.
+        """
+        if key < 0:
+            raise KeyError(key)
+
+        # grow the trie until the key fits
+        while key >> (self._shift + _BITS):
+            if value is _EMPTY:
+                return _EMPTY
+            root = _Node(self._owner)
+            root.slots[0] = self._root
+            self._root = root
+            self._shift += _BITS
+
+        node = self._root = self._editable(self._root)
+        shift = self._shift
+        while shift:
+            idx = (key >> shift) & _MASK
+            child = node.slots[idx]
+            if child is _EMPTY:
+                if value is _EMPTY:
+                    return _EMPTY
+                child = _Node(self._owner)
+            else:
+                child = self._editable(child)
+            node.slots[idx] = child
+            node = child
+            shift -= _BITS
+
+        old = node.slots[key & _MASK]
+        node.slots[key & _MASK] = value
+        if old is _EMPTY and value is not _EMPTY:
+            self._len += 1
+        elif old is not _EMPTY and value is _EMPTY:
+            self._len -= 1
+        return old
+
+    def _iter_items(self):
+        stack = [ (self._root, self._shift, 0) ]
+        while stack:
+            node, shift, prefix = stack.pop()
+            if shift:
+                for idx in xrange(_WIDTH - 1, -1, -1):
+                    child = node.slots[idx]
+                    if child is not _EMPTY:
+                        stack.append((child, shift - _BITS, prefix | (idx << shift)))
+            else:
+                for idx, v in enumerate(node.slots):
+                    if v is not _EMPTY:
+                        yield prefix | idx, v
+
+    #
+    # Dict interface
+    #
+
+    def __getitem__(self, key):
+        try:
+            return self._cache[key]
+        except KeyError:
+            pass
+        v = self._lookup(key)
+        if v is _EMPTY:
+            raise KeyError(key)
+        self._cache[key] = v
+        return v
+
+    def __setitem__(self, key, value):
+        self._store(key, value)
+        self._cache[key] = value
+
+    def __delitem__(self, key):
+        self._cache.pop(key, None)
+        if self._store(key, _EMPTY) is _EMPTY:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self._cache or self._lookup(key) is not _EMPTY
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        return (k for k, _ in self._iter_items())
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def pop(self, key, *default):
+        self._cache.pop(key, None)
+        old = self._store(key, _EMPTY)
+        if old is _EMPTY:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        return old
+
+    def iteritems(self):
+        return self._iter_items()
+
+    def iterkeys(self):
+        return iter(self)
+
+    def itervalues(self):
+        return (v for _, v in self._iter_items())
+
+    def items(self):
+        return list(self._iter_items())
+
+    def keys(self):
+        return list(self)
+
+    def values(self):
+        return list(self.itervalues())
+
+    def __repr__(self):
+        return "<PageTable with %d entries>" % self._len
+
+    def __getstate__(self):
+        return (self.items(), )
+
+    def __setstate__(self, s):
+        self.__init__(s[0])
@@ -1,3 +1,8 @@
+import bisect
+import operator
+import itertools
+import weakref
+
 import bintrees
 import cooldict
 import claripy
@@ -7,6 +12,7 @@ import cle
 from ..errors import SimMemoryError, SimSegfaultError
 from .. import sim_options as options
 from .memory_object import SimMemoryObject
+from .page_table import PageTable
 from claripy.ast.bv import BV
 
 _ffi = cffi.FFI()
@@ -81,7 +87,7 @@ class BasePage(object):
             self.store_underwrite(state, new_mo, start, end)
 
     def copy(self):
-        return Page(
+        return type(self)(
             self._page_addr, self._page_size,
             permissions=self.permissions,
             **self._copy_args()
@@ -321,6 +327,303 @@ class ListPage(BasePage):
     def _copy_args(self):
         return { 'storage': list(self._storage), 'sinkhole': self._sinkhole }
 
+class ArrayPage(BasePage):
+    """
+    Page object storing concrete bytes in a bytearray.
+
+    Memory objects are only kept, in a list with one entry per byte, for the bytes of the page that are not concrete. The
+    list is not allocated until something symbolic is stored into the page. Loads return concrete ranges as BVVs built
+    directly from the byte array.
+
+    Pages initialized from a memory backer refer to the backer's buffer through memoryviews, and only copy it into their
+    own byte array the first time concrete data is written to them.
+    """
+
+    def __init__(self, *args, **kwargs):
+        data = kwargs.pop("data", None)
+        concrete = kwargs.pop("concrete", None)
+        objects = kwargs.pop("objects", None)
+        backing = kwargs.pop("backing", None)
+
+        super(ArrayPage, self).__init__(*args, **kwargs)
+        # a list of (page offset, memoryview) tuples of backer data that the page has not copied yet
+        self._backing = [ ] if backing is None else backing
+        # allocated on the first concrete write
+        self._data = data
+        # 1 for each byte whose content is a concrete byte, in _data or in the backing
+        self._concrete = bytearray(self._page_size) if concrete is None else concrete
+        self._objects = objects
+
+    def __getstate__(self):
+        d = dict(self.__dict__)
+        d['_data'] = self._materialized_data() if self._backing else self._data
+        d['_backing'] = [ ]
+        return d
+
+    @staticmethod
+    def _concrete_bytes(mo, start, end):
+        """
+        Return the bytes of a memory object between start and end, or None if they are not concrete.
+        """
+        o = mo.object
+        if mo._byte_width != 8 or o.op != 'BVV':
+            return None
+        value = o.args[0] & ((1 << (mo.length * 8)) - 1)
+        return ('%0*x' % (mo.length * 2, value)).decode('hex')[start - mo.base:end - mo.base]
+
+    def _materialized_data(self):
+        if self._data is not None:
+            return self._data
+        data = bytearray(self._page_size)
+        for offset, view in self._backing:
+            data[offset:offset+len(view)] = view.tobytes()
+        return data
+
+    def _materialize(self):
+        if self._data is None:
+            self._data = self._materialized_data()
+            self._backing = [ ]
+
+    def _read(self, i, j):
+        """
+        Return the concrete bytes between page offsets i and j.
+        """
+        if self._data is not None:
+            return str(self._data[i:j])
+        return ''.join(view[max(i, offset)-offset:j-offset].tobytes() for offset, view in self._backing
+                       if offset < j and i < offset + len(view))
+
+    def _get_objects(self):
+        if self._objects is None:
+            self._objects = [ None ] * self._page_size
+        return self._objects
+
+    def keys(self):
+        objects = self._objects
+        return [ self._page_addr + i for i in xrange(self._page_size)
+                 if self._concrete[i] or (objects is not None and objects[i] is not None) ]
+
+    def store_backer(self, start, view):
+        """
+        Make a range of the page refer to a memory backer, without copying it.
+
+        :param int start:           The address of the first byte of the view.
+        :param memoryview view:     A view of the backer's bytes.
+        """
+        s = start - self._page_addr
+        e = s + len(view)
+        if self._data is not None:
+            self._data[s:e] = view.tobytes()
+        else:
+            self._backing.append((s, view))
+        self._concrete[s:e] = '\x01' * (e - s)
+        if self._objects is not None:
+            self._objects[s:e] = [ None ] * (e - s)
+
+    def store_bytes(self, start, data):
+        """
+        Store concrete bytes into the page, without going through a memory object.
+
+        :param int start:   The address to store the bytes at.
+        :param str data:    The bytes.
+        """
+        self._materialize()
+        s = start - self._page_addr
+        e = s + len(data)
+        self._data[s:e] = data
+        self._concrete[s:e] = '\x01' * (e - s)
+        if self._objects is not None:
+            self._objects[s:e] = [ None ] * (e - s)
+
+    def replace_mo(self, state, old_mo, new_mo):
+        if self._objects is None:
+            return
+        start, end = self._resolve_range(old_mo)
+        for i in range(start - self._page_addr, end - self._page_addr):
+            if self._objects[i] is old_mo:
+                self._objects[i] = new_mo
+
+    def store_overwrite(self, state, new_mo, start, end):
+        data = self._concrete_bytes(new_mo, start, end)
+        if data is not None:
+            self.store_bytes(start, data)
+        else:
+            s, e = start - self._page_addr, end - self._page_addr
+            self._get_objects()[s:e] = [ new_mo ] * (e - s)
+            self._concrete[s:e] = '\x00' * (e - s)
+
+    def store_underwrite(self, state, new_mo, start, end):
+        data = self._concrete_bytes(new_mo, start, end)
+        if data is not None:
+            self._materialize()
+        objects = self._objects if data is not None else self._get_objects()
+        for i in range(start - self._page_addr, end - self._page_addr):
+            if self._concrete[i] or (objects is not None and objects[i] is not None):
+                continue
+            if data is not None:
+                self._data[i] = data[i + self._page_addr - start]
+                self._concrete[i] = 1
+            else:
+                objects[i] = new_mo
+
+    def load_mo(self, state, page_idx):
+        """
+        Loads a memory object from memory.
+
+        :param page_idx: the index into the page
+        :returns: a tuple of the object
+        """
+        i = page_idx - self._page_addr
+        if self._concrete[i]:
+            return SimMemoryObject(claripy.BVV(self._read(i, i+1)), page_idx)
+        return None if self._objects is None else self._objects[i]
+
+    def load_slice(self, state, start, end):
+        """
+        Return the memory objects overlapping with the provided slice.
+
+        :param start: the start address
+        :param end: the end address (non-inclusive)
+        :returns: tuples of (starting_addr, memory_object)
+        """
+        items = [ ]
+        if start > self._page_addr + self._page_size or end < self._page_addr:
+            l.warning("Calling load_slice on the wrong page.")
+            return items
+
+        i = max(start, self._page_addr) - self._page_addr
+        e = min(end, self._page_addr + self._page_size) - self._page_addr
+        while i < e:
+            if self._concrete[i]:
+                j = self._concrete.find('\x00', i, e)
+                j = e if j == -1 else j
+                addr = self._page_addr + i
+                items.append((addr, SimMemoryObject(claripy.BVV(self._read(i, j)), addr)))
+            else:
+                j = self._concrete.find('\x01', i, e)
+                j = e if j == -1 else j
+                if self._objects is not None:
+                    for k in xrange(i, j):
+                        mo = self._objects[k]
+                        if mo is not None and (not items or items[-1][1] is not mo):
+                            items.append((self._page_addr + k, mo))
+            i = j
+        return items
+
+    def changed_keys(self, other):
+        """
+        Return the addresses of the bytes that differ between this page and another ArrayPage of the same address.
+        Concrete bytes are compared by value, without building memory objects for them, and other bytes by the identity
+        of their memory objects.
+
+        :param ArrayPage other: The other page.
+        :returns:               A list of addresses.
+        """
+        ours, theirs = self._materialized_data(), other._materialized_data()
+        our_concrete, their_concrete = self._concrete, other._concrete
+        our_objects, their_objects = self._objects, other._objects
+
+        no_objects = our_objects is None and their_objects is None
+        both_objects = our_objects is not None and their_objects is not None
+
+        # compare blocks of bytes at once, and only look at the bytes of the blocks that differ
+        changed = [ ]
+        for s in xrange(0, self._page_size, 64):
+            e = min(s + 64, self._page_size)
+            concrete = our_concrete[s:e]
+            if concrete == their_concrete[s:e] and ours[s:e] == theirs[s:e] and \
+                    (no_objects or concrete.find('\x00') == -1 or
+                     both_objects and all(itertools.imap(operator.is_, our_objects[s:e], their_objects[s:e]))):
+                continue
+            for i in xrange(s, e):
+                if our_concrete[i] != their_concrete[i]:
+                    changed.append(self._page_addr + i)
+                elif our_concrete[i]:
+                    if ours[i] != theirs[i]:
+                        changed.append(self._page_addr + i)
+                elif (None if our_objects is None else our_objects[i]) is not \
+                        (None if their_objects is None else their_objects[i]):
+                    changed.append(self._page_addr + i)
+        return changed
+
+    def _copy_args(self):
+        return {
+            'data': None if self._data is None else bytearray(self._data),
+            'backing': list(self._backing),
+            'concrete': bytearray(self._concrete),
+            'objects': None if self._objects is None else list(self._objects),
+        }
+
+class _IntervalIndex(object):
+    """
+    A static index of (start, end, value) intervals, supporting queries for the intervals overlapping a range in
+    logarithmic time (plus the number of intervals that start before the range but might still overlap it).
+    """
+
+    def __init__(self, intervals):
+        # remember the original order, since overlapping intervals are applied in that order
+        self._intervals = sorted((start, end, n, value) for n, (start, end, value) in enumerate(intervals))
+        self._starts = [ i[0] for i in self._intervals ]
+        self._max_ends = [ ]
+        max_end = None
+        for i in self._intervals:
+            max_end = i[1] if max_end is None else max(max_end, i[1])
+            self._max_ends.append(max_end)
+
+    def overlapping(self, start, end):
+        """
+        Return the (start, end, value) tuples of the intervals overlapping [start, end), in their original order.
+        """
+        found = [ ]
+        i = bisect.bisect_left(self._starts, end)
+        while i > 0 and self._max_ends[i-1] > start:
+            i -= 1
+            if self._intervals[i][1] > start:
+                found.append(self._intervals[i])
+        found.sort(key=lambda i: i[2])
+        return [ (s, e, v) for s, e, _, v in found ]
+
+
+class _BackerIndex(object):
+    """
+    Interval indexes of the segments of a Clemory and of the permission maps used with it. The segments are referred to
+    through memoryviews of the loader's buffers, so that pages can be initialized from them without copying.
+
+    Every fresh state gets its own permission map, so the indexes of permission maps are keyed by their contents: states
+    of a project share the index of their (equal) permission maps, no matter how many maps there are.
+    """
+
+    def __init__(self, cbackers):
+        self.cbackers = cbackers
+        self.segments = _IntervalIndex(
+            (addr, addr + len(backer), memoryview(_ffi.buffer(backer))) for addr, backer in cbackers
+            if not isinstance(addr, BV)
+        )
+        self._permissions = { }
+        # the last permission map that was looked up, and its index
+        self._last_permission_map = None
+        self._last_permissions = None
+
+    def permissions(self, permission_map):
+        """
+        Return the interval index of a permission map.
+        """
+        if permission_map is self._last_permission_map:
+            return self._last_permissions
+
+        key = frozenset(permission_map.iteritems())
+        index = self._permissions.get(key, None)
+        if index is None:
+            index = _IntervalIndex((start, end, flags) for (start, end), flags in permission_map.iteritems())
+            self._permissions[key] = index
+
+        self._last_permission_map = permission_map
+        self._last_permissions = index
+        return index
+
+# the backer indexes of all the Clemories in use, built once and shared by every state of a project
+_backer_indexes = weakref.WeakKeyDictionary()
+
 Page = ListPage
 
 #pylint:disable=unidiomatic-typecheck
@@ -328,6 +631,9 @@ Page = ListPage
 class SimPagedMemory(object):
     """
     Represents paged memory.
+
+    Pages, the set of initialized pages and the per-page symbolic addresses are kept in PageTables, which are branched
+    in constant time. Pages themselves are copied on the first write after a branch.
     """
     def __init__(self, memory_backer=None, permissions_backer=None, pages=None, initialized=None, name_mapping=None, hash_mapping=None, page_size=None, symbolic_addrs=None, check_permissions=False):
         self._cowed = set()
@@ -335,19 +641,29 @@ class SimPagedMemory(object):
         self._permissions_backer = permissions_backer # saved for copying
         self._executable_pages = False if permissions_backer is None else permissions_backer[0]
         self._permission_map = { } if permissions_backer is None else permissions_backer[1]
-        self._pages = { } if pages is None else pages
-        self._initialized = set() if initialized is None else initialized
+        self._pages = self._page_table(pages)
+        self._initialized = self._page_table(initialized)
         self._page_size = 0x1000 if page_size is None else page_size
-        self._symbolic_addrs = dict() if symbolic_addrs is None else symbolic_addrs
+        self._symbolic_addrs = self._page_table(symbolic_addrs)
         self.state = None
         self._preapproved_stack = xrange(0)
         self._check_perms = check_permissions
+        # the sorted addresses of a dict memory backer, computed on first use and shared by branches
+        self._backer_addrs = None
 
         # reverse mapping
         self._name_mapping = cooldict.BranchingDict() if name_mapping is None else name_mapping
         self._hash_mapping = cooldict.BranchingDict() if hash_mapping is None else hash_mapping
         self._updated_mappings = set()
 
+    @staticmethod
+    def _page_table(items):
+        if isinstance(items, PageTable):
+            return items
+        if isinstance(items, (set, frozenset)):
+            return PageTable((n, True) for n in items)
+        return PageTable(items)
+
     def __getstate__(self):
         return {
             '_memory_backer': self._memory_backer,
@@ -367,24 +683,25 @@ class SimPagedMemory(object):
 
     def __setstate__(self, s):
         self._cowed = set()
+        self._backer_addrs = None
         self.__dict__.update(s)
 
     def branch(self):
         new_name_mapping = self._name_mapping.branch() if options.REVERSE_MEMORY_NAME_MAP in self.state.options else self._name_mapping
         new_hash_mapping = self._hash_mapping.branch() if options.REVERSE_MEMORY_HASH_MAP in self.state.options else self._hash_mapping
 
-        new_pages = dict(self._pages)
         self._cowed = set()
         m = SimPagedMemory(memory_backer=self._memory_backer,
                            permissions_backer=self._permissions_backer,
-                           pages=new_pages,
-                           initialized=set(self._initialized),
+                           pages=self._pages.branch(),
+                           initialized=self._initialized.branch(),
                            page_size=self._page_size,
                            name_mapping=new_name_mapping,
                            hash_mapping=new_hash_mapping,
-                           symbolic_addrs=dict(self._symbolic_addrs),
+                           symbolic_addrs=self._symbolic_addrs.branch(),
                            check_permissions=self._check_perms)
         m._preapproved_stack = self._preapproved_stack
+        m._backer_addrs = self._backer_addrs
         return m
 
     def __getitem__(self, addr):
@@ -462,20 +779,112 @@ class SimPagedMemory(object):
 
         return result
 
+    def load_bytes(self, addr, num_bytes):
+        """
+        Load concrete bytes from paged memory.
+
+        :param addr:        Address to start loading.
+        :param num_bytes:   Number of bytes to load.
+        :return:            The bytes, or None if some of them are symbolic, missing or not readable.
+        :rtype:             str
+        """
+        chunks = [ ]
+        end = addr + num_bytes
+        for page_addr in self._containing_pages(addr, end):
+            try:
+                page = self._get_page(page_addr / self._page_size)
+            except KeyError:
+                return None
+            if self.allow_segv and not page.concrete_permissions & Page.PROT_READ:
+                return None
+
+            start = max(addr, page_addr)
+            stop = min(end, page_addr + self._page_size)
+            if isinstance(page, ArrayPage):
+                i, j = start - page_addr, stop - page_addr
+                if page._concrete.find('\x00', i, j) != -1:
+                    return None
+                chunks.append(page._read(i, j))
+                continue
+
+            # every object is in effect from its address to the address of the next one
+            items = page.load_slice(self.state, start, stop)
+            last = start
+            for n, (mo_addr, mo) in enumerate(items):
+                mo_end = min(mo.base + mo.length, items[n+1][0] if n + 1 < len(items) else stop)
+                if max(mo_addr, start) != last or mo.base > last or mo_end <= last:
+                    return None
+                data = ArrayPage._concrete_bytes(mo, last, mo_end)
+                if data is None:
+                    return None
+                chunks.append(data)
+                last = mo_end
+            if last != stop:
+                return None
+
+        return ''.join(chunks)
+
+    def store_bytes(self, addr, data):
+        """
+        Store concrete bytes into paged memory. Pages that keep concrete bytes as such are written to directly, the
+        others get one memory object each.
+
+        :param addr:        Address to start storing at.
+        :param str data:    The bytes.
+        """
+        end = addr + len(data)
+        for page_addr in self._containing_pages(addr, end):
+            try:
+                page = self._get_page(page_addr / self._page_size, write=True, create=not self.allow_segv)
+            except KeyError:
+                if self.allow_segv:
+                    raise SimSegfaultError(max(addr, page_addr), 'write-miss')
+                raise
+            if self.allow_segv and not page.concrete_permissions & Page.PROT_WRITE:
+                raise SimSegfaultError(max(addr, page_addr), 'non-writable')
+
+            start = max(addr, page_addr)
+            chunk = data[start - addr:min(end, page_addr + self._page_size) - addr]
+            if isinstance(page, ArrayPage):
+                page.store_bytes(start, chunk)
+            else:
+                page.store_mo(self.state, SimMemoryObject(claripy.BVV(chunk), start))
+
+        if options.REVERSE_MEMORY_NAME_MAP in self.state.options or \
+                options.REVERSE_MEMORY_HASH_MAP in self.state.options or \
+                options.MEMORY_SYMBOLIC_BYTES_MAP in self.state.options:
+            self._update_range_mappings(addr, claripy.BVV(data), len(data))
+
     #
     # Page management
     #
 
     def _create_page(self, page_num, permissions=None):
+        if self.state is not None and options.ARRAY_PAGES in self.state.options:
+            return ArrayPage(
+                page_num*self._page_size, self._page_size,
+                executable=self._executable_pages, permissions=permissions
+            )
         return Page(
             page_num*self._page_size, self._page_size,
             executable=self._executable_pages, permissions=permissions
         )
 
+    def _backer_index(self):
+        """
+        Return the interval indexes of the Clemory memory backer and of its permission maps.
+        """
+        cbackers = self._memory_backer.cbackers
+        index = _backer_indexes.get(self._memory_backer, None)
+        if index is None or index.cbackers is not cbackers:
+            index = _BackerIndex(cbackers)
+            _backer_indexes[self._memory_backer] = index
+        return index
+
     def _initialize_page(self, n, new_page):
         if n in self._initialized:
             return False
-        self._initialized.add(n)
+        self._initialized[n] = True
 
         new_page_addr = n*self._page_size
         initialized = False
@@ -486,66 +895,62 @@ class SimPagedMemory(object):
         if self._memory_backer is None:
             pass
         elif isinstance(self._memory_backer, cle.Clemory):
-            # first, find the right clemory backer
-            for addr, backer in self._memory_backer.cbackers if self.byte_width == 8 else ((x, y) for x, _, y in self._memory_backer.stride_repr):
-                start_backer = new_page_addr - addr
-                if isinstance(start_backer, BV):
-                    continue
-                if start_backer < 0 and abs(start_backer) >= self._page_size:
-                    continue
-                if start_backer >= len(backer):
-                    continue
+            index = self._backer_index()
 
-                # find permission backer associated with the address
-                # fall back to read-write if we can't find any...
-                flags = Page.PROT_READ | Page.PROT_WRITE
-                for start, end in self._permission_map:
-                    if start <= new_page_addr < end:
-                        flags = self._permission_map[(start, end)]
-                        break
+            # find permission backer associated with the address
+            # fall back to read-write if we can't find any...
+            flags = Page.PROT_READ | Page.PROT_WRITE
+            for _, _, f in index.permissions(self._permission_map).overlapping(new_page_addr, new_page_addr + 1):
+                flags = f
+                break
 
-                snip_start = max(0, start_backer)
-                write_start = max(new_page_addr, addr + snip_start)
-                write_size = self._page_size - write_start%self._page_size
+            if self.byte_width == 8:
+                for start, end, view in index.segments.overlapping(new_page_addr, new_page_addr + self._page_size):
+                    write_start = max(new_page_addr, start)
+                    write_end = min(new_page_addr + self._page_size, end)
+                    snip = view[write_start - start:write_end - start]
 
-                if self.byte_width == 8:
-                    snip = _ffi.buffer(backer)[snip_start:snip_start+write_size]
-                    mo = SimMemoryObject(claripy.BVV(snip), write_start, byte_width=self.byte_width)
-                    self._apply_object_to_page(n*self._page_size, mo, page=new_page)
-                else:
+                    if isinstance(new_page, ArrayPage):
+                        new_page.store_backer(write_start, snip)
+                    else:
+                        mo = SimMemoryObject(claripy.BVV(snip.tobytes()), write_start, byte_width=self.byte_width)
+                        self._apply_object_to_page(new_page_addr, mo, page=new_page)
+
+                    new_page.permissions = claripy.BVV(flags, 3)
+                    initialized = True
+            else:
+                for addr, _, backer in self._memory_backer.stride_repr:
+                    start_backer = new_page_addr - addr
+                    if isinstance(start_backer, BV):
+                        continue
+                    if start_backer < 0 and abs(start_backer) >= self._page_size:
+                        continue
+                    if start_backer >= len(backer):
+                        continue
+
+                    write_start = max(new_page_addr, addr + max(0, start_backer))
                     for i, byte in enumerate(backer):
                         mo = SimMemoryObject(claripy.BVV(byte, self.byte_width), write_start + i, byte_width=self.byte_width)
-                        self._apply_object_to_page(n*self._page_size, mo, page=new_page)
-
-                new_page.permissions = claripy.BVV(flags, 3)
-                initialized = True
+                        self._apply_object_to_page(new_page_addr, mo, page=new_page)
 
-        elif len(self._memory_backer) <= self._page_size:
-            for i in self._memory_backer:
-                if new_page_addr <= i and i <= new_page_addr + self._page_size:
-                    if isinstance(self._memory_backer[i], claripy.ast.Base):
-                        backer = self._memory_backer[i]
-                    elif isinstance(self._memory_backer[i], bytes):
-                        backer = claripy.BVV(self._memory_backer[i])
-                    else:
-                        backer = claripy.BVV(self._memory_backer[i], self.byte_width)
-                    mo = SimMemoryObject(backer, i, byte_width=self.byte_width)
-                    self._apply_object_to_page(n*self._page_size, mo, page=new_page)
-                    initialized = True
-        elif len(self._memory_backer) > self._page_size:
-            for i in range(self._page_size):
-                try:
-                    if isinstance(self._memory_backer[i], claripy.ast.Base):
-                        backer = self._memory_backer[i]
-                    elif isinstance(self._memory_backer[i], bytes):
-                        backer = claripy.BVV(self._memory_backer[i])
-                    else:
-                        backer = claripy.BVV(self._memory_backer[i], self.byte_width)
-                    mo = SimMemoryObject(backer, new_page_addr+i, byte_width=self.byte_width)
-                    self._apply_object_to_page(n*self._page_size, mo, page=new_page)
+                    new_page.permissions = claripy.BVV(flags, 3)
                     initialized = True
-                except KeyError:
-                    pass
+
+        else:
+            if self._backer_addrs is None:
+                self._backer_addrs = sorted(self._memory_backer)
+            lo = bisect.bisect_left(self._backer_addrs, new_page_addr)
+            hi = bisect.bisect_left(self._backer_addrs, new_page_addr + self._page_size)
+            for i in self._backer_addrs[lo:hi]:
+                if isinstance(self._memory_backer[i], claripy.ast.Base):
+                    backer = self._memory_backer[i]
+                elif isinstance(self._memory_backer[i], bytes):
+                    backer = claripy.BVV(self._memory_backer[i])
+                else:
+                    backer = claripy.BVV(self._memory_backer[i], self.byte_width)
+                mo = SimMemoryObject(backer, i, byte_width=self.byte_width)
+                self._apply_object_to_page(new_page_addr, mo, page=new_page)
+                initialized = True
 
         if self.state is not None:
             self.state.scratch.pop_priv()
@@ -578,6 +983,25 @@ class SimPagedMemory(object):
 
         return page
 
+    def range_pages(self, addr, length, freeze=False):
+        """
+        Get the pages that back a range of memory, along with their permissions. As long as a page is not written to
+        in place, two snapshots of a range that contain the same objects mean that its content did not change.
+
+        :param int addr:    The start of the range, which must be page-aligned.
+        :param int length:  The length of the range.
+        :param bool freeze: Make sure that the pages are never written to in place again, by copying them on their next
+                            write in this memory as well.
+        :return:            A tuple of (page, permissions) pairs, with None for the pages that do not exist.
+        """
+        snapshot = [ ]
+        for page_num in xrange(addr // self._page_size, (addr + length + self._page_size - 1) // self._page_size):
+            page = self._pages.get(page_num, None)
+            snapshot.append(None if page is None else (page, page.permissions))
+            if freeze:
+                self._cowed.discard(page_num)
+        return tuple(snapshot)
+
     def __contains__(self, addr):
         try:
             return self.__getitem__(addr) is not None
@@ -642,6 +1066,10 @@ class SimPagedMemory(object):
             if our_page is their_page:
                 continue
 
+            if type(our_page) is ArrayPage and type(their_page) is ArrayPage:
+                candidates.update(our_page.changed_keys(their_page))
+                continue
+
             our_keys = set(our_page.keys())
             their_keys = set(their_page.keys())
             changes = (our_keys - their_keys) | (their_keys - our_keys) | {
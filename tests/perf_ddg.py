@@ -0,0 +1,146 @@
+import os
+import sys
+import time
+from collections import defaultdict
+
+import angr
+from angr.analyses import ddg
+from angr.analyses.ddg import LiveDefinitions
+from angr.sim_variable import SimRegisterVariable, SimMemoryVariable
+
+test_location = str(os.path.join(os.path.dirname(os.path.realpath(__file__)), '../../binaries/tests'))
+
+class DictLiveDefinitions(LiveDefinitions):
+    """
+    Live definitions the way they were stored before they became copy-on-write: dicts of sets, copied on every branch.
+    """
+    def __init__(self):  # pylint:disable=super-init-not-called
+        self._memory_map = defaultdict(set)
+        self._register_map = defaultdict(set)
+        self._defs = defaultdict(set)
+
+    def branch(self):
+        ld = DictLiveDefinitions()
+        ld._memory_map = self._memory_map.copy()
+        ld._register_map = self._register_map.copy()
+        ld._defs = self._defs.copy()
+        return ld
+
+    copy = branch
+
+    def _writable_defs(self):
+        return self._defs
+
+    @staticmethod
+    def _add_to_range(m, start, size, location):
+        new_defs_added = False
+        for offset in xrange(start, start + size):
+            if location not in m[offset]:
+                new_defs_added = True
+            m[offset] = m[offset] | { location }
+        return new_defs_added
+
+    def merge(self, other):
+        new_defs_added = False
+        for variable, locs in other.iteritems():
+            new_defs_added |= self.add_defs(variable, locs)
+        return new_defs_added
+
+def _branches_per_second(cls):
+    # a function that has defined a few hundred stack slots and all registers, and then branches at every block,
+    # redefining a handful of variables after each branch
+    ld = cls()
+    for i in xrange(64):
+        ld.add_def(SimRegisterVariable(i * 8, 8), ('init', i))
+    for i in xrange(512):
+        ld.add_def(SimMemoryVariable(0x7fff0000 + i * 8, 8), ('init', i))
+
+    start = time.time()
+    for i in xrange(5000):
+        ld = ld.branch()
+        ld.kill_def(SimRegisterVariable((i % 64) * 8, 8), ('block', i))
+        ld.kill_def(SimMemoryVariable(0x7fff0000 + (i % 512) * 8, 8), ('block', i))
+        ld.lookup_defs(SimRegisterVariable(((i + 1) % 64) * 8, 8))
+    return 5000 / (time.time() - start)
+
+def _live_definitions():
+    ld = LiveDefinitions()
+    for i in xrange(64):
+        ld.add_def(SimRegisterVariable(i * 8, 8), ('init', i))
+    for i in xrange(512):
+        ld.add_def(SimMemoryVariable(0x7fffffffffff0000 + i * 8, 8), ('init', i))
+    return ld
+
+def _merges_per_second(cls):
+    # two branches of the same collection that redefine a couple of variables each, joined at their common successor
+    ld = cls()
+    for variable, locs in _live_definitions().iteritems():
+        ld.add_defs(variable, locs)
+
+    start = time.time()
+    for i in xrange(2000):
+        a, b = ld.branch(), ld.branch()
+        a.kill_def(SimMemoryVariable(0x7fffffffffff0000 + (i % 512) * 8, 8), ('a', i))
+        b.kill_def(SimRegisterVariable((i % 64) * 8, 8), ('b', i))
+        a.merge(b)
+    return 2000 / (time.time() - start)
+
+def _lookups_per_second(cls):
+    ld = cls()
+    for variable, locs in _live_definitions().iteritems():
+        ld.add_defs(variable, locs)
+
+    variables = [ SimMemoryVariable(0x7fffffffffff0000 + i * 8, 8) for i in xrange(512) ]
+    start = time.time()
+    for _ in xrange(20):
+        for variable in variables:
+            ld.lookup_defs(variable)
+    return 20 * len(variables) / (time.time() - start)
+
+def _ddg_seconds(cls=LiveDefinitions):
+    p = angr.Project(os.path.join(test_location, 'x86_64', 'datadep_test'), auto_load_libs=False,
+                     use_sim_procedures=True)
+    cfg = p.analyses.CFGAccurate(context_sensitivity_level=2, keep_state=True,
+                                 state_add_options=angr.sim_options.refs)
+    # the DDG creates its live definitions through the module global
+    ddg.LiveDefinitions = cls
+    try:
+        start = time.time()
+        p.analyses.DDG(cfg, start=cfg.functions['main'].addr)
+        return time.time() - start
+    finally:
+        ddg.LiveDefinitions = LiveDefinitions
+
+def perf_branch():
+    dicts = _branches_per_second(DictLiveDefinitions)
+    cow = _branches_per_second(LiveDefinitions)
+    print "branch: %f branches/s with dict copies, %f branches/s with copy-on-write maps" % (dicts, cow)
+
+def perf_merge():
+    dicts = _merges_per_second(DictLiveDefinitions)
+    cow = _merges_per_second(LiveDefinitions)
+    print "merge: %f merges/s with dict copies, %f merges/s with copy-on-write maps" % (dicts, cow)
+
+def perf_lookup():
+    dicts = _lookups_per_second(DictLiveDefinitions)
+    cow = _lookups_per_second(LiveDefinitions)
+    print "lookup: %f lookups/s with dict copies, %f lookups/s with copy-on-write maps" % (dicts, cow)
+
+def perf_datadep_test():
+    dicts = _ddg_seconds(DictLiveDefinitions)
+    cow = _ddg_seconds()
+    print "datadep_test: DDG constructed in %f seconds with dict copies, %f seconds with copy-on-write maps" % \
+          (dicts, cow)
+
+if __name__ == "__main__":
+
+    if len(sys.argv) > 1:
+        for arg in sys.argv[1:]:
+            print 'perf_' + arg
+            globals()['perf_' + arg]()
+
+    else:
+        for fk, fv in globals().items():
+            if fk.startswith('perf_') and callable(fv):
+                print fk
+                res = fv()
@@ -0,0 +1,66 @@
+import sys
+import os
+import time
+import shutil
+import tempfile
+import multiprocessing
+
+import angr
+
+test_location = str(os.path.join(os.path.dirname(os.path.realpath(__file__)), '../../'))
+binary = os.path.join(test_location, 'binaries', 'tests', 'cgc', 'sc2_0b32aa01_01')
+max_length = 250
+
+def _worker(queue_path):
+    p = angr.Project(binary)
+    queue = angr.exploration_techniques.SQLiteWorkQueue(queue_path)
+    angr.exploration_techniques.Distributed.run_worker(
+        p, queue, techniques=[angr.exploration_techniques.LengthLimiter(max_length=max_length)], idle_timeout=2)
+
+def perf_single_process():
+    p = angr.Project(binary)
+    sm = p.factory.simgr()
+    sm.use_technique(angr.exploration_techniques.LengthLimiter(max_length=max_length))
+
+    start = time.time()
+    sm.run()
+    elapsed = time.time() - start
+
+    print "Elapsed %f sec, %d states" % (elapsed, len(sm.deadended) + len(sm.cut))
+
+def perf_distributed(workers=None):
+    workers = workers or multiprocessing.cpu_count()
+    tmp_dir = tempfile.mkdtemp(prefix='perf_distributed')
+    queue_path = os.path.join(tmp_dir, 'queue.db')
+
+    try:
+        queue = angr.exploration_techniques.SQLiteWorkQueue(queue_path)
+        p = angr.Project(binary)
+        sm = p.factory.simgr()
+        sm.use_technique(angr.exploration_techniques.Distributed(queue))
+
+        start = time.time()
+        procs = [multiprocessing.Process(target=_worker, args=(queue_path,)) for _ in xrange(workers)]
+        for proc in procs:
+            proc.start()
+        sm.run()
+        elapsed = time.time() - start
+        for proc in procs:
+            proc.join()
+
+        print "Elapsed %f sec with %d workers, %d states" % (elapsed, workers, len(sm.deadended) + len(sm.cut))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+if __name__ == "__main__":
+
+    if len(sys.argv) > 1:
+        for arg in sys.argv[1:]:
+            print 'perf_' + arg
+            globals()['perf_' + arg]()
+
+    else:
+        for fk, fv in globals().items():
+            if fk.startswith('perf_') and callable(fv):
+                print fk
+                res = fv()
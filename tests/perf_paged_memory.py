@@ -0,0 +1,66 @@
+import sys
+import time
+
+from angr import SimState
+from angr import options as o
+
+def _state_with_pages(n):
+    s = SimState(arch="AMD64")
+    for i in xrange(n):
+        s.memory.store(0x10000000 + i * 0x1000, s.se.BVV(i, 64))
+    return s
+
+def perf_branch():
+    for n in (16, 256, 4096, 16384):
+        s = _state_with_pages(n)
+
+        start = time.time()
+        for _ in xrange(1000):
+            s.memory.mem.branch()
+        elapsed = time.time() - start
+
+        print "%6d pages: %f usec per SimPagedMemory.branch()" % (n, elapsed * 1000)
+
+def perf_state_copy():
+    for n in (16, 256, 4096, 16384):
+        s = _state_with_pages(n)
+
+        start = time.time()
+        for _ in xrange(1000):
+            s = s.copy()
+            s.memory.store(0x10000000, s.se.BVV(0, 64))
+        elapsed = time.time() - start
+
+        print "%6d pages: %f usec per SimState.copy() and store" % (n, elapsed * 1000)
+
+def perf_bulk_bytes():
+    data = ''.join(chr(i % 256) for i in xrange(0x3000))
+    for name, options in (('paged', set()), ('array', {o.ARRAY_PAGES})):
+        s = SimState(arch="AMD64", add_options=options)
+
+        start = time.time()
+        for _ in xrange(100):
+            s.memory.store_bytes(0x30000, data)
+            s.memory.load_bytes(0x30000, len(data))
+        bulk = time.time() - start
+
+        start = time.time()
+        for _ in xrange(100):
+            s.memory.store(0x30000, data)
+            s.memory.load(0x30000, len(data))
+        regular = time.time() - start
+
+        print "%s pages: %f s with store_bytes/load_bytes, %f s with store/load" % (name, bulk, regular)
+
+if __name__ == "__main__":
+
+    if len(sys.argv) > 1:
+        for arg in sys.argv[1:]:
+            print 'perf_' + arg
+            globals()['perf_' + arg]()
+
+    else:
+        for fk, fv in globals().items():
+            if fk.startswith('perf_') and callable(fv):
+                print fk
+                res = fv()
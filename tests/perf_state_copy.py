@@ -0,0 +1,56 @@
+import os
+import sys
+import time
+
+import angr
+
+test_location = str(os.path.join(os.path.dirname(os.path.realpath(__file__)), '../../binaries/tests'))
+
+def _states_per_second(add_options):
+    p = angr.Project(os.path.join(test_location, 'x86_64', 'fauxware'), auto_load_libs=False)
+    s = p.factory.entry_state(add_options=add_options)
+    simgr = p.factory.simgr(s)
+
+    stepped = 0
+    start = time.time()
+    while simgr.active and stepped < 2000:
+        stepped += len(simgr.active)
+        simgr.step()
+    return stepped / (time.time() - start)
+
+def _copies_per_second(add_options, accessed):
+    s = angr.SimState(arch='AMD64', add_options=add_options)
+    s.posix.files[0].write(s.se.BVS('stdin', 8 * 0x100), 0x100)
+    s.memory.store(0x1000, s.se.BVV(0, 64))
+
+    start = time.time()
+    for _ in xrange(5000):
+        s = s.copy()
+        for name in accessed:
+            s.get_plugin(name)
+    return 5000 / (time.time() - start)
+
+def perf_fauxware():
+    eager = _states_per_second(set())
+    lazy = _states_per_second({angr.options.LAZY_PLUGIN_COPIES})
+    print "fauxware: %f states/s with eager plugin copies, %f states/s with lazy plugin copies" % (eager, lazy)
+
+def perf_branch():
+    # a state that branches and only touches its registers and memory, like the states of branch-heavy code
+    accessed = ('registers', 'memory', 'solver', 'scratch', 'history')
+    eager = _copies_per_second(set(), accessed)
+    lazy = _copies_per_second({angr.options.LAZY_PLUGIN_COPIES}, accessed)
+    print "branch: %f copies/s with eager plugin copies, %f copies/s with lazy plugin copies" % (eager, lazy)
+
+if __name__ == "__main__":
+
+    if len(sys.argv) > 1:
+        for arg in sys.argv[1:]:
+            print 'perf_' + arg
+            globals()['perf_' + arg]()
+
+    else:
+        for fk, fv in globals().items():
+            if fk.startswith('perf_') and callable(fv):
+                print fk
+                res = fv()
@@ -0,0 +1,52 @@
+import os
+import sys
+import time
+
+import angr
+
+from common import bin_location, do_trace
+
+def _trace(binary, trace_name, input_content, fast_forward):
+    p = angr.Project(os.path.join(bin_location, binary))
+    p.simos.syscall_library.update(angr.SIM_LIBRARIES['cgcabi_tracer'])
+
+    trace, magic, crash_mode, crash_addr = do_trace(p, trace_name, input_content)
+    s = p.factory.tracer_state(input_content=input_content, magic_content=magic)
+    simgr = p.factory.simulation_manager(s, save_unsat=True, hierarchy=False, save_unconstrained=crash_mode)
+    simgr.use_technique(angr.exploration_techniques.CrashMonitor(trace=trace,
+                                                                 crash_mode=crash_mode,
+                                                                 crash_addr=crash_addr))
+    simgr.use_technique(angr.exploration_techniques.Tracer(trace=trace, use_cache=False, fast_forward=fast_forward))
+    simgr.use_technique(angr.exploration_techniques.Oppologist())
+
+    start = time.time()
+    simgr.run()
+    elapsed = time.time() - start
+
+    state = (simgr.stashes.get('traced') or simgr.stashes.get('crashed') or simgr.active)[0]
+    return state.globals['bb_cnt'], elapsed
+
+def _compare(binary, trace_name, input_content):
+    for fast_forward in (False, True):
+        blocks, elapsed = _trace(binary, trace_name, input_content, fast_forward)
+        print "fast_forward=%-5s %6d blocks in %f s, %f blocks/s" % (fast_forward, blocks, elapsed, blocks / elapsed)
+
+def perf_palindrome():
+    _compare("tests/cgc/sc1_0b32aa01_01", 'tracer_cgc_se1_palindrome_raw_nocrash', "racecar\n")
+
+def perf_recursion():
+    blob = "00aadd114000000000000000200000001d0000000005000000aadd2a1100001d0000000001e8030000aadd21118611b3b3b3b3b3e3b1b1b1adb1b1b1b1b1b1118611981d8611".decode('hex')
+    _compare("tests/cgc/NRFIN_00075", 'tracer_recursion', blob)
+
+if __name__ == "__main__":
+
+    if len(sys.argv) > 1:
+        for arg in sys.argv[1:]:
+            print 'perf_' + arg
+            globals()['perf_' + arg]()
+
+    else:
+        for fk, fv in globals().items():
+            if fk.startswith('perf_') and callable(fv):
+                print fk
+                res = fv()
@@ -4,6 +4,9 @@ import logging
 l = logging.getLogger("angr.tests")
 
 import os
+import shutil
+import sqlite3
+import tempfile
 test_location = str(os.path.join(os.path.dirname(os.path.realpath(__file__)), '../../binaries/tests'))
 
 def test_block_cache():
@@ -15,5 +18,58 @@ def test_block_cache():
     b = p.factory.block(p.entry)
     assert p.factory.block(p.entry).vex is not b.vex
 
+def test_persistent_block_cache():
+    cache_dir = tempfile.mkdtemp(prefix="angr_test_irsb_cache")
+    cache_path = os.path.join(cache_dir, "irsbs.db")
+    try:
+        p = angr.Project(os.path.join(test_location, "x86_64", "fauxware"), persistent_translation_cache=cache_path)
+        cache = p.factory.default_engine.persistent_cache
+        b = p.factory.block(p.entry)
+        assert cache.misses == 1 and cache.hits == 0
+
+        # another project (e.g. in another process) loads the block from the cache
+        p2 = angr.Project(os.path.join(test_location, "x86_64", "fauxware"), persistent_translation_cache=cache_path)
+        cache2 = p2.factory.default_engine.persistent_cache
+        b2 = p2.factory.block(p2.entry)
+        assert cache2.hits == 1 and cache2.misses == 0
+        assert b2.vex is not b.vex
+        assert b2.vex.arch is p2.arch
+        assert str(b2.vex) == str(b.vex)
+
+        # different lifting parameters are different blocks
+        p2.factory.block(p2.entry, opt_level=0).vex
+        assert cache2.misses == 1
+    finally:
+        shutil.rmtree(cache_dir)
+
+def test_persistent_block_cache_invalid():
+    cache_dir = tempfile.mkdtemp(prefix="angr_test_irsb_cache")
+    cache_path = os.path.join(cache_dir, "irsbs.db")
+    try:
+        p = angr.Project(os.path.join(test_location, "x86_64", "fauxware"), persistent_translation_cache=cache_path)
+        p.factory.block(p.entry).vex
+        db = sqlite3.connect(cache_path, isolation_level=None)
+
+        # a corrupt IRSB is a miss, and is removed from the cache
+        db.execute("UPDATE irsbs SET data = ?", (sqlite3.Binary("garbage"),))
+        p2 = angr.Project(os.path.join(test_location, "x86_64", "fauxware"), persistent_translation_cache=cache_path)
+        cache2 = p2.factory.default_engine.persistent_cache
+        p2.factory.block(p2.entry).vex
+        assert cache2.hits == 0 and cache2.misses == 1
+        assert db.execute("SELECT COUNT(*) FROM irsbs").fetchone()[0] == 1
+
+        # IRSBs cached by other versions are never loaded
+        db.execute("UPDATE info SET value = 'format 0' WHERE name = 'version'")
+        p3 = angr.Project(os.path.join(test_location, "x86_64", "fauxware"), persistent_translation_cache=cache_path)
+        cache3 = p3.factory.default_engine.persistent_cache
+        assert db.execute("SELECT COUNT(*) FROM irsbs").fetchone()[0] == 0
+        p3.factory.block(p3.entry).vex
+        assert cache3.hits == 0 and cache3.misses == 1
+        db.close()
+    finally:
+        shutil.rmtree(cache_dir)
+
 if __name__ == "__main__":
     test_block_cache()
+    test_persistent_block_cache()
+    test_persistent_block_cache_invalid()
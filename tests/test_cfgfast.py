@@ -1,7 +1,11 @@
 import os
 import logging
+import pickle
+import shutil
 import sys
+import tempfile
 
+import networkx
 import nose.tools
 
 import angr
@@ -449,6 +453,164 @@ def test_block_instruction_addresses_armhf():
     for instr_addr in main_node.instruction_addrs:
         nose.tools.assert_true(instr_addr % 2 == 1)
 
+def test_cfg_parallel_lifting():
+
+    path = os.path.join(test_location, 'x86_64', 'fauxware')
+    proj = angr.Project(path, auto_load_libs=False)
+
+    cfg = proj.analyses.CFGFast()
+    parallel_cfg = proj.analyses.CFGFast(processes=2)
+
+    nose.tools.assert_equal(set(parallel_cfg.kb.functions), set(cfg.kb.functions))
+    nose.tools.assert_equal(sorted((n.addr, n.size) for n in parallel_cfg.graph.nodes()),
+                            sorted((n.addr, n.size) for n in cfg.graph.nodes()))
+    nose.tools.assert_equal(sorted((src.addr, dst.addr) for src, dst in parallel_cfg.graph.edges()),
+                            sorted((src.addr, dst.addr) for src, dst in cfg.graph.edges()))
+
+def test_cfg_compact_graph():
+
+    path = os.path.join(test_location, 'x86_64', 'fauxware')
+    proj = angr.Project(path, auto_load_libs=False)
+    cfg = proj.analyses.CFGFast()
+
+    nose.tools.assert_is_instance(cfg.graph, angr.analyses.cfg.CFGGraph)
+    main_node = cfg.get_any_node(proj.loader.main_object.get_symbol('main').rebased_addr)
+    nose.tools.assert_false(hasattr(main_node, '__dict__'))
+
+    # edge attributes behave like dicts, and share their jumpkind strings
+    jumpkinds = set()
+    for _, _, data in cfg.graph.edges(data=True):
+        nose.tools.assert_is_instance(data, angr.analyses.cfg.CFGEdgeData)
+        nose.tools.assert_in('jumpkind', data)
+        nose.tools.assert_equal(dict(data)['jumpkind'], data.get('jumpkind'))
+        jumpkinds.add(id(data['jumpkind']))
+    nose.tools.assert_equal(len(jumpkinds), len(set(data['jumpkind'] for _, _, data in cfg.graph.edges(data=True))))
+
+    calls = cfg.get_successors(main_node, jumpkind='Ijk_Call')
+    nose.tools.assert_true(calls)
+    nose.tools.assert_true(set(calls).issubset(cfg.get_successors(main_node)))
+    nose.tools.assert_in(main_node, cfg.get_predecessors(calls[0]))
+
+    # nodes and graphs survive pickling
+    graph = pickle.loads(pickle.dumps(cfg.graph, -1))
+    nose.tools.assert_equal(sorted((src.addr, dst.addr, data['jumpkind']) for src, dst, data in graph.edges(data=True)),
+                            sorted((src.addr, dst.addr, data['jumpkind'])
+                                   for src, dst, data in cfg.graph.edges(data=True)))
+    node = pickle.loads(pickle.dumps(main_node, 0))
+    nose.tools.assert_equal((node.addr, node.size, node.instruction_addrs),
+                            (main_node.addr, main_node.size, main_node.instruction_addrs))
+
+def test_cfg_graph_adjacency():
+
+    # the array-backed adjacency of CFGGraph behaves like the dicts of a networkx DiGraph
+    graph, expected = angr.analyses.cfg.CFGGraph(), networkx.DiGraph()
+    edges = [ (0, 1, 'Ijk_Boring'), (1, 2, 'Ijk_Call'), (2, 1, 'Ijk_Ret'), (1, 1, 'Ijk_Boring'), (2, 3, 'Ijk_Boring'),
+              (3, 0, 'Ijk_Boring'), (4, 0, 'Ijk_Call') ]
+    for g in (graph, expected):
+        for src, dst, jumpkind in edges:
+            g.add_edge(src, dst, jumpkind=jumpkind)
+        g.add_edge(0, 1, stmt_idx=4)
+        g.add_node(5, function=True)
+        g.remove_node(4)
+        g.remove_edge(2, 3)
+
+    def check(graph):
+        nose.tools.assert_equal(sorted(graph.nodes()), sorted(expected.nodes()))
+        nose.tools.assert_equal(sorted((u, v, dict(data)) for u, v, data in graph.edges(data=True)),
+                                sorted(expected.edges(data=True)))
+        nose.tools.assert_equal(sorted((u, v, dict(data)) for u, v, data in graph.in_edges(data=True)),
+                                sorted(expected.in_edges(data=True)))
+        for n in expected:
+            nose.tools.assert_equal(sorted(graph.successors(n)), sorted(expected.successors(n)))
+            nose.tools.assert_equal(sorted(graph.predecessors(n)), sorted(expected.predecessors(n)))
+            nose.tools.assert_equal(sorted(graph.pred[n]), sorted(expected.pred[n]))
+            nose.tools.assert_equal(dict(graph.node[n]), expected.node[n])
+        nose.tools.assert_equal(graph.number_of_edges(), expected.number_of_edges())
+
+    check(graph)
+    nose.tools.assert_is_instance(graph[0][1], angr.analyses.cfg.CFGEdgeData)
+    nose.tools.assert_equal(graph.pred[1][0], {'jumpkind': 'Ijk_Boring', 'stmt_idx': 4})
+    nose.tools.assert_false(graph.has_edge(2, 3))
+    nose.tools.assert_not_in(4, graph)
+    nose.tools.assert_raises(networkx.NetworkXError, graph.remove_edge, 2, 3)
+
+    # copies, pickles and networkx algorithms see the same graph
+    check(pickle.loads(pickle.dumps(graph, -1)))
+    check(graph.copy())
+    check(angr.analyses.cfg.CFGGraph(expected))
+    nose.tools.assert_equal(sorted(graph.reverse().edges()), sorted(expected.reverse().edges()))
+    nose.tools.assert_equal(sorted(graph.subgraph([0, 1, 2]).edges()), sorted(expected.subgraph([0, 1, 2]).edges()))
+    nose.tools.assert_equal(sorted(map(sorted, networkx.strongly_connected_components(graph))),
+                            sorted(map(sorted, networkx.strongly_connected_components(expected))))
+
+def test_cfg_node_addr_index():
+
+    path = os.path.join(test_location, 'x86_64', 'fauxware')
+    proj = angr.Project(path, auto_load_libs=False)
+    cfg = proj.analyses.CFGFast()
+
+    def slow_lookup(addr):
+        for n in cfg.graph.nodes():
+            if n.looping_times == 0 and n.size is not None and n.addr <= addr < n.addr + n.size:
+                return n
+        return None
+
+    insn_addrs = set()
+    for n in cfg.graph.nodes():
+        insn_addrs.update(n.instruction_addrs)
+        insn_addrs.add(n.addr - 1)
+    for addr in insn_addrs:
+        nose.tools.assert_is(cfg.get_any_node(addr, anyaddr=True), slow_lookup(addr))
+
+    # the index follows updates to the graph
+    node = cfg.get_any_node(proj.loader.main_object.get_symbol('main').rebased_addr)
+    cfg.graph.remove_node(node)
+    nose.tools.assert_is_none(cfg.get_any_node(node.addr + 1, anyaddr=True))
+    cfg.graph.add_node(node)
+    nose.tools.assert_is(cfg.get_any_node(node.addr + 1, anyaddr=True), node)
+
+    # nodes that grow are still found at the end of their new range
+    end = node.addr + cfg.graph._max_node_size + 1
+    node.size = end - node.addr + 1
+    nose.tools.assert_in(node, list(cfg.graph.nodes_containing(end)))
+
+#
+# Result cache
+#
+
+def test_cfg_cache():
+
+    path = os.path.join(test_location, 'x86_64', 'fauxware')
+    cache_dir = tempfile.mkdtemp(prefix='angr_test_cfg_cache')
+
+    try:
+        proj = angr.Project(path, auto_load_libs=False)
+        cfg = proj.analyses.CFGFast(cache=cache_dir, function_prologues=False, force_complete_scan=False)
+        functions = set(cfg.kb.functions)
+        nose.tools.assert_equal(len(os.listdir(cache_dir)), 1)
+
+        # a fresh project restores the results from the cache
+        proj = angr.Project(path, auto_load_libs=False)
+        cached = proj.analyses.CFGFast(cache=cache_dir, function_prologues=False, force_complete_scan=False)
+        nose.tools.assert_equal(set(cached.kb.functions), functions)
+        nose.tools.assert_equal(len(cached.graph), len(cfg.graph))
+        nose.tools.assert_is(cached.get_any_node(proj.entry)._cfg, cached)
+        nose.tools.assert_is(cached.kb.functions[proj.entry]._function_manager, cached.kb.functions)
+
+        # extra function starts resume from the cached results, and replace them
+        new_start = next(n.addr for n in cfg.graph.nodes() if n.addr not in functions and n.simprocedure_name is None)
+        resumed = proj.analyses.CFGFast(cache=cache_dir, function_prologues=False, force_complete_scan=False,
+                                        function_starts=[ new_start ])
+        nose.tools.assert_is_not_none(resumed._cache_resume)
+        nose.tools.assert_true(set(resumed.kb.functions).issuperset(functions))
+        nose.tools.assert_equal(len(os.listdir(cache_dir)), 1)
+
+        # different parameters do not hit the same cache entry
+        proj.analyses.CFGFast(cache=cache_dir, function_prologues=False)
+        nose.tools.assert_equal(len(os.listdir(cache_dir)), 2)
+    finally:
+        shutil.rmtree(cache_dir)
+
 #
 # Blanket
 #
@@ -501,6 +663,11 @@ def run_all():
     test_resolve_x86_elf_pic_plt()
     test_function_names_for_unloaded_libraries()
     test_block_instruction_addresses_armhf()
+    test_cfg_parallel_lifting()
+    test_cfg_compact_graph()
+    test_cfg_graph_adjacency()
+    test_cfg_node_addr_index()
+    test_cfg_cache()
 
 
 def main():
@@ -73,6 +73,67 @@ def test_ddg_0():
     binary_path = os.path.join(test_location, 'x86_64', 'datadep_test')
     perform_one(binary_path)
 
+def test_ddg_static():
+    binary_path = os.path.join(test_location, 'x86_64', 'datadep_test')
+    proj = angr.Project(binary_path, load_options={'auto_load_libs': False})
+    cfg = proj.analyses.CFGFast()
+    main = cfg.functions['main']
+
+    ddg = proj.analyses.DDG(cfg, start=main.addr, call_depth=0, static=True)
+
+    # results are stored per function in the knowledge base
+    nose.tools.assert_equal(ddg._static_function_addrs, [ main.addr ])
+    deps = proj.kb.data_dependencies[main.addr]
+    nose.tools.assert_is(ddg.function_dependency_graph(main), deps.graph)
+
+    from angr.analyses.code_location import CodeLocation
+
+    # the same memory dependency as in perform_one(), found without any state
+    cl1 = CodeLocation(0x400667, 3)
+    sources = [ src for src, _ in ddg.graph.in_edges([cl1]) ]
+    nose.tools.assert_in(CodeLocation(0x400667, 2), sources)
+    nose.tools.assert_in(CodeLocation(0x40064c, 26), sources)
+    nose.tools.assert_in(CodeLocation(0x400667, 19), sources)
+
+def test_live_definitions_branch():
+    from angr.analyses.ddg import LiveDefinitions
+    from angr.sim_variable import SimRegisterVariable, SimStackVariable
+
+    reg = SimRegisterVariable(16, 8)
+    stack = SimStackVariable(-8, 4)
+
+    ld = LiveDefinitions()
+    nose.tools.assert_true(ld.add_def(reg, 'def_0'))
+    nose.tools.assert_false(ld.add_def(reg, 'def_0'))
+    nose.tools.assert_true(ld.add_def(stack, 'def_1'))
+
+    branch = ld.branch()
+    branch.kill_def(reg, 'def_2')
+    branch.add_def(stack, 'def_3')
+
+    # the original collection is not affected by changes to its branch
+    nose.tools.assert_equal(ld.lookup_defs(reg), { 'def_0' })
+    nose.tools.assert_equal(ld.lookup_defs(stack), { 'def_1' })
+    nose.tools.assert_equal(branch.lookup_defs(reg), { 'def_2' })
+    nose.tools.assert_equal(branch.lookup_defs(SimStackVariable(-6, 1)), { 'def_1', 'def_3' })
+
+    merged = LiveDefinitions()
+    nose.tools.assert_true(merged.merge(ld))
+    nose.tools.assert_true(merged.merge(branch))
+    nose.tools.assert_false(merged.merge(branch))
+    nose.tools.assert_equal(merged.lookup_defs(reg), { 'def_0', 'def_2' })
+
+    # merging adds the definitions of each byte, and does nothing for the bytes both collections still share
+    narrow = ld.branch()
+    narrow.kill_def(SimRegisterVariable(16, 4), 'def_4')
+    joined = ld.branch()
+    nose.tools.assert_true(joined.merge(narrow))
+    nose.tools.assert_false(joined.merge(ld))
+    nose.tools.assert_equal(joined.lookup_defs(SimRegisterVariable(16, 4)), { 'def_0', 'def_4' })
+    nose.tools.assert_equal(joined.lookup_defs(SimRegisterVariable(20, 4)), { 'def_0' })
+    nose.tools.assert_equal(joined.lookup_defs(stack), { 'def_1' })
+    nose.tools.assert_equal(ld.lookup_defs(reg), { 'def_0' })
+
 def run_all():
     functions = globals()
     all_functions = dict(filter((lambda (k, v): k.startswith('test_') and hasattr(v, '__call__')), functions.items()))
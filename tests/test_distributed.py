@@ -0,0 +1,195 @@
+import os
+import shutil
+import tempfile
+import multiprocessing
+
+import nose
+
+import angr
+
+location = str(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..', 'binaries', 'tests'))
+fauxware = os.path.join(location, 'x86_64', 'fauxware')
+
+
+class _Crash(angr.exploration_techniques.ExplorationTechnique):
+    def step_state(self, simgr, state, **kwargs):
+        if state.addr == 0x4006ed:
+            raise RuntimeError("crash")
+        return simgr.step_state(state, **kwargs)
+
+
+def _worker(queue_path, techniques=None, stash='active'):
+    p = angr.Project(fauxware, load_options={'auto_load_libs': False})
+    queue = angr.exploration_techniques.SQLiteWorkQueue(queue_path)
+    if techniques is None:
+        techniques = [angr.exploration_techniques.Explorer(find=0x4006ed)]
+    angr.exploration_techniques.Distributed.run_worker(p, queue, stash=stash, techniques=techniques, idle_timeout=2)
+
+
+def _claim_and_die(queue_path):
+    queue = angr.exploration_techniques.SQLiteWorkQueue(queue_path)
+    queue.claim('active')
+    os._exit(0)
+
+
+def test_distributed():
+    tmp_dir = tempfile.mkdtemp(prefix='test_distributed')
+    queue_path = os.path.join(tmp_dir, 'queue.db')
+
+    try:
+        queue = angr.exploration_techniques.SQLiteWorkQueue(queue_path)
+        workers = [multiprocessing.Process(target=_worker, args=(queue_path,)) for _ in xrange(2)]
+        for w in workers:
+            w.start()
+
+        p = angr.Project(fauxware, load_options={'auto_load_libs': False})
+        pg = p.factory.simgr()
+        pg.use_technique(angr.exploration_techniques.Distributed(queue, timeout=300))
+        pg.run()
+
+        for w in workers:
+            w.join()
+
+        nose.tools.assert_equal(len(pg.active), 0)
+        nose.tools.assert_equal(len(pg.found), 3)
+        nose.tools.assert_true(all(s.addr == 0x4006ed for s in pg.found))
+        nose.tools.assert_true(all(s.project is p for s in pg.found))
+        nose.tools.assert_equal(queue.stashes(), [])
+
+        # the found states keep their whole ancestry, which they share with each other
+        for s in pg.found:
+            nose.tools.assert_equal(len(list(s.history.lineage)), s.history.depth + 1)
+        nose.tools.assert_equal(len(set(id(list(s.history.lineage)[0]) for s in pg.found)), 1)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+def test_distributed_coordinator_techniques():
+    tmp_dir = tempfile.mkdtemp(prefix='test_distributed')
+    queue_path = os.path.join(tmp_dir, 'queue.db')
+
+    try:
+        queue = angr.exploration_techniques.SQLiteWorkQueue(queue_path)
+        workers = [multiprocessing.Process(target=_worker, args=(queue_path, [])) for _ in xrange(2)]
+        for w in workers:
+            w.start()
+
+        # the explorer runs on the coordinator, which steps once per step of the simulation manager
+        p = angr.Project(fauxware, load_options={'auto_load_libs': False})
+        pg = p.factory.simgr()
+        pg.use_technique(angr.exploration_techniques.Distributed(queue, timeout=300))
+        pg.explore(find=0x4006ed)
+
+        for w in workers:
+            w.join()
+
+        nose.tools.assert_equal(len(pg.found), 1)
+        nose.tools.assert_equal(pg.found[0].addr, 0x4006ed)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+def test_distributed_errored():
+    tmp_dir = tempfile.mkdtemp(prefix='test_distributed')
+    queue_path = os.path.join(tmp_dir, 'queue.db')
+
+    try:
+        queue = angr.exploration_techniques.SQLiteWorkQueue(queue_path)
+        workers = [multiprocessing.Process(target=_worker, args=(queue_path, [_Crash()])) for _ in xrange(2)]
+        for w in workers:
+            w.start()
+
+        p = angr.Project(fauxware, load_options={'auto_load_libs': False})
+        pg = p.factory.simgr()
+        pg.use_technique(angr.exploration_techniques.Distributed(queue, timeout=300))
+        pg.run()
+
+        # both workers survive the states that crash them
+        for w in workers:
+            w.join()
+            nose.tools.assert_equal(w.exitcode, 0)
+
+        nose.tools.assert_equal(len(pg.errored), 3)
+        nose.tools.assert_true(all(e.state.addr == 0x4006ed for e in pg.errored))
+        nose.tools.assert_true(all(isinstance(e.error, RuntimeError) for e in pg.errored))
+        nose.tools.assert_true(all('step_state' in e.formatted_traceback and 'crash' in e.formatted_traceback
+                                   for e in pg.errored))
+        nose.tools.assert_raises(RuntimeError, pg.errored[0].reraise)
+        nose.tools.assert_true(len(pg.deadended) > 0)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+def test_distributed_stash():
+    tmp_dir = tempfile.mkdtemp(prefix='test_distributed')
+    queue_path = os.path.join(tmp_dir, 'queue.db')
+
+    try:
+        queue = angr.exploration_techniques.SQLiteWorkQueue(queue_path)
+        w = multiprocessing.Process(target=_worker, args=(queue_path, [], 'foo'))
+        w.start()
+
+        p = angr.Project(fauxware, load_options={'auto_load_libs': False})
+        pg = p.factory.simgr()
+        pg.move('active', 'foo')
+        entry = pg.foo[0].addr
+        # the arguments of the step are sent to the worker
+        expected = p.factory.successors(pg.foo[0], num_inst=1).flat_successors[0].addr
+        pg.use_technique(angr.exploration_techniques.Distributed(queue, timeout=300))
+        pg.step(stash='foo', num_inst=1)
+        w.join()
+
+        nose.tools.assert_equal(len(pg.active), 0)
+        nose.tools.assert_equal(len(pg.foo), 1)
+        nose.tools.assert_not_equal(pg.foo[0].addr, entry)
+        nose.tools.assert_equal(pg.foo[0].addr, expected)
+        nose.tools.assert_equal(queue.stashes(), [])
+    finally:
+        shutil.rmtree(tmp_dir)
+
+def test_distributed_no_workers():
+    tmp_dir = tempfile.mkdtemp(prefix='test_distributed')
+    queue_path = os.path.join(tmp_dir, 'queue.db')
+
+    try:
+        queue = angr.exploration_techniques.SQLiteWorkQueue(queue_path)
+
+        # without any worker, the step gives up waiting and steps its states itself
+        p = angr.Project(fauxware, load_options={'auto_load_libs': False})
+        pg = p.factory.simgr()
+        entry = pg.active[0]
+        pg.use_technique(angr.exploration_techniques.Distributed(queue, idle_timeout=1))
+        pg.step()
+
+        nose.tools.assert_equal(len(pg.active), 1)
+        nose.tools.assert_not_equal(pg.active[0].addr, entry.addr)
+        nose.tools.assert_is(pg.active[0].history.parent, entry.history)
+        nose.tools.assert_equal(queue.stashes(), [])
+    finally:
+        shutil.rmtree(tmp_dir)
+
+def test_reclaim():
+    tmp_dir = tempfile.mkdtemp(prefix='test_distributed')
+    queue_path = os.path.join(tmp_dir, 'queue.db')
+
+    try:
+        queue = angr.exploration_techniques.SQLiteWorkQueue(queue_path)
+        queue.put('active', ['a', 'b'])
+
+        w = multiprocessing.Process(target=_claim_and_die, args=(queue_path,))
+        w.start()
+        w.join()
+        nose.tools.assert_equal(queue.pending('active'), 2)
+        nose.tools.assert_equal(queue.claim('active', 2), [(2, 'b')])
+
+        # the claim of the dead worker is given back, ours is only given back once it is stale
+        nose.tools.assert_equal(queue.reclaim(), 1)
+        nose.tools.assert_equal(queue.claim('active', 2), [(1, 'a')])
+        nose.tools.assert_equal(queue.reclaim(timeout=0), 2)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+if __name__ == "__main__":
+    test_distributed()
+    test_distributed_coordinator_techniques()
+    test_distributed_errored()
+    test_distributed_stash()
+    test_distributed_no_workers()
+    test_reclaim()
@@ -76,6 +76,39 @@ def run_fastmem(arch):
     p = angr.Project(os.path.join(test_location, arch, "fauxware"))
     p.analyses.CongruencyCheck(throw=True).set_state_options(right_add_options={"FAST_REGISTERS"}).run()
 
+def run_compiled(arch):
+    p = angr.Project(os.path.join(test_location, arch, "fauxware"))
+    s = p.factory.entry_state(add_options={angr.options.COMPILED_IRSB})
+    results = p.factory.simgr(s).explore(find=target_addrs[arch], avoid=avoid_addrs[arch])
+    stdin = results.found[0].posix.dumps(0)
+    nose.tools.assert_equal('\x00\x00\x00\x00\x00\x00\x00\x00\x00SOSNEAKY\x00', stdin)
+
+def run_batched_checks(arch):
+    p = angr.Project(os.path.join(test_location, arch, "fauxware"))
+    s = p.factory.entry_state(add_options={angr.options.BATCHED_SUCCESSOR_CHECKS})
+    results = p.factory.simgr(s, save_unsat=True).explore(find=target_addrs[arch], avoid=avoid_addrs[arch])
+    stdin = results.found[0].posix.dumps(0)
+    nose.tools.assert_equal('\x00\x00\x00\x00\x00\x00\x00\x00\x00SOSNEAKY\x00', stdin)
+    for unsat in results.unsat:
+        nose.tools.assert_false(unsat.satisfiable())
+
+def run_compact_history(arch):
+    p = angr.Project(os.path.join(test_location, arch, "fauxware"))
+    results = p.factory.simgr().explore(find=target_addrs[arch], avoid=avoid_addrs[arch])
+    s = p.factory.entry_state(add_options={angr.options.COMPACT_HISTORY})
+    compact_results = p.factory.simgr(s).explore(find=target_addrs[arch], avoid=avoid_addrs[arch])
+
+    trace = results.found[0].history.bbl_addrs.hardcopy
+    compact_trace = compact_results.found[0].history.bbl_addrs
+    nose.tools.assert_equal(compact_trace.hardcopy, trace)
+    nose.tools.assert_equal(list(reversed(compact_trace)), trace[::-1])
+    nose.tools.assert_equal(len(compact_trace), len(trace))
+    nose.tools.assert_equal(compact_trace[len(trace) // 2], trace[len(trace) // 2])
+    nose.tools.assert_equal(compact_trace[-1], trace[-1])
+    nose.tools.assert_equal(compact_trace.count(trace[-1]), trace.count(trace[-1]))
+    nose.tools.assert_in(trace[0], compact_trace)
+    nose.tools.assert_equal(compact_results.found[0].history.parent.recent_bbl_addrs[-1], trace[-2])
+
 def run_nodecode(arch):
     p = angr.Project(os.path.join(test_location, arch, "fauxware"))
 
@@ -134,6 +167,43 @@ def test_fastmem():
     #yield run_fastmem, "ppc"
     #yield run_fastmem, "mips"
 
+def test_compiled():
+    for arch in target_addrs:
+        yield run_compiled, arch
+
+def test_batched_checks():
+    for arch in target_addrs:
+        yield run_batched_checks, arch
+
+def test_batched_checks_categorize_on_read():
+    p = angr.Project(os.path.join(test_location, 'x86_64', "fauxware"))
+    s = p.factory.entry_state(add_options={angr.options.BATCHED_SUCCESSOR_CHECKS})
+    x = s.se.BVS('x', 64)
+    successors = angr.engines.SimSuccessors(s.addr, s)
+
+    # the exit breakpoint only fires after the successor is categorized
+    categorized = [ ]
+    s.inspect.b('exit', when=angr.BP_AFTER,
+                action=lambda state: categorized.append(state in successors._flat_successors or
+                                                        state in successors._unsat_successors))
+
+    sat = s.copy()
+    successors.add_successor(sat, 0x1000, x == 1, 'Ijk_Boring')
+    unsat = s.copy()
+    unsat.add_constraints(x == 2)
+    successors.add_successor(unsat, 0x2000, x == 1, 'Ijk_Boring')
+    nose.tools.assert_equal(categorized, [ ])
+
+    # reading a successor list categorizes the pending successors, before the engine is done
+    nose.tools.assert_equal(successors.successors, [ sat ])
+    nose.tools.assert_equal(successors.unsat_successors, [ unsat ])
+    nose.tools.assert_equal(categorized, [ True, True ])
+    nose.tools.assert_true(sat.satisfiable())
+
+def test_compact_history():
+    for arch in target_addrs:
+        yield run_compact_history, arch
+
 def test_nodecode():
     for arch in corrupt_addrs:
         yield run_nodecode, arch
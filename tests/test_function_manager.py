@@ -1,6 +1,7 @@
 import nose
 import angr
 from archinfo import ArchAMD64
+from angr.codenode import BlockNode
 
 import logging
 l = logging.getLogger("angr.tests")
@@ -80,6 +81,48 @@ def test_call_to():
     nose.tools.assert_in(0x400000, project.kb.functions.keys())
     nose.tools.assert_in(0x400420, project.kb.functions.keys())
 
+def test_block_containing():
+    project = angr.Project(test_location + "/x86_64/fauxware")
+    project.arch = ArchAMD64()
+
+    project.kb.functions._add_node(0x400410, 0x400410, size=8)
+    project.kb.functions._add_node(0x400410, 0x400418, size=4)
+    project.kb.functions._add_node(0x400440, 0x400440, size=16)
+
+    nose.tools.assert_equal(project.kb.functions.block_containing(0x400410).addr, 0x400410)
+    nose.tools.assert_equal(project.kb.functions.block_containing(0x400417).addr, 0x400410)
+    nose.tools.assert_equal(project.kb.functions.block_containing(0x40041b).addr, 0x400418)
+    nose.tools.assert_is_none(project.kb.functions.block_containing(0x40041c))
+    nose.tools.assert_is_none(project.kb.functions.block_containing(0x40040f))
+    nose.tools.assert_equal(project.kb.functions.block_containing(0x40044f).addr, 0x400440)
+
+def test_function_containing():
+    project = angr.Project(test_location + "/x86_64/fauxware")
+    project.arch = ArchAMD64()
+    functions = project.kb.functions
+
+    functions._add_node(0x400410, 0x400410, size=8)
+    functions._add_transition_to(0x400410, BlockNode(0x400410, 8), BlockNode(0x400430, 4))
+    functions._add_node(0x400440, 0x400440, size=16)
+
+    nose.tools.assert_equal(functions.function_containing(0x400414).addr, 0x400410)
+    nose.tools.assert_equal(functions.function_containing(0x400430).addr, 0x400410)
+    nose.tools.assert_equal(functions.function_containing(0x40044f).addr, 0x400440)
+    nose.tools.assert_is_none(functions.function_containing(0x400418))
+
+    # the index follows blocks that are split or removed, and functions that are removed
+    functions._shrink_node(0x400440, 4)
+    nose.tools.assert_equal(functions.block_containing(0x400448).addr, 0x400444)
+    nose.tools.assert_equal(functions.function_containing(0x400448).addr, 0x400440)
+    functions._remove_node(0x400444)
+    nose.tools.assert_is_none(functions.function_containing(0x400448))
+    nose.tools.assert_equal(functions.function_containing(0x400440).addr, 0x400440)
+    del functions[0x400410]
+    nose.tools.assert_is_none(functions.function_containing(0x400414))
+    nose.tools.assert_is_none(functions.function_containing(0x400430))
+
 if __name__ == "__main__":
     test_call_to()
+    test_block_containing()
+    test_function_containing()
     test_amd64()
@@ -295,9 +295,44 @@ def test_inspect_engine_process():
                     condition=second_symbolic_fork)
     pg.run()
 
+def test_inspect_indexed():
+    fired = [ ]
+    s = SimState(arch="AMD64", mode="symbolic")
+
+    # hundreds of address-keyed breakpoints, plus some that are always checked
+    for addr in xrange(0x1000, 0x1800, 4):
+        s.inspect.b('mem_write', when=BP_AFTER, mem_write_address=addr, action=lambda st, a=addr: fired.append(a))
+    s.inspect.b('mem_write', when=BP_AFTER, action=lambda st: fired.append('any'))
+    s.inspect.b('mem_write', when=BP_AFTER, mem_write_address=0x1400,
+                action=lambda st: fired.append('second'))
+
+    s.memory.store(0x1400, s.se.BVV(1, 32))
+    nose.tools.assert_equal(fired, [ 0x1400, 'any', 'second' ])
+    del fired[:]
+    s.memory.store(0x5000, s.se.BVV(1, 32))
+    nose.tools.assert_equal(fired, [ 'any' ])
+
+    # the indexes are shared with copies, but not affected by changes to the copies
+    c = s.copy()
+    c.inspect.remove_breakpoint('mem_write', filter_func=lambda bp: 'mem_write_address' not in bp.kwargs)
+    del fired[:]
+    c.memory.store(0x1400, s.se.BVV(1, 32))
+    nose.tools.assert_equal(fired, [ 0x1400, 'second' ])
+    del fired[:]
+    s.memory.store(0x1004, s.se.BVV(1, 32))
+    nose.tools.assert_equal(fired, [ 0x1004, 'any' ])
+
+    # a symbolic address may match any breakpoint
+    del fired[:]
+    x = s.se.BVS('x', 64)
+    s.add_constraints(x == 0x1008)
+    s.memory.store(x, s.se.BVV(1, 32))
+    nose.tools.assert_equal(fired, [ 0x1008, 'any' ])
+
 if __name__ == '__main__':
     test_inspect_concretization()
     test_inspect_exit()
     test_inspect_syscall()
     test_inspect()
     test_inspect_engine_process()
+    test_inspect_indexed()
@@ -3,7 +3,8 @@ import time
 import claripy
 import nose
 
-from angr.storage.paged_memory import SimPagedMemory
+from angr.storage.paged_memory import SimPagedMemory, _IntervalIndex, _BackerIndex
+from angr.storage.page_table import PageTable
 from angr import SimState, SIM_PROCEDURES
 from angr import options as o
 
@@ -614,6 +615,37 @@ def test_load_bytes():
     items = s.memory.mem.load_objects(0x8000, 0x2000)
     assert len(items) == 0
 
+def run_bulk_bytes(options):
+    s = SimState(arch='AMD64', add_options=options)
+
+    data = ''.join(chr(i % 256) for i in xrange(0x3000))
+    s.memory.store_bytes(0x10800, data)
+    nose.tools.assert_equal(s.memory.load_bytes(0x10800, 0x3000), data)
+    nose.tools.assert_equal(s.se.eval(s.memory.load(0x10800, 0x3000), cast_to=str), data)
+
+    # overlapping stores through the regular interface are seen by the bulk loads
+    s.memory.store(0x10ffe, s.se.BVV(0x41424344, 32))
+    nose.tools.assert_equal(s.memory.load_bytes(0x10ffc, 8), data[0x7fc:0x7fe] + 'ABCD' + data[0x802:0x804])
+
+    # symbolic data falls back to a bitvector
+    s.memory.store(0x11800, s.se.BVS('sym', 32))
+    loaded = s.memory.load_bytes(0x117fe, 8)
+    nose.tools.assert_false(isinstance(loaded, str))
+    nose.tools.assert_equal(loaded.length, 64)
+
+    # so do unmapped and uninitialized bytes
+    unmapped = s.memory.load_bytes(0x50000, 4)
+    nose.tools.assert_false(isinstance(unmapped, str))
+    nose.tools.assert_true(unmapped.symbolic)
+
+    # copy_contents takes the bulk path for concrete ranges
+    s.memory.copy_contents(0x20000, 0x10800, 0x1000)
+    nose.tools.assert_equal(s.memory.load_bytes(0x20000, 0x1000), data[:0x1000])
+
+def test_bulk_bytes():
+    yield run_bulk_bytes, set()
+    yield run_bulk_bytes, {o.ARRAY_PAGES}
+
 def test_fast_memory():
     s = SimState(arch='AMD64', add_options={o.FAST_REGISTERS, o.FAST_MEMORY})
 
@@ -642,10 +674,100 @@ def test_crosspage_read():
     assert "77665544" in state.solver.eval(r, cast_to=str).encode('hex')
     #assert s.solver.eval(r, 2) == ( 0xffeeddccbbaa998877665544, )
 
+def test_page_table():
+    t = PageTable()
+    for n in (0, 1, 31, 32, 0x7fffffff, 0xfffffffffffff):
+        t[n] = n
+    nose.tools.assert_equal(len(t), 6)
+    nose.tools.assert_equal(t.keys(), [0, 1, 31, 32, 0x7fffffff, 0xfffffffffffff])
+
+    b = t.branch()
+    b[1] = 'b'
+    del b[32]
+    t[0x7fffffff] = 't'
+    nose.tools.assert_equal(dict(t.iteritems()), {0: 0, 1: 1, 31: 31, 32: 32, 0x7fffffff: 't', 0xfffffffffffff: 0xfffffffffffff})
+    nose.tools.assert_equal(dict(b.iteritems()), {0: 0, 1: 'b', 31: 31, 0x7fffffff: 0x7fffffff, 0xfffffffffffff: 0xfffffffffffff})
+    nose.tools.assert_not_in(32, b)
+    nose.tools.assert_raises(KeyError, b.__getitem__, 32)
+
+def test_array_pages():
+    initial_memory = { 0: 'A', 1: 'A', 2: 'A', 3: 'A', 10: 'B' }
+    s = SimState(arch="AMD64", memory_backer=initial_memory, add_options={o.ARRAY_PAGES})
+    _concrete_memory_tests(s)
+
+    s.memory.store(0x2000, s.se.BVV("ABCDEFGH"))
+    page = s.memory.mem._pages[2]
+    nose.tools.assert_is(page._objects, None)
+
+    # a symbolic write in the middle of concrete data only promotes the written bytes
+    x = s.se.BVS('x', 16)
+    s.memory.store(0x2002, x)
+    nose.tools.assert_is_not(s.memory.mem._pages[2]._objects, None)
+    expr = s.memory.load(0x2000, 8)
+    nose.tools.assert_true(s.se.symbolic(expr))
+    nose.tools.assert_equal(s.se.eval(expr, cast_to=str, extra_constraints=[x == 0x5858]), "ABXXEFGH")
+
+    # and a concrete write over it makes it concrete again
+    s.memory.store(0x2000, s.se.BVV("12345678"))
+    expr = s.memory.load(0x2000, 8)
+    nose.tools.assert_false(s.se.symbolic(expr))
+    nose.tools.assert_equal(s.se.eval(expr, cast_to=str), "12345678")
+
+    # only the bytes that differ between copies of a page are changed, concrete or not
+    c = s.copy()
+    c.memory.store(0x2001, s.se.BVV("2"))
+    c.memory.store(0x2004, s.se.BVV("5"))
+    c.memory.store(0x2006, s.se.BVS('y', 8))
+    nose.tools.assert_is_not(c.memory.mem._pages[2], s.memory.mem._pages[2])
+    nose.tools.assert_equal(s.memory.changed_bytes(c.memory), { 0x2006 })
+
+def test_paged_memory_branch():
+    s = SimState(arch="AMD64")
+    s.memory.store(0x1000, "AAAA")
+    s.memory.store(0x7fff0000, "BBBB")
+
+    c = s.copy()
+    c.memory.store(0x1000, "CCCC")
+    c.memory.store(0x2000, "DDDD")
+
+    nose.tools.assert_equal(s.se.eval(s.memory.load(0x1000, 4), cast_to=str), "AAAA")
+    nose.tools.assert_equal(c.se.eval(c.memory.load(0x1000, 4), cast_to=str), "CCCC")
+    nose.tools.assert_equal(c.se.eval(c.memory.load(0x7fff0000, 4), cast_to=str), "BBBB")
+    nose.tools.assert_not_in(2, s.memory.mem._pages)
+    nose.tools.assert_in(2, c.memory.mem._pages)
+    nose.tools.assert_is(s.memory.mem._pages[0x7fff0], c.memory.mem._pages[0x7fff0])
+
+def test_memory_backer_pages():
+    # a dict backer larger than a page, which does not start at address 0
+    backer = { 0x10000 + i: chr(i % 0x100) for i in xrange(0x1800) }
+    for options in (set(), {o.ARRAY_PAGES}):
+        s = SimState(arch="AMD64", memory_backer=backer, add_options=options)
+        nose.tools.assert_equal(s.se.eval(s.memory.load(0x10ffe, 4), cast_to=str), "\xfe\xff\x00\x01")
+        nose.tools.assert_equal(s.se.eval(s.memory.load(0x117fe, 2), cast_to=str), "\xfe\xff")
+        nose.tools.assert_true({ 0x10, 0x11 } <= set(s.memory.mem._pages))
+
+    index = _IntervalIndex([ (0x1000, 0x3000, 'a'), (0, 0x10000, 'b'), (0x2000, 0x2100, 'c') ])
+    nose.tools.assert_equal([ v for _, _, v in index.overlapping(0x2000, 0x2001) ], [ 'a', 'b', 'c' ])
+    nose.tools.assert_equal([ v for _, _, v in index.overlapping(0x3000, 0x4000) ], [ 'b' ])
+    nose.tools.assert_equal(index.overlapping(0x10000, 0x20000), [ ])
+
+    # fresh states build their own permission maps, which share an index as long as their contents are the same
+    backer_index = _BackerIndex([ ])
+    permissions = backer_index.permissions({ (0x1000, 0x2000): 5, (0x2000, 0x3000): 3 })
+    nose.tools.assert_is(backer_index.permissions({ (0x1000, 0x2000): 5, (0x2000, 0x3000): 3 }), permissions)
+    nose.tools.assert_is_not(backer_index.permissions({ (0x1000, 0x2000): 7 }), permissions)
+    nose.tools.assert_is(backer_index.permissions({ (0x2000, 0x3000): 3, (0x1000, 0x2000): 5 }), permissions)
+
 if __name__ == '__main__':
+    test_memory_backer_pages()
+    test_array_pages()
+    test_page_table()
+    test_paged_memory_branch()
     test_crosspage_read()
     test_fast_memory()
     test_load_bytes()
+    for r, a in test_bulk_bytes():
+        r(a)
     test_false_condition()
     test_symbolic_write()
     test_fullpage_write()
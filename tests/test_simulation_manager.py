@@ -123,9 +123,30 @@ def test_explore_with_cfg():
     nose.tools.assert_equal(pg.found[1].addr, 0x4006ED)
     nose.tools.assert_equal(pg.avoid[0].addr, 0x4007C9)
 
+def test_process_pool():
+    p = angr.Project(os.path.join(location, 'x86_64', 'fauxware'), load_options={'auto_load_libs': False})
+
+    pg = p.factory.simgr()
+    pool = pg.use_technique(angr.exploration_techniques.ProcessPool(processes=2))
+    pg.explore(find=0x4006ED, num_find=3)
+    pg.remove_technique(pool)
+    nose.tools.assert_is_none(pool._pool)
+
+    nose.tools.assert_equal(len(pg.found), 3)
+    nose.tools.assert_true(all(s.addr == 0x4006ED for s in pg.found))
+    nose.tools.assert_true(all(s.project is p for s in pg.found))
+
+    # the found states keep their whole ancestry, which they share with each other
+    for s in pg.found:
+        nose.tools.assert_equal(len(list(s.history.lineage)), s.history.depth + 1)
+    roots = set(id(list(s.history.lineage)[0]) for s in pg.found + pg.active + pg.deadended)
+    nose.tools.assert_equal(len(roots), 1)
+
 if __name__ == "__main__":
     print 'explore_with_cfg'
     test_explore_with_cfg()
+    print 'process_pool'
+    test_process_pool()
     print 'find_to_middle'
     test_find_to_middle()
 
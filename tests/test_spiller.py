@@ -65,8 +65,79 @@ def test_palindrome2():
         for state in pg.cut
     )
 
+def test_segment_store():
+    project = angr.Project(_bin('tests/cgc/sc2_0b32aa01_01'))
+    pg = project.factory.simgr()
+    pg.run(until=lambda lpg: len(lpg.active) > 1)
+    states = list(pg.active)
+    depths = [ s.history.depth for s in states ]
+    addrs = [ s.addr for s in states ]
+
+    storage = angr.exploration_techniques.SegmentStore(project)
+    keys = storage.store(states[:1])
+    records = len(storage)
+    keys += storage.store(states[1:])
+    # siblings share their ancestry and most of their pages, which are only stored once
+    assert len(storage) - records < records * (len(states) - 1)
+
+    del states
+    pg.drop()
+    gc.collect()
+
+    loaded = [ storage.load(k) for k in keys ]
+    assert [ s.history.depth for s in loaded ] == depths
+    assert [ s.addr for s in loaded ] == addrs
+    assert loaded[0].history.parent is loaded[1].history.parent
+    assert all(s.project is project for s in loaded)
+    storage.close()
+
+def test_segment_store_compact_history():
+    project = angr.Project(_bin('tests/cgc/sc2_0b32aa01_01'))
+    s = project.factory.entry_state(add_options={angr.options.COMPACT_HISTORY})
+    pg = project.factory.simgr(s)
+    pg.run(n=100, until=lambda lpg: len(lpg.active) > 1)
+    states = list(pg.active)
+    traces = [ list(s.history.bbl_addrs) for s in states ]
+
+    storage = angr.exploration_techniques.SegmentStore(project)
+    keys = storage.store(states[:1])
+    size = storage._end
+    keys += storage.store(states[1:])
+    # the address traces are shared between the states, and are not stored again with every history
+    assert storage._end - size < size * (len(states) - 1)
+
+    loaded = [ storage.load(k) for k in keys ]
+    assert [ list(s.history.bbl_addrs) for s in loaded ] == traces
+    storage.close()
+
+def test_palindrome2_segment_store():
+    project = angr.Project(_bin('tests/cgc/sc2_0b32aa01_01'))
+    pg = project.factory.simgr()
+    limiter = angr.exploration_techniques.LengthLimiter(max_length=250)
+    pg.use_technique(limiter)
+
+    storage = angr.exploration_techniques.SegmentStore(project)
+    spiller = angr.exploration_techniques.Spiller(
+        pickle_callback=pickle_callback, unpickle_callback=unpickle_callback,
+        priority_key=priority_key, storage=storage
+    )
+    pg.use_technique(spiller)
+    pg.run()
+    storage.close()
+
+    assert spiller._ever_pickled > 0
+    assert spiller._ever_unpickled == spiller._ever_pickled
+    assert all(
+        ('pickled' not in state.globals and 'unpickled' not in state.globals) or
+        (state.globals['pickled'] and state.globals['unpickled'])
+        for state in pg.cut
+    )
+
 if __name__ == '__main__':
     setup()
     test_basic()
     test_palindrome2()
+    test_segment_store()
+    test_segment_store_compact_history()
+    test_palindrome2_segment_store()
     teardown()
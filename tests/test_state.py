@@ -261,6 +261,129 @@ def test_global_condition():
         nose.tools.assert_equals(s.se.eval_upto(s.regs.rbx, 10), [ 1 ])
         nose.tools.assert_items_equal(s.se.eval_upto(s.regs.rax, 10), [ 25 ])
 
+def test_solver_result_cache():
+    p = angr.Project(os.path.join(binaries_base, 'tests', 'x86_64', 'fauxware'))
+    s = p.factory.blank_state(add_options={angr.options.SOLVER_RESULT_CACHE})
+    x = s.se.BVS('x', 32)
+    s.add_constraints(x > 10, x < 20)
+
+    # sibling states share the results of the queries they have in common
+    a = s.copy()
+    b = s.copy()
+    nose.tools.assert_equals(a.se.max(x), 19)
+    nose.tools.assert_equals(p.solver_cache.misses, 1)
+    nose.tools.assert_equals(b.se.max(x), 19)
+    nose.tools.assert_equals(p.solver_cache.hits, 1)
+
+    # queries for fewer solutions are answered by earlier queries for more
+    nose.tools.assert_equals(len(a.se.eval_upto(x, 20)), 9)
+    nose.tools.assert_equals(len(b.se.eval_upto(x, 3)), 3)
+    nose.tools.assert_equals(len(b.se.eval_upto(x, 30)), 9)
+    nose.tools.assert_true(b.se.satisfiable())
+    nose.tools.assert_equals(p.solver_cache.hits, 4)
+
+    # extra constraints and new constraints are different queries
+    nose.tools.assert_equals(a.se.max(x, extra_constraints=(x < 15,)), 14)
+    b.add_constraints(x < 12)
+    nose.tools.assert_equals(b.se.max(x), 11)
+    nose.tools.assert_equals(a.se.max(x), 19)
+    nose.tools.assert_false(b.se.satisfiable(extra_constraints=(x == 15,)))
+
+    # states without the option do not use the cache
+    hits, misses = p.solver_cache.hits, p.solver_cache.misses
+    c = p.factory.blank_state()
+    c.add_constraints(x > 10, x < 20)
+    nose.tools.assert_equals(c.se.max(x), 19)
+    nose.tools.assert_equals((p.solver_cache.hits, p.solver_cache.misses), (hits, misses))
+
+def test_sliced_solver_queries():
+    p = angr.Project(os.path.join(binaries_base, 'tests', 'x86_64', 'fauxware'))
+    s = p.factory.blank_state(add_options={angr.options.SOLVER_RESULT_CACHE, angr.options.SLICED_SOLVER_QUERIES})
+    x = s.se.BVS('x', 32)
+    y = s.se.BVS('y', 32)
+    z = s.se.BVS('z', 32)
+    s.add_constraints(x > 10, x < 20, y > 100)
+    nose.tools.assert_true(s.se.satisfiable())
+
+    # constraints on unrelated variables do not change the queries on x
+    a = s.copy()
+    b = s.copy()
+    a.add_constraints(y < 200)
+    b.add_constraints(y > 300, z == 5)
+    nose.tools.assert_true(a.se.satisfiable())
+    nose.tools.assert_true(b.se.satisfiable())
+    nose.tools.assert_equals(a.se.max(x), 19)
+    misses = p.solver_cache.misses
+    nose.tools.assert_equals(b.se.max(x), 19)
+    nose.tools.assert_equals(p.solver_cache.misses, misses)
+    nose.tools.assert_equals(b.se.eval_upto(z, 2), [ 5 ])
+    nose.tools.assert_equals(a.se.min(y), 101)
+    nose.tools.assert_equals(b.se.min(y), 301)
+
+    # constraints that link clusters merge them
+    b.add_constraints(x == y - 290)
+    nose.tools.assert_equals(b.se.max(x), 19)
+    nose.tools.assert_equals(b.se.min(x), 12)
+    nose.tools.assert_equals(a.se.min(x), 11)
+
+    # an unsatisfiable cluster makes every query unsatisfiable
+    c = a.copy()
+    c.add_constraints(z > 10, z < 5)
+    nose.tools.assert_false(c.se.satisfiable())
+    nose.tools.assert_raises(angr.SimUnsatError, c.se.max, x)
+    nose.tools.assert_true(a.se.satisfiable())
+
+    # replacing the constraints rebuilds the clusters
+    e = c.copy()
+    e.se.replace_constraints(a.se.constraints)
+    nose.tools.assert_true(e.se.satisfiable())
+    nose.tools.assert_equals(e.se.max(x), 19)
+
+    # approximate queries do not prove that new clusters are satisfiable
+    d = a.copy()
+    d.add_constraints(z > 10)
+    nose.tools.assert_true(d.se.satisfiable(exact=False))
+    nose.tools.assert_true(d.se._unknown_clusters)
+    nose.tools.assert_true(d.se.satisfiable())
+    nose.tools.assert_false(d.se._unknown_clusters)
+
+    # the clusters are rebuilt after merging
+    m, _, _ = a.merge(b)
+    nose.tools.assert_items_equal(m.se.eval_upto(y, 300, extra_constraints=(y < 104,)), [ 101, 102, 103 ])
+    nose.tools.assert_equals(m.se.max(z, extra_constraints=(y > 300,)), 5)
+
+def test_lazy_plugin_copies():
+    s = SimState(arch='AMD64', add_options={angr.options.LAZY_PLUGIN_COPIES})
+    s.regs.rax = 1
+    s.memory.store(0x1000, s.se.BVV(0x41, 8))
+    posix = s.posix
+
+    # plugins are shared until they are accessed
+    c = s.copy()
+    nose.tools.assert_true(c.has_plugin('posix'))
+    nose.tools.assert_is(c._shared_plugins['posix'].plugin, posix)
+    nose.tools.assert_is(s._shared_plugins['posix'].plugin, posix)
+
+    c.regs.rax = 2
+    c.memory.store(0x1000, c.se.BVV(0x42, 8))
+    nose.tools.assert_equals(s.se.eval(s.regs.rax), 1)
+    nose.tools.assert_equals(s.se.eval(s.memory.load(0x1000, 1)), 0x41)
+    nose.tools.assert_equals(c.se.eval(c.regs.rax), 2)
+    nose.tools.assert_equals(c.se.eval(c.memory.load(0x1000, 1)), 0x42)
+
+    # the first state to access a shared plugin copies it, the last one takes it
+    nose.tools.assert_is_not(c.posix, posix)
+    nose.tools.assert_is(s.posix, posix)
+
+    # copies of copies, merging and pickling see every plugin
+    d = c.copy()
+    e = c.copy()
+    nose.tools.assert_equals(d.se.eval(d.regs.rax), 2)
+    m, _, _ = d.merge(e)
+    nose.tools.assert_equals(m.se.eval(m.regs.rax), 2)
+    e = pickle.loads(pickle.dumps(e, -1))
+    nose.tools.assert_equals(e.se.eval(e.memory.load(0x1000, 1)), 0x42)
+
 
 if __name__ == '__main__':
     test_state()
@@ -271,3 +394,6 @@ if __name__ == '__main__':
     test_state_merge_static()
     test_state_pickle()
     test_global_condition()
+    test_solver_result_cache()
+    test_sliced_solver_queries()
+    test_lazy_plugin_copies()
@@ -39,6 +39,44 @@ def test_concretization_strategies():
     ss.memory._create_default_read_strategies()
     nose.tools.assert_true('symbolic' in next(iter(ss.memory.load(x, 1).variables)))
 
+def test_concretization_model_cache():
+    s = angr.SimState(arch='AMD64', add_options={angr.options.CONCRETIZATION_MODEL_CACHE})
+    models = s.memory.concretization_models
+    x = s.se.BVS('x', s.arch.bits)
+    y = s.se.BVS('y', s.arch.bits)
+    s.add_constraints(x > 0x1000, x < 0x100000, y == 10)
+
+    any_strategy = angr.concretization_strategies.SimConcretizationStrategyAny()
+    a = any_strategy.concretize(s.memory, x)[0]
+    nose.tools.assert_equal((models.hits, models.misses), (0, 1))
+
+    # copies of the state reuse the model, for any expression over the same variables
+    ss = s.copy()
+    nose.tools.assert_equal(any_strategy.concretize(ss.memory, x + 8), [ a + 8 ])
+    nose.tools.assert_equal(ss.memory.concretization_models.hits, 1)
+
+    # constraints on other variables keep the model valid, constraints it violates do not
+    ss.add_constraints(y < 20)
+    nose.tools.assert_equal(any_strategy.concretize(ss.memory, x), [ a ])
+    ss.add_constraints(x != a)
+    nose.tools.assert_not_equal(any_strategy.concretize(ss.memory, x), [ a ])
+    nose.tools.assert_equal(ss.memory.concretization_models.misses, 2)
+
+    # two models tell that an address has several solutions, spanning more than a range
+    b = any_strategy._any(s.memory, x, extra_constraints=(x != a,))
+    nose.tools.assert_not_equal(a, b)
+    nose.tools.assert_equal((models.hits, models.misses), (0, 2))
+    single = angr.concretization_strategies.SimConcretizationStrategySingle()
+    nose.tools.assert_is_none(single.concretize(s.memory, x))
+    nose.tools.assert_is_none(angr.concretization_strategies.SimConcretizationStrategyRange(0).concretize(s.memory, x))
+    nose.tools.assert_equal((models.hits, models.misses), (2, 2))
+
+    # memory accesses go through the cache
+    s.memory.store(x, s.se.BVV(0x41, 8))
+    nose.tools.assert_true(models.hits > 2)
+    nose.tools.assert_equal(models.misses, 2)
+    nose.tools.assert_true(s.se.eval(x) in (a, b))
+
 #def test_concretization():
 #   s = angr.SimState(arch="AMD64", mode="symbolic")
 #   dst = s.se.BVV(0x41424300, 32)
@@ -164,3 +202,4 @@ def test_compatibility_layer():
 if __name__ == '__main__':
     # test_concretization_strategies()
     test_compatibility_layer()
+    test_concretization_model_cache()
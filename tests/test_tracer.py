@@ -266,6 +266,57 @@ def test_fauxware():
     nose.tools.assert_true('traced' in simgr.stashes)
 
 
+class StepRecorder(angr.exploration_techniques.ExplorationTechnique):
+    """
+    Record the address of every state that goes through the step_state hook.
+    """
+    def __init__(self):
+        super(StepRecorder, self).__init__()
+        self.addrs = []
+
+    def step_state(self, simgr, state, successor_func=None, **kwargs):
+        self.addrs.append(state.addr)
+        return simgr.step_state(state, successor_func=successor_func, **kwargs)
+
+
+def trace_palindrome(fast_forward):
+    b = os.path.join(bin_location, "tests/cgc/sc1_0b32aa01_01")
+    p = angr.Project(b)
+    p.simos.syscall_library.update(angr.SIM_LIBRARIES['cgcabi_tracer'])
+
+    trace, magic, crash_mode, crash_addr = do_trace(p, 'tracer_cgc_se1_palindrome_raw_nocrash', 'racecar\n')
+    s = p.factory.tracer_state(input_content="racecar\n", magic_content=magic)
+    simgr = p.factory.simulation_manager(s, save_unsat=True, hierarchy=False, save_unconstrained=crash_mode)
+    simgr.use_technique(angr.exploration_techniques.CrashMonitor(trace=trace,
+        crash_mode=crash_mode,
+        crash_addr=crash_addr))
+    t = angr.exploration_techniques.Tracer(trace=trace, use_cache=False, fast_forward=fast_forward)
+    simgr.use_technique(t)
+    simgr.use_technique(angr.exploration_techniques.Oppologist())
+    recorder = StepRecorder()
+    simgr.use_technique(recorder)
+
+    simgr.run()
+    return simgr, recorder
+
+
+def test_fast_forward():
+    # trace the same input with and without fast-forwarding, which must give the same result
+    simgr, recorder = trace_palindrome(False)
+    ff_simgr, ff_recorder = trace_palindrome(True)
+
+    nose.tools.assert_true('traced' in ff_simgr.stashes)
+    nose.tools.assert_true('crashed' not in ff_simgr.stashes)
+    nose.tools.assert_equal(len(ff_simgr.traced), 1)
+    nose.tools.assert_equal(ff_simgr.traced[0].posix.dumps(1), simgr.traced[0].posix.dumps(1))
+    nose.tools.assert_equal(ff_simgr.traced[0].addr, simgr.traced[0].addr)
+    nose.tools.assert_equal(ff_simgr.traced[0].globals['bb_cnt'], simgr.traced[0].globals['bb_cnt'])
+    nose.tools.assert_equal(list(ff_simgr.traced[0].history.bbl_addrs), list(simgr.traced[0].history.bbl_addrs))
+
+    # the fast-forwarded blocks went through the step_state hooks of the other exploration techniques
+    nose.tools.assert_equal(ff_recorder.addrs, recorder.addrs)
+
+
 def run_all():
     def print_test_name(name):
         print '#' * (len(name) + 8)
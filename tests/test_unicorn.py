@@ -115,6 +115,21 @@ def test_fauxware():
         'Username: \nPassword: \nWelcome to the admin console, trusted user!\n'
     )))
 
+def test_fauxware_reuse_pages():
+    p = angr.Project(os.path.join(test_location, 'binaries/tests/i386/fauxware'))
+    s_unicorn = p.factory.entry_state(add_options=so.unicorn | { so.UNICORN_REUSE_PAGES }) # unicorn
+    pg = p.factory.simgr(s_unicorn)
+    pg.explore()
+
+    assert all("Unicorn" in ''.join(p.history.descriptions.hardcopy) for p in pg.deadended)
+    # pages mapped by earlier runs were mapped again without being copied
+    nose.tools.assert_true(any(s.unicorn._reused > 0 for s in pg.deadended))
+    nose.tools.assert_equal(sorted(pg.mp_deadended.posix.dumps(1).mp_items), sorted((
+        'Username: \nPassword: \nWelcome to the admin console, trusted user!\n',
+        'Username: \nPassword: \nGo away!',
+        'Username: \nPassword: \nWelcome to the admin console, trusted user!\n'
+    )))
+
 def test_fauxware_aggressive():
     p = angr.Project(os.path.join(test_location, 'binaries/tests/i386/fauxware'))
     s_unicorn = p.factory.entry_state(
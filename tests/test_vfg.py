@@ -159,6 +159,97 @@ def test_vfg_1():
     for arch in vfg_1_addresses:
         yield run_vfg_1, arch
 
+#
+# Function summaries
+#
+
+def run_vfg_function_summaries(arch):
+    proj = angr.Project(
+        os.path.join(os.path.join(test_location, arch), "fauxware"),
+        use_sim_procedures=True,
+    )
+
+    cfg = proj.analyses.CFGAccurate()
+    authenticate = cfg.functions.function(name='authenticate')
+
+    vfg = proj.analyses.VFG(cfg, start=0x40071d, context_sensitivity_level=10, interfunction_level=10,
+                            reuse_function_summaries=True
+                            )
+
+    all_block_addresses = set([ n.addr for n in vfg.graph.nodes() ])
+    nose.tools.assert_true(vfg_1_addresses[arch].issubset(all_block_addresses))
+
+    # authenticate is called once, and is summarized after it returns
+    nose.tools.assert_in(authenticate.addr, vfg.function_summaries)
+    summary = vfg.function_summaries[authenticate.addr][0]
+    nose.tools.assert_equal(summary.final_state.se.eval_upto(summary.final_state.regs.rax, 3), [0, 1])
+    # the start function is summarized as well
+    nose.tools.assert_in(0x40071d, vfg.function_summaries)
+
+    # the same call is covered by the summary now
+    initial_state = vfg._summary_state(vfg.function_initial_states[authenticate.addr].values()[0])
+    nose.tools.assert_true(summary.covers(initial_state, plugin_whitelist=('memory', 'registers')))
+    nose.tools.assert_greater(vfg._execution_counter[authenticate.addr], 0)
+
+    # when the call is reached again, authenticate is not analyzed again, and its summary is used instead
+    summaries = dict(vfg.function_summaries)
+    vfg = proj.analyses.VFG(cfg, start=0x40071d, context_sensitivity_level=10, interfunction_level=10,
+                            function_summaries=summaries
+                            )
+    nose.tools.assert_equal(vfg._execution_counter[authenticate.addr], 0)
+    all_block_addresses = set([ n.addr for n in vfg.graph.nodes() ])
+    nose.tools.assert_not_in(authenticate.addr, all_block_addresses)
+    main_addresses = set(b.addr for b in cfg.functions.function(addr=0x40071d).blocks) & vfg_1_addresses[arch]
+    nose.tools.assert_true(main_addresses.issubset(all_block_addresses))
+
+    # bottom-up: the callees of main are summarized on their own in worker processes before main is analyzed, and
+    # main applies the summary of authenticate instead of analyzing it
+    summaries = { }
+    vfg = proj.analyses.VFG(cfg, start=0x40071d, context_sensitivity_level=10, interfunction_level=10,
+                            function_summaries=summaries, processes=2
+                            )
+    nose.tools.assert_true(any(isinstance(s, angr.analyses.vfg.StackRelativeSummary)
+                               for s in summaries[authenticate.addr]))
+    nose.tools.assert_equal(vfg._execution_counter[authenticate.addr], 0)
+    all_block_addresses = set([ n.addr for n in vfg.graph.nodes() ])
+    nose.tools.assert_not_in(authenticate.addr, all_block_addresses)
+    nose.tools.assert_true(main_addresses.issubset(all_block_addresses))
+
+def test_vfg_function_summaries():
+    for arch in vfg_1_addresses:
+        yield run_vfg_function_summaries, arch
+
+def run_stack_relative_summary_conditional_write(arch):
+
+    def make_state():
+        return angr.SimState(arch=arch, mode='static',
+                             add_options={ angr.options.ABSTRACT_SOLVER, angr.options.ABSTRACT_MEMORY })
+
+    def global_addr(state, offset):
+        return state.se.VS(state.arch.bits, 'global', 0, offset)
+
+    # the callee writes 5 to the first byte on some paths only, and 9 to the second byte on every path
+    initial_state = make_state()
+    initial_state.memory.store(global_addr(initial_state, 0x1000), initial_state.se.BVV(0, 16))
+    final_state = initial_state.copy()
+    final_state.memory.store(global_addr(final_state, 0x1000), final_state.se.SI(bits=8, stride=5, lower_bound=0,
+                                                                                 upper_bound=5))
+    final_state.memory.store(global_addr(final_state, 0x1001), final_state.se.BVV(9, 8))
+    summary = angr.analyses.vfg.StackRelativeSummary(0x400000, initial_state, final_state)
+
+    caller = make_state()
+    caller.memory.store(global_addr(caller, 0x1000), caller.se.BVV(0x0707, 16))
+    summary.apply(caller, 0x400100, ('memory', ))
+
+    # the value of the caller is kept where the callee may not write
+    maybe_written = caller.memory.load(global_addr(caller, 0x1000), 1)
+    nose.tools.assert_true({ 5, 7 }.issubset(caller.se.eval_upto(maybe_written, 256)))
+    always_written = caller.memory.load(global_addr(caller, 0x1001), 1)
+    nose.tools.assert_equal(caller.se.eval_upto(always_written, 256), [ 9 ])
+
+def test_stack_relative_summary_conditional_write():
+    yield run_stack_relative_summary_conditional_write, 'AMD64'
+
 if __name__ == "__main__":
     # logging.getLogger("angr.state_plugins.abstract_memory").setLevel(logging.DEBUG)
     # logging.getLogger("angr.state_plugins.symbolic_memory").setLevel(logging.DEBUG)